@@ -0,0 +1,366 @@
+# ============================================================
+# bench.py – Mesure des chemins critiques du projet
+# ============================================================
+# Pour chaque taille demandée, un export synthétique est généré
+# (generer.py) dans un dossier temporaire, puis chaque étape est
+# chronométrée dans un processus neuf (pas de cache partagé entre
+# les mesures, pic de mémoire propre à l'étape) :
+#   - import     : json_to_csv, remove_specific_row_from_csv (pandas),
+#                  importer_csv (depuis le CSV, puis depuis le Parquet
+#                  si pyarrow est installé) ;
+#   - requêtes   : fonctions de lecture de interface.py, instantané
+#                  en colonnes (colonnes.py) ;
+#   - cartes     : recuperer_datacenters_bdd, creation_carte,
+#                  carte_pays_detail (fichiers HTML).
+# Les étapes s'enchaînent : importer_csv construit la base lue par
+# les suivantes. Les cartes à un marqueur folium par datacenter sont
+# ignorées au-delà de --cartes-max lignes (plusieurs minutes sinon).
+#
+# Résultat : un fichier JSON (durée par appel de chaque répétition,
+# médiane, pic de mémoire résidente). --comparer signale les étapes
+# plus lentes ou plus gourmandes de plus de --seuil entre deux fichiers
+# (code de retour 1 en cas de régression).
+#
+# Usage : python bench/bench.py [--tailles N …] [--repetitions R]
+#                               [--filtre MOT] [--sortie FICHIER]
+#         python bench/bench.py --comparer AVANT.json APRES.json [--seuil 0.1]
+# ============================================================
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import statistics
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+RACINE = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, RACINE)
+sys.path.insert(0, os.path.join(RACINE, "scripts"))
+
+from generer import ecrire_json  # noqa: E402
+
+TAILLES      = (2_000, 20_000)
+REPETITIONS  = 3
+CARTES_MAX   = 20_000      # au-delà, creation_carte à marqueurs folium est ignorée
+SEUIL        = 0.10        # +10 % : régression
+DOSSIER      = os.path.join(RACINE, "output", "bench")
+
+
+class Ignore(Exception):
+    """Étape non mesurable ici (dépendance absente, taille trop grande)."""
+
+
+# ============================================================
+# ÉTAPES MESURÉES
+# ============================================================
+# Chaque préparateur reçoit le contexte (chemins, taille, pays le plus
+# représenté) et renvoie (avant, fonction) : `avant` (ou None) est
+# appelé avant chaque répétition, hors chronomètre.
+
+def _json_to_csv(ctx):
+    from json_to_csv import json_to_csv
+    return None, lambda: json_to_csv(ctx["json"], ctx["csv_brut"])
+
+
+def _remove_specific_row(ctx):
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        raise Ignore("pandas non installé")
+    from json_to_csv import json_to_csv
+    from clean_csv import remove_specific_row_from_csv
+    copie = ctx["csv_brut"] + ".copie"
+    if not os.path.exists(ctx["csv_brut"]):
+        json_to_csv(ctx["json"], ctx["csv_brut"])
+    return (lambda: shutil.copyfile(ctx["csv_brut"], copie),
+            lambda: remove_specific_row_from_csv(copie, "region_continent", "Europe"))
+
+
+def _importer_csv(ctx):
+    from csv_to_sqlite import importer_csv
+    return None, lambda: importer_csv(ctx["csv"], ctx["bdd"], reset=True)
+
+
+def _importer_parquet(ctx):
+    import fichier_parquet
+    from csv_to_sqlite import importer_csv, detecter_colonnes
+    if not fichier_parquet.disponible():
+        raise Ignore("pyarrow non installé")
+    parquet = os.path.join(ctx["dossier"], "datacenter.parquet")
+    bdd = os.path.join(ctx["dossier"], "datacenter_parquet.sqlite3")
+    if not os.path.exists(parquet):
+        import csv
+        with open(ctx["csv"], encoding="utf-8", newline="") as f:
+            lecteur = csv.reader(f)
+            next(lecteur)
+            fichier_parquet.ecrire_parquet(lecteur, parquet, detecter_colonnes(ctx["csv"]))
+    return None, lambda: importer_csv(parquet, bdd, reset=True)
+
+
+def _interface(nom_fonction, *args):
+    def preparer(ctx):
+        import interface
+        interface.FICHIER_BDD = ctx["bdd"]
+        fonction = getattr(interface, nom_fonction)
+        parametres = [ctx["pays"] if a == "pays" else a for a in args]
+        return None, lambda: fonction(*parametres)
+    return preparer
+
+
+def _page_pays(ctx):
+    from liste_virtuelle import SourcePages, TAILLE_PAGE
+    source = SourcePages("datacenters_pays", (ctx["pays"],), fichier_bdd=ctx["bdd"])
+    return None, lambda: source.lire("net_count", "desc", TAILLE_PAGE)
+
+
+def _colonnes_construire(ctx):
+    import colonnes
+    return None, lambda: colonnes.construire(ctx["bdd"])
+
+
+def _colonnes_grouper(ctx):
+    import colonnes
+    instantane = colonnes.instantane(ctx["bdd"])
+    return None, lambda: instantane.top_groupes("country", "net_count", "moyenne", k=10)
+
+
+def _recuperer_datacenters(ctx):
+    from carte import recuperer_datacenters_bdd
+    return None, lambda: recuperer_datacenters_bdd(ctx["bdd"])
+
+
+def _creation_carte(leger):
+    def preparer(ctx):
+        if not leger and ctx["taille"] > ctx["cartes_max"]:
+            raise Ignore(f"plus de {ctx['cartes_max']} lignes (voir --cartes-max)")
+        from carte import creation_carte, recuperer_datacenters_bdd
+        liste = recuperer_datacenters_bdd(ctx["bdd"])
+        fichier = os.path.join(ctx["dossier"], "carte.html")
+        return None, lambda: creation_carte(liste, fichier=fichier, leger=leger)
+    return preparer
+
+
+def _carte_pays_detail(leger):
+    def preparer(ctx):
+        if not leger and ctx["taille"] > ctx["cartes_max"]:
+            raise Ignore(f"plus de {ctx['cartes_max']} lignes (voir --cartes-max)")
+        import jointure
+        jointure.FICHIER_BDD = ctx["bdd"]
+        fichier = os.path.join(ctx["dossier"], "carte_pays.html")
+        return None, lambda: jointure.carte_pays_detail(ctx["pays"], fichier, leger=leger)
+    return preparer
+
+
+# (nom, préparateur, appels par mesure) dans l'ordre d'exécution
+ETAPES = [
+    ("json_to_csv",                     _json_to_csv,                    1),
+    ("remove_specific_row_from_csv",    _remove_specific_row,            1),
+    ("importer_csv",                    _importer_csv,                   1),
+    ("importer_csv.parquet",            _importer_parquet,               1),
+    ("interface.get_stats_globales",    _interface("get_stats_globales"), 100),
+    ("interface.get_liste_pays",        _interface("get_liste_pays"),    100),
+    ("interface.get_datacenters_pays",  _interface("get_datacenters_pays", "pays"), 10),
+    ("interface.get_top_dc",            _interface("get_top_dc", 20),    100),
+    ("liste_virtuelle.premiere_page",   _page_pays,                      100),
+    ("colonnes.construire",             _colonnes_construire,            1),
+    ("colonnes.top_groupes",            _colonnes_grouper,               100),
+    ("carte.recuperer_datacenters_bdd", _recuperer_datacenters,          1),
+    ("carte.creation_carte",            _creation_carte(False),          1),
+    ("carte.creation_carte_leger",      _creation_carte(True),           1),
+    ("jointure.carte_pays_detail",      _carte_pays_detail(False),       1),
+    ("jointure.carte_pays_detail_leger", _carte_pays_detail(True),       1),
+]
+
+
+# ============================================================
+# EXÉCUTION
+# ============================================================
+
+def rss_max_ko() -> int | None:
+    """Pic de mémoire résidente du processus courant, en Ko (None sous Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic // 1024 if sys.platform == "darwin" else pic   # macOS : octets
+
+
+def _mesurer(index: int, ctx: dict, repetitions: int) -> dict:
+    """Exécuté dans un processus neuf : chronomètre l'étape ETAPES[index]."""
+    _nom, preparer, nombre = ETAPES[index]
+    with open(os.devnull, "w") as nul, contextlib.redirect_stdout(nul):
+        try:
+            avant, fonction = preparer(ctx)
+        except Ignore as e:
+            return {"statut": f"ignoré : {e}"}
+        durees = []
+        for _ in range(repetitions):
+            if avant is not None:
+                avant()
+            debut = time.perf_counter()
+            for _ in range(nombre):
+                fonction()
+            durees.append((time.perf_counter() - debut) / nombre)
+    return {"statut": "ok", "secondes": durees, "rss_max_ko": rss_max_ko()}
+
+
+def preparer_donnees(dossier: str, taille: int, graine: int) -> dict:
+    """Export synthétique + CSV Europe nettoyé (entrée d'importer_csv) ; non chronométré."""
+    from json_to_csv import json_to_csv
+    from ingest import COLONNES_DATACENTER
+    from import_pays import import_pays
+
+    os.makedirs(dossier, exist_ok=True)
+    ctx = {
+        "taille":   taille,
+        "dossier":  dossier,
+        "json":     os.path.join(dossier, "fac.json"),
+        "csv_brut": os.path.join(dossier, "fac_brut.csv"),
+        "csv":      os.path.join(dossier, "datacenter.csv"),
+        "bdd":      os.path.join(dossier, "datacenter.sqlite3"),
+    }
+    ecrire_json(ctx["json"], taille, graine)
+    json_to_csv(ctx["json"], ctx["csv"], ["Europe"], COLONNES_DATACENTER)
+    with open(os.devnull, "w") as nul, contextlib.redirect_stdout(nul):
+        import_pays(fichier_bdd=ctx["bdd"])
+
+    # Pays le plus représenté (le cas le plus lourd des requêtes par pays)
+    import csv
+    from collections import Counter
+    with open(ctx["csv"], encoding="utf-8", newline="") as f:
+        ctx["pays"] = Counter(r["country"] for r in csv.DictReader(f)).most_common(1)[0][0]
+    return ctx
+
+
+def lancer(tailles=TAILLES, repetitions: int = REPETITIONS, filtre: str | None = None,
+           cartes_max: int = CARTES_MAX, graine: int = 0, garder: bool = False) -> dict:
+    resultats = []
+    contexte_mp = multiprocessing.get_context("spawn")
+    for taille in tailles:
+        dossier = tempfile.mkdtemp(prefix=f"bench_{taille}_")
+        print(f"\n=== {taille} datacenters ({dossier}) ===")
+        try:
+            ctx = preparer_donnees(dossier, taille, graine)
+            ctx["cartes_max"] = cartes_max
+            for index, (nom, _preparer, nombre) in enumerate(ETAPES):
+                # importer_csv construit la base : jamais filtré
+                if filtre and filtre not in nom and nom != "importer_csv":
+                    continue
+                with ProcessPoolExecutor(1, mp_context=contexte_mp) as executeur:
+                    try:
+                        mesure = executeur.submit(_mesurer, index, ctx, repetitions).result()
+                    except Exception as e:
+                        mesure = {"statut": f"erreur : {e!r}"}
+                mesure = {"nom": nom, "taille": taille, "appels": nombre, **mesure}
+                if mesure["statut"] == "ok":
+                    mesure["mediane"] = statistics.median(mesure["secondes"])
+                    print(f"  {nom:36s} {mesure['mediane'] * 1000:10.2f} ms"
+                          f"   {mesure['rss_max_ko'] or 0:>8} Ko")
+                else:
+                    print(f"  {nom:36s} {mesure['statut']}")
+                resultats.append(mesure)
+        finally:
+            if not garder:
+                shutil.rmtree(dossier, ignore_errors=True)
+
+    return {
+        "date":        datetime.now().isoformat(timespec="seconds"),
+        "python":      platform.python_version(),
+        "plateforme":  platform.platform(),
+        "repetitions": repetitions,
+        "graine":      graine,
+        "resultats":   resultats,
+    }
+
+
+# ============================================================
+# COMPARAISON
+# ============================================================
+
+def comparer(avant: dict, apres: dict, seuil: float = SEUIL) -> list[dict]:
+    """
+    Compare deux résultats étape par étape (même nom, même taille).
+    Retourne la liste des écarts avec leur verdict.
+    """
+    anciens = {(r["nom"], r["taille"]): r for r in avant["resultats"] if r["statut"] == "ok"}
+    ecarts = []
+    for r in apres["resultats"]:
+        a = anciens.get((r["nom"], r["taille"]))
+        if a is None or r["statut"] != "ok":
+            continue
+        ratio_temps = r["mediane"] / a["mediane"] if a["mediane"] else 1.0
+        ratio_rss = (r["rss_max_ko"] / a["rss_max_ko"]
+                     if r.get("rss_max_ko") and a.get("rss_max_ko") else 1.0)
+        if ratio_temps > 1 + seuil or ratio_rss > 1 + seuil:
+            verdict = "RÉGRESSION"
+        elif ratio_temps < 1 - seuil:
+            verdict = "amélioration"
+        else:
+            verdict = ""
+        ecarts.append({"nom": r["nom"], "taille": r["taille"],
+                       "avant": a["mediane"], "apres": r["mediane"],
+                       "ratio_temps": ratio_temps, "ratio_rss": ratio_rss,
+                       "verdict": verdict})
+    return ecarts
+
+
+def afficher_comparaison(ecarts: list[dict]):
+    print(f"  {'étape':36s} {'taille':>8s} {'avant':>11s} {'après':>11s} "
+          f"{'temps':>7s} {'RSS':>7s}")
+    for e in ecarts:
+        print(f"  {e['nom']:36s} {e['taille']:8d} {e['avant'] * 1000:8.2f} ms "
+              f"{e['apres'] * 1000:8.2f} ms {e['ratio_temps']:6.2f}x "
+              f"{e['ratio_rss']:6.2f}x  {e['verdict']}")
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Chronomètre l'import, les requêtes et la génération des cartes."
+    )
+    parser.add_argument("--tailles", type=int, nargs="+", default=list(TAILLES), metavar="N",
+                        help="Nombres de datacenters générés (ex. 2000 50000 500000)")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS, metavar="R")
+    parser.add_argument("--filtre", default=None, metavar="MOT",
+                        help="Ne mesure que les étapes dont le nom contient MOT")
+    parser.add_argument("--cartes-max", type=int, default=CARTES_MAX, metavar="N",
+                        help=f"Taille maximale pour les cartes à marqueurs folium "
+                             f"(défaut : {CARTES_MAX})")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--garder", action="store_true",
+                        help="Garde les données générées (dossier temporaire)")
+    parser.add_argument("--sortie", default=None, metavar="FICHIER",
+                        help="Fichier JSON des résultats (défaut : output/bench/bench_<date>.json)")
+    parser.add_argument("--comparer", nargs=2, metavar=("AVANT", "APRES"),
+                        help="Compare deux fichiers de résultats")
+    parser.add_argument("--seuil", type=float, default=SEUIL,
+                        help=f"Écart relatif signalé (défaut : {SEUIL})")
+    args = parser.parse_args()
+
+    if args.comparer:
+        fichiers = []
+        for chemin in args.comparer:
+            with open(chemin, encoding="utf-8") as f:
+                fichiers.append(json.load(f))
+        ecarts = comparer(*fichiers, seuil=args.seuil)
+        afficher_comparaison(ecarts)
+        regressions = [e for e in ecarts if e["verdict"] == "RÉGRESSION"]
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.seuil:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    rapport = lancer(args.tailles, args.repetitions, args.filtre,
+                     args.cartes_max, args.graine, args.garder)
+    sortie = args.sortie or os.path.join(
+        DOSSIER, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(sortie)), exist_ok=True)
+    with open(sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats : {sortie}")
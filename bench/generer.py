@@ -0,0 +1,144 @@
+# ============================================================
+# generer.py – Export PeeringDB synthétique pour les benchmarks
+# ============================================================
+# Produit un fichier au format de fac-0.json ({"data": [...]}) de
+# N datacenters, reproductible (graine fixe) et réaliste :
+#   - pays tirés selon une loi de Zipf (quelques pays concentrent
+#     l'essentiel des sites, comme DE / GB / NL / FR dans PeeringDB) ;
+#     ~60 % en Europe (pays de data/pays_europe.csv), le reste sur
+#     les autres continents ;
+#   - villes tirées elles aussi selon Zipf : la capitale d'abord,
+#     puis des villes secondaires placées autour d'elle ;
+#   - net_count à queue lourde (Pareto), ix_count petit ;
+#   - une part `sans_gps` des sites sans coordonnées.
+#
+# Usage : python bench/generer.py N [--sortie FICHIER] [--graine G]
+#                                   [--sans-gps PART]
+# ============================================================
+
+import os
+import csv
+import sys
+import json
+import random
+import argparse
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RACINE, "scripts"))
+from json_to_csv import COLONNES_FAC  # noqa: E402
+
+FICHIER_PAYS  = os.path.join(RACINE, "data", "pays_europe.csv")
+PART_EUROPE   = 0.6
+SANS_GPS      = 0.05
+VILLES_PAR_PAYS = 30
+EXPOSANT_ZIPF = 1.1
+
+# Hors Europe : (code, continent, capitale, lat, lon)
+PAYS_MONDE = [
+    ("US", "North America", "Ashburn",      39.04, -77.49),
+    ("CA", "North America", "Toronto",      43.65, -79.38),
+    ("BR", "South America", "Sao Paulo",   -23.55, -46.63),
+    ("AR", "South America", "Buenos Aires", -34.60, -58.38),
+    ("JP", "Asia Pacific",  "Tokyo",        35.68, 139.69),
+    ("SG", "Asia Pacific",  "Singapore",     1.35, 103.82),
+    ("IN", "Asia Pacific",  "Mumbai",       19.08,  72.88),
+    ("AU", "Australia",     "Sydney",      -33.87, 151.21),
+    ("ZA", "Africa",        "Johannesburg", -26.20,  28.05),
+    ("AE", "Middle East",   "Dubai",        25.20,  55.27),
+]
+ORGANISATIONS = ["Equinix", "Digital Realty", "Interxion", "NTT", "Global Switch",
+                 "Telehouse", "Data4", "Iron Mountain", "CyrusOne", "Colt",
+                 "Orange", "Deutsche Telekom", "Vantage", "Scaleway", "OVHcloud"]
+
+
+def _poids_zipf(n: int) -> list[float]:
+    return [1 / (rang ** EXPOSANT_ZIPF) for rang in range(1, n + 1)]
+
+
+def _pays() -> tuple[list, list]:
+    """Pays européens de data/pays_europe.csv puis pays hors Europe."""
+    with open(FICHIER_PAYS, encoding="utf-8") as f:
+        europe = [(r["code_pays"], "Europe", r["capitale"],
+                   float(r["lat_capitale"]), float(r["lon_capitale"]))
+                  for r in csv.DictReader(f)]
+    return europe, PAYS_MONDE
+
+
+def generer_facilities(n: int, graine: int = 0, sans_gps: float = SANS_GPS):
+    """Génère `n` dictionnaires `fac` (mêmes clés que l'API PeeringDB)."""
+    alea = random.Random(graine)
+    europe, monde = _pays()
+    # Ordre des pays (rang de Zipf) tiré une fois pour toutes
+    alea.shuffle(europe)
+    alea.shuffle(monde)
+    poids_europe, poids_monde = _poids_zipf(len(europe)), _poids_zipf(len(monde))
+    poids_villes = _poids_zipf(VILLES_PAR_PAYS)
+
+    villes = {}
+    for code, _continent, capitale, lat, lon in europe + monde:
+        villes[code] = [(capitale, lat, lon)] + [
+            (f"{capitale} {k}", lat + alea.uniform(-2, 2), lon + alea.uniform(-2, 2))
+            for k in range(1, VILLES_PAR_PAYS)
+        ]
+
+    for i in range(1, n + 1):
+        if alea.random() < PART_EUROPE:
+            code, continent, *_ = alea.choices(europe, poids_europe)[0]
+        else:
+            code, continent, *_ = alea.choices(monde, poids_monde)[0]
+        ville, lat, lon = alea.choices(villes[code], poids_villes)[0]
+        org = alea.choice(ORGANISATIONS)
+        gps = alea.random() >= sans_gps
+
+        fac = dict.fromkeys(COLONNES_FAC, "")
+        fac.update({
+            "id": i,
+            "org_id": ORGANISATIONS.index(org) + 1,
+            "org_name": org,
+            "name": f"{org} {code}{i}",
+            "aka": f"{org[:3].upper()}-{ville[:3].upper()}{i % 100}",
+            "website": f"https://www.{org.lower().replace(' ', '')}.example/{i}",
+            "clli": f"{ville[:4].upper()}{code}{i % 10}",
+            "net_count": min(1000, int(alea.paretovariate(1.2)) - 1),
+            "ix_count": min(40, int(alea.expovariate(1.2))),
+            "carrier_count": alea.randint(0, 20),
+            "region_continent": continent,
+            "created": "2015-01-01T00:00:00Z",
+            "updated": "2024-01-01T00:00:00Z",
+            "status": "ok",
+            "address1": f"{alea.randint(1, 200)} rue de l'Exemple",
+            "city": ville,
+            "country": code,
+            "zipcode": f"{alea.randint(1000, 99999)}",
+            "latitude": round(lat + alea.uniform(-0.1, 0.1), 6) if gps else None,
+            "longitude": round(lon + alea.uniform(-0.1, 0.1), 6) if gps else None,
+        })
+        yield fac
+
+
+def ecrire_json(fichier: str, n: int, graine: int = 0, sans_gps: float = SANS_GPS) -> int:
+    """Écrit l'export synthétique dans `fichier` (un objet par ligne, en flux)."""
+    with open(fichier, "w", encoding="utf-8") as f:
+        f.write('{"data": [\n')
+        for i, fac in enumerate(generer_facilities(n, graine, sans_gps)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(fac, ensure_ascii=False))
+        f.write("\n]}\n")
+    return n
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Génère un export PeeringDB synthétique (format fac-0.json)."
+    )
+    parser.add_argument("n", type=int, help="Nombre de datacenters (ex. 2000 à 500000)")
+    parser.add_argument("--sortie", default="fac-synthetique.json", metavar="FICHIER")
+    parser.add_argument("--graine", type=int, default=0, metavar="G")
+    parser.add_argument("--sans-gps", type=float, default=SANS_GPS, metavar="PART",
+                        help=f"Part des sites sans coordonnées (défaut : {SANS_GPS})")
+    args = parser.parse_args()
+
+    ecrire_json(args.sortie, args.n, args.graine, args.sans_gps)
+    print(f"{args.n} datacenters → {args.sortie}")
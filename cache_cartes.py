@@ -0,0 +1,154 @@
+# ============================================================
+# cache_cartes.py – Cache des cartes HTML générées
+# ============================================================
+# Une carte est enregistrée dans output/cache/ sous un nom qui
+# dépend de son type, de ses paramètres et d'une empreinte des
+# données (révision de `stats_pays`, incrémentée à chaque import,
+# synchronisation, géocodage ou import de la table pays). Tant que
+# la base ne change pas, la carte est rouverte depuis le disque sans
+# être reconstruite ; dès qu'elle change, la nouvelle version
+# remplace l'ancienne.
+#
+# Usage : python cache_cartes.py [--travailleurs N]
+#   Préconstruit en parallèle la carte globale, la carte des
+#   bulles et la carte de chaque pays (ex. après un ingest).
+# ============================================================
+
+import os
+import glob
+import sqlite3
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import db_query
+from schema import PAYS_GLOBAL
+
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+FICHIER_BDD  = os.path.join(BASE_DIR, "data", "datacenter.sqlite3")
+DOSSIER      = os.path.join(BASE_DIR, "output", "cache")
+VERSION_RENDU = 2      # à incrémenter quand l'apparence des cartes change
+
+
+# ============================================================
+def empreinte_donnees(fichier_bdd: str = FICHIER_BDD) -> str:
+    """Identifiant de l'état des données ; change à chaque rafraîchissement de stats_pays."""
+    ligne = db_query.une("empreinte_donnees", (PAYS_GLOBAL,), fichier_bdd)
+    if ligne is None:
+        return "vide"
+    return f"r{ligne.revision}-n{ligne.nb}-g{ligne.nb_gps}"
+
+
+def chemin_carte(type_carte: str, parametres=(), empreinte: str = "") -> str:
+    """output/cache/<type>[_<paramètres>]_<hachage de l'empreinte>.html"""
+    prefixe = "_".join([type_carte, *map(str, parametres)]).lower()
+    cle = hashlib.sha1(f"{empreinte}|{VERSION_RENDU}".encode()).hexdigest()[:12]
+    return os.path.join(DOSSIER, f"{prefixe}_{cle}.html")
+
+
+def carte_en_cache(type_carte: str, parametres, generer,
+                   fichier_bdd: str = FICHIER_BDD) -> tuple[str | None, bool]:
+    """
+    Retourne (fichier, depuis_cache). Si la carte n'est pas en cache,
+    `generer(fichier)` la construit ; il renvoie une valeur fausse s'il
+    n'y a rien à afficher (la carte n'est alors pas créée).
+    """
+    fichier = chemin_carte(type_carte, parametres, empreinte_donnees(fichier_bdd))
+    if os.path.exists(fichier):
+        return fichier, True
+
+    os.makedirs(DOSSIER, exist_ok=True)
+    temporaire = fichier[:-len(".html")] + f".{os.getpid()}.tmp.html"
+    try:
+        if not generer(temporaire):
+            return None, False
+        os.replace(temporaire, fichier)
+    finally:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+
+    # Les versions précédentes de cette carte sont périmées
+    prefixe = os.path.basename(fichier).rsplit("_", 1)[0]
+    for ancien in glob.glob(os.path.join(DOSSIER, f"{prefixe}_*.html")):
+        if ancien != fichier and not ancien.endswith(".tmp.html"):
+            os.remove(ancien)
+    return fichier, False
+
+
+def vider_cache():
+    """Supprime toutes les cartes en cache."""
+    for fichier in glob.glob(os.path.join(DOSSIER, "*.html")):
+        os.remove(fichier)
+
+
+# ============================================================
+# PRÉCHAUFFAGE
+# ============================================================
+
+def _construire(tache, fichier_bdd: str):
+    """Construit une carte dans un processus de travail (voir prechauffer)."""
+    from carte import carte_interface_tous, carte_interface_pays
+    from jointure import carte_par_pays
+
+    type_carte, parametres = tache
+    if type_carte == "tous":
+        generer = lambda f: carte_interface_tous(f, fichier_bdd)
+    elif type_carte == "bulles":
+        generer = carte_par_pays
+    else:
+        code, nom = parametres
+        generer = lambda f: carte_interface_pays(code, nom, f, fichier_bdd)
+        parametres = (code,)
+    return carte_en_cache(type_carte, parametres, generer, fichier_bdd)
+
+
+def prechauffer(fichier_bdd: str = FICHIER_BDD, travailleurs: int | None = None) -> dict:
+    """
+    Construit en parallèle (un processus par carte) toutes les cartes
+    absentes du cache. Retourne les compteurs construites / en_cache / vides.
+    """
+    try:
+        pays = db_query.executer("liste_pays", fichier_bdd=fichier_bdd)
+    except sqlite3.OperationalError:
+        pays = db_query.executer("liste_pays_sans_table", (PAYS_GLOBAL,), fichier_bdd)
+    taches = [("tous", ()), ("bulles", ())]
+    taches += [("pays", (p.code_pays, p.nom_pays)) for p in pays if p.nb]
+
+    compteurs = {"construites": 0, "en_cache": 0, "vides": 0}
+    # « spawn » : les processus ne doivent pas hériter des connexions SQLite
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(travailleurs, mp_context=contexte) as executeur:
+        futures = {executeur.submit(_construire, t, fichier_bdd): t for t in taches}
+        for future in as_completed(futures):
+            fichier, depuis_cache = future.result()
+            if fichier is None:
+                compteurs["vides"] += 1
+            elif depuis_cache:
+                compteurs["en_cache"] += 1
+            else:
+                compteurs["construites"] += 1
+                print(f"  ✓ {os.path.relpath(fichier, BASE_DIR)}")
+    return compteurs
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Préconstruit les cartes de l'interface dans output/cache/."
+    )
+    parser.add_argument(
+        "--travailleurs", type=int, default=None, metavar="N",
+        help="Nombre de processus (défaut : nombre de cœurs)."
+    )
+    parser.add_argument(
+        "--vider", action="store_true",
+        help="Supprime d'abord les cartes en cache."
+    )
+    args = parser.parse_args()
+
+    if args.vider:
+        vider_cache()
+    c = prechauffer(FICHIER_BDD, args.travailleurs)
+    print(f"{c['construites']} cartes construites, {c['en_cache']} déjà en cache, "
+          f"{c['vides']} sans données")
@@ -7,16 +7,21 @@
 # ============================================================
 
 import os
-import sqlite3
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import MarkerCluster, FastMarkerCluster
+from branca.element import MacroElement
+from jinja2 import Template
+
+import db_query
 
 # -------------------- CONSTANTES ----------------------------
 BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
 FICHIER_BDD   = os.path.join(BASE_DIR, "data",   "datacenter.sqlite3")
 FICHIER_CARTE = os.path.join(BASE_DIR, "output", "carte_datacenters.html")
 CENTRE_CARTE  = (48.8, 10.0)   # centre de l'Europe
+CENTRE_INTERFACE = (50.0, 15.0)  # carte globale de l'interface
 ZOOM_DEPART   = 5
+MODE_LEGER    = True           # calque FastMarkerCluster (voir ajouter_calque_leger)
 os.makedirs(os.path.join(BASE_DIR, "output"), exist_ok=True)
 
 # -------------------- EXEMPLE DE LISTE ---------------------
@@ -34,11 +39,143 @@ Liste_exemple = [
 ]
 
 
+# ============================================================
+# CALQUE LÉGER
+# ============================================================
+# Au lieu d'un folium.Marker + Popup + Icon par datacenter (une
+# dizaine d'instructions JS chacun), tous les points sont écrits
+# dans un seul tableau JSON lu par FastMarkerCluster ; marqueurs
+# et popups sont créés par le navigateur, la popup seulement à
+# l'ouverture. Une ligne du tableau :
+#   [lat, lon, nom, ville, pays, net_count, ix_count, site web]
+
+CALLBACK_DATACENTER = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {title: row[2]});
+    marker.setIcon(L.AwesomeMarkers.icon(
+        {icon: 'server', prefix: 'fa', markerColor: '%(couleur)s'}));
+    marker.bindPopup(function () {
+        var div = document.createElement('div');
+        var titre = document.createElement('b');
+        titre.textContent = row[2];
+        div.appendChild(titre);
+        var lignes = [row[3] + (row[4] ? ' (' + row[4] + ')' : ''),
+                      'Réseaux : ' + row[5] + ' | IX : ' + row[6]];
+        lignes.forEach(function (texte) {
+            div.appendChild(document.createElement('br'));
+            div.appendChild(document.createTextNode(texte));
+        });
+        if (row[7]) {
+            var lien = document.createElement('a');
+            lien.href = row[7];
+            lien.target = '_blank';
+            lien.textContent = 'Site web';
+            div.appendChild(document.createElement('br'));
+            div.appendChild(lien);
+        }
+        return div;
+    }, {maxWidth: 300});
+    return marker;
+}
+"""
+
+# Variante pour creation_carte : [lat, lon, nom, popup HTML déjà construite]
+CALLBACK_LISTE = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {title: row[2]});
+    marker.setIcon(L.AwesomeMarkers.icon(
+        {icon: 'server', prefix: 'fa', markerColor: 'blue'}));
+    marker.bindPopup(row[3], {maxWidth: 300});
+    return marker;
+}
+"""
+
+
+def donnees_legeres(rows) -> list[list]:
+    """Lignes de la BDD (champs lat, lon, name, city...) → tableau compact."""
+    return [
+        [round(r.lat, 5), round(r.lon, 5), r.name, r.city or "",
+         getattr(r, "country", None) or getattr(r, "nom_pays", ""),
+         r.net_count, r.ix_count,
+         getattr(r, "website", "") or ""]
+        for r in rows
+    ]
+
+
+def ajouter_calque_leger(carte, rows, nom="Datacenters", couleur="blue"):
+    """Ajoute à `carte` un calque FastMarkerCluster contenant tous les `rows`."""
+    return FastMarkerCluster(
+        donnees_legeres(rows),
+        callback=CALLBACK_DATACENTER % {"couleur": couleur},
+        name=nom,
+    ).add_to(carte)
+
+
+# ============================================================
+# CALQUE DE GROUPES PRÉCALCULÉS (regroupement.py)
+# ============================================================
+
+class CalqueGroupes(MacroElement):
+    """
+    Affiche, pour le zoom courant, les groupes calculés par
+    regroupement.pyramide() : une bulle par groupe, dont la taille suit
+    la somme des réseaux connectés (ou l'effectif si elle est nulle).
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var niveaux = {{ this.niveaux|tojson }};
+            var carte = {{ this._parent.get_name() }};
+            var calque = L.layerGroup().addTo(carte);
+            function dessiner() {
+                var z = Math.max({{ this.zoom_min }}, Math.min(carte.getZoom(), {{ this.zoom_max }}));
+                calque.clearLayers();
+                (niveaux[String(z)] || []).forEach(function (g) {
+                    var poids = g[3] > 0 ? g[3] : g[2];
+                    var bulle = L.circleMarker([g[0], g[1]], {
+                        radius: 4 + 3 * Math.log(1 + poids),
+                        color: g[2] > 1 ? '{{ this.couleur }}' : '#36c',
+                        fillOpacity: 0.6, weight: 1
+                    });
+                    bulle.bindTooltip(g[2] > 1
+                        ? g[2] + ' DC – ' + g[3] + ' réseaux – ' + g[4] + ' IX'
+                        : g[5] + ' – ' + g[3] + ' réseaux');
+                    if (g[2] > 1) {
+                        bulle.on('click', function () {
+                            carte.setView([g[0], g[1]], carte.getZoom() + 2);
+                        });
+                    }
+                    calque.addLayer(bulle);
+                });
+            }
+            carte.on('zoomend', dessiner);
+            dessiner();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, niveaux: dict, couleur: str = "#d33"):
+        super().__init__()
+        self._name = "CalqueGroupes"
+        self.niveaux = {str(z): groupes for z, groupes in niveaux.items()}
+        self.zoom_min = min(niveaux) if niveaux else 0
+        self.zoom_max = max(niveaux) if niveaux else 0
+        self.couleur = couleur
+
+
+def ajouter_calque_groupes(carte, niveaux: dict, couleur: str = "#d33"):
+    """Ajoute à `carte` les groupes de regroupement.pyramide() (un jeu par zoom)."""
+    return CalqueGroupes(niveaux, couleur).add_to(carte)
+
+
 # ============================================================
 def creation_carte(liste=None,
                    centre=CENTRE_CARTE,
                    zoom=ZOOM_DEPART,
-                   fichier=FICHIER_CARTE):
+                   fichier=FICHIER_CARTE,
+                   leger=False,
+                   regroupement=False):
     """
     Crée une carte Folium centrée sur `centre` avec un marqueur de test
     puis ajoute tous les marqueurs de `liste` (tuple : nom, lat, lon).
@@ -48,6 +185,9 @@ def creation_carte(liste=None,
     :param centre:  tuple (lat, lon) pour centrer la carte
     :param zoom:    niveau de zoom initial (1-19)
     :param fichier: nom du fichier HTML de sortie
+    :param leger:   marqueurs créés par le navigateur (FastMarkerCluster)
+    :param regroupement: groupes précalculés par zoom (regroupement.py)
+                         au lieu de MarkerCluster
     :return: objet carte folium
     """
 
@@ -67,7 +207,19 @@ def creation_carte(liste=None,
     ).add_to(carte)
 
     # --- Ajout des marqueurs depuis la liste ---
-    if liste:
+    if liste and regroupement:
+        from regroupement import pyramide
+        niveaux = pyramide([item[1] for item in liste], [item[2] for item in liste],
+                           noms=[item[0] for item in liste])
+        ajouter_calque_groupes(carte, niveaux)
+    elif liste and leger:
+        FastMarkerCluster(
+            [[item[1], item[2], item[0], item[3] if len(item) > 3 else item[0]]
+             for item in liste],
+            callback=CALLBACK_LISTE,
+            name="Datacenters",
+        ).add_to(carte)
+    elif liste:
         cluster = MarkerCluster(name="Datacenters").add_to(carte)
         for item in liste:
             nom, lat, lon = item[0], item[1], item[2]
@@ -89,38 +241,98 @@ def creation_carte(liste=None,
     return carte
 
 
+# ============================================================
+def carte_datacenters(rows, fichier=FICHIER_CARTE, centre=CENTRE_CARTE,
+                      zoom=ZOOM_DEPART):
+    """Carte de tous les `rows` (requête datacenters_gps) en calque léger."""
+    carte = folium.Map(location=centre, zoom_start=zoom,
+                       attr='© Contributeurs OpenStreetMap')
+    ajouter_calque_leger(carte, rows)
+    folium.LayerControl().add_to(carte)
+    carte.save(fichier)
+    print(f"Carte sauvegardée : {fichier} ({len(rows)} marqueurs)")
+    return carte
+
+
+# ============================================================
+# CARTES DE L'INTERFACE (interface.py, cache_cartes.py)
+# ============================================================
+# Chaque fonction écrit la carte dans `fichier` et retourne son
+# chemin, ou None s'il n'y a rien à afficher (carte_en_cache).
+
+def carte_interface_tous(fichier=None, fichier_bdd=FICHIER_BDD, leger=MODE_LEGER):
+    """Tous les datacenters géolocalisés (carte globale de l'interface)."""
+    if fichier is None:
+        fichier = os.path.join(BASE_DIR, "output", "carte_interface_tous.html")
+    rows = db_query.executer("datacenters_gps", fichier_bdd=fichier_bdd)
+
+    carte = folium.Map(location=CENTRE_INTERFACE, zoom_start=5,
+                       attr='© Contributeurs OpenStreetMap')
+    if leger:
+        ajouter_calque_leger(carte, rows)
+    else:
+        cluster = MarkerCluster(name="Datacenters").add_to(carte)
+        for r in rows:
+            folium.Marker(
+                location=(r.lat, r.lon),
+                popup=folium.Popup(
+                    f"<b>{r.name}</b><br>{r.city} ({r.country})<br>"
+                    f"Reseaux : {r.net_count} | IX : {r.ix_count}", max_width=250),
+                tooltip=r.name,
+                icon=folium.Icon(color='blue', icon='server', prefix='fa')
+            ).add_to(cluster)
+    folium.LayerControl().add_to(carte)
+    carte.save(fichier)
+    return fichier
+
+
+def carte_interface_pays(code_pays, nom_pays, fichier=None, fichier_bdd=FICHIER_BDD,
+                         leger=MODE_LEGER):
+    """Datacenters géolocalisés d'un pays ; None si aucun."""
+    if fichier is None:
+        fichier = os.path.join(BASE_DIR, "output", f"carte_{code_pays.lower()}_interface.html")
+    rows = db_query.executer("datacenters_gps_pays", (code_pays,), fichier_bdd)
+    if not rows:
+        return None
+    centre_lat = sum(r.lat for r in rows) / len(rows)
+    centre_lon = sum(r.lon for r in rows) / len(rows)
+    carte = folium.Map(location=(centre_lat, centre_lon), zoom_start=6,
+                       attr='© Contributeurs OpenStreetMap')
+    if leger:
+        ajouter_calque_leger(carte, rows, f"DC {nom_pays}", couleur='red')
+    else:
+        cluster = MarkerCluster(name=f"DC {nom_pays}").add_to(carte)
+        for r in rows:
+            folium.Marker(
+                location=(r.lat, r.lon),
+                popup=folium.Popup(
+                    f"<b>{r.name}</b><br>{r.city}<br>"
+                    f"Reseaux : {r.net_count} | IX : {r.ix_count}", max_width=250),
+                tooltip=r.name,
+                icon=folium.Icon(color='red', icon='server', prefix='fa')
+            ).add_to(cluster)
+    folium.LayerControl().add_to(carte)
+    carte.save(fichier)
+    return fichier
+
+
 # ============================================================
 def recuperer_datacenters_bdd(fichier_bdd=FICHIER_BDD):
     """
     Récupère dans la BDD tous les datacenters ayant des coordonnées GPS valides.
     Retourne une liste de tuples (nom, lat, lon, popup_html).
     """
-    conn = sqlite3.connect(fichier_bdd)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("""
-        SELECT name, city, country, net_count, ix_count,
-               CAST(latitude  AS REAL) AS lat,
-               CAST(longitude AS REAL) AS lon
-        FROM datacenter
-        WHERE latitude  IS NOT NULL AND latitude  != ''
-          AND longitude IS NOT NULL AND longitude != ''
-          AND CAST(latitude  AS REAL) BETWEEN -90  AND 90
-          AND CAST(longitude AS REAL) BETWEEN -180 AND 180
-    """)
-    rows = c.fetchall()
-    conn.close()
+    rows = db_query.executer("datacenters_gps", fichier_bdd=fichier_bdd)
 
     liste = []
     for r in rows:
         popup = (
-            f"<b>{r['name']}</b><br>"
-            f"Ville : {r['city']} ({r['country']})<br>"
-            f"Réseaux connectés : {r['net_count']}<br>"
-            f"Points d'échange : {r['ix_count']}"
+            f"<b>{r.name}</b><br>"
+            f"Ville : {r.city} ({r.country})<br>"
+            f"Réseaux connectés : {r.net_count}<br>"
+            f"Points d'échange : {r.ix_count}"
         )
-        liste.append((r['name'], r['lat'], r['lon'], popup))
+        liste.append((r.name, r.lat, r.lon, popup))
 
     print(f"{len(liste)} datacenters avec GPS récupérés.")
     return liste
@@ -140,10 +352,13 @@ if __name__ == "__main__":
 
     # -- Carte complète depuis la BDD --
     print("\n=== Carte complète depuis la base de données ===")
-    datacenters = recuperer_datacenters_bdd()
-    creation_carte(
-        liste=datacenters,
-        centre=CENTRE_CARTE,
-        zoom=ZOOM_DEPART,
-        fichier=FICHIER_CARTE
-    )
+    if MODE_LEGER:
+        carte_datacenters(db_query.executer("datacenters_gps"))
+    else:
+        datacenters = recuperer_datacenters_bdd()
+        creation_carte(
+            liste=datacenters,
+            centre=CENTRE_CARTE,
+            zoom=ZOOM_DEPART,
+            fichier=FICHIER_CARTE
+        )
@@ -0,0 +1,293 @@
+# ============================================================
+# colonnes.py – Instantané en colonnes de la table datacenter
+# ============================================================
+# Les datacenters actifs sont lus une fois dans SQLite et rangés en
+# colonnes typées (NumPy) :
+#   - id (int64), net_count / ix_count / carrier_count et lat / lon
+#     (float64, NULL → NaN : ignorés par les agrégats, comme par
+#     SUM / AVG / MIN / MAX en SQL) ;
+#   - country / city / org : codes entiers (int32) + dictionnaire
+#     des valeurs distinctes (codage par dictionnaire).
+# Chaque colonne est un fichier .npy de data/datacenter.colonnes/
+# <empreinte>-v<FORMAT>/ ; les dictionnaires et l'empreinte sont dans
+# meta.json.
+# Les fichiers sont ouverts en mémoire partagée (mmap) : plusieurs
+# processus (ex. cache_cartes.prechauffer) lisent les mêmes pages
+# sans copie. Quand les données changent (empreinte de stats_pays),
+# un nouvel instantané est construit et l'ancien supprimé.
+#
+# Au-dessus : grouper() (nb / somme / moyenne / min / max par pays,
+# ville ou organisation, par bincount) et top_k() (argpartition).
+#
+# Usage : python colonnes.py   (construit l'instantané, exemples d'agrégats)
+# ============================================================
+
+import os
+import json
+import time
+import shutil
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+import db_query
+from cache_cartes import empreinte_donnees, FICHIER_BDD
+
+# colonne numérique → (type NumPy, valeur si NULL), dans l'ordre de la
+# requête colonnes_datacenter (db_query)
+NUMERIQUES = {
+    "id":            (np.int64,   0),
+    "net_count":     (np.float64, np.nan),
+    "ix_count":      (np.float64, np.nan),
+    "carrier_count": (np.float64, np.nan),
+    "lat":           (np.float64, np.nan),
+    "lon":           (np.float64, np.nan),
+}
+# compteurs (entiers en base) : redevenus int (ou None) dans lignes()
+COMPTEURS = ("net_count", "ix_count", "carrier_count")
+# colonnes codées par dictionnaire (country, city, org_name), à la suite
+CODEES = ("country", "city", "org")
+OPERATIONS = ("nb", "somme", "moyenne", "min", "max")
+FORMAT = 2      # à incrémenter quand le contenu des fichiers change
+
+
+def dossier_instantanes(fichier_bdd: str = FICHIER_BDD) -> str:
+    """data/datacenter.colonnes/ (à côté de la base)."""
+    return os.path.splitext(os.path.abspath(fichier_bdd))[0] + ".colonnes"
+
+
+def _nom_instantane(empreinte: str) -> str:
+    return f"{empreinte}-v{FORMAT}"
+
+
+# ============================================================
+# CONSTRUCTION
+# ============================================================
+
+def construire(fichier_bdd: str = FICHIER_BDD, empreinte: str | None = None) -> str:
+    """
+    Lit les datacenters actifs et écrit l'instantané de l'empreinte courante.
+    Retourne son dossier. Les instantanés plus anciens sont supprimés.
+    """
+    empreinte = empreinte or empreinte_donnees(fichier_bdd)
+    racine = dossier_instantanes(fichier_bdd)
+    nom_dossier = _nom_instantane(empreinte)
+    dossier = os.path.join(racine, nom_dossier)
+    temporaire = f"{dossier}.{os.getpid()}.tmp"
+    shutil.rmtree(temporaire, ignore_errors=True)
+    os.makedirs(temporaire)
+
+    curseur = db_query.connexion(fichier_bdd).cursor()
+    curseur.row_factory = None               # tuples bruts : pas de namedtuple par ligne
+    lignes = curseur.execute(db_query.REQUETES["colonnes_datacenter"]).fetchall()
+    valeurs = list(zip(*lignes)) or [()] * (len(NUMERIQUES) + len(CODEES))
+
+    for i, (nom, (type_np, defaut)) in enumerate(NUMERIQUES.items()):
+        colonne = np.array([defaut if v is None else v for v in valeurs[i]], dtype=type_np)
+        np.save(os.path.join(temporaire, f"{nom}.npy"), colonne)
+
+    dictionnaires = {}
+    for j, nom in enumerate(CODEES, start=len(NUMERIQUES)):
+        textes = np.array([v or "" for v in valeurs[j]], dtype=str)
+        distincts, codes = np.unique(textes, return_inverse=True)
+        np.save(os.path.join(temporaire, f"{nom}.npy"), codes.astype(np.int32))
+        dictionnaires[nom] = distincts.tolist()
+
+    with open(os.path.join(temporaire, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"empreinte": empreinte, "nb": len(lignes),
+                   "dictionnaires": dictionnaires}, f, ensure_ascii=False)
+
+    try:
+        os.replace(temporaire, dossier)
+    except OSError:
+        # dossier déjà là : construit entre-temps par un autre processus
+        # (meta.json écrit en dernier, le dossier renommé est complet)
+        shutil.rmtree(temporaire, ignore_errors=True)
+        if not os.path.isdir(dossier):
+            raise
+    for ancien in os.listdir(racine):
+        if ancien != nom_dossier and not ancien.endswith(".tmp"):
+            # un fichier encore ouvert (mmap) ne peut pas être supprimé sous Windows
+            shutil.rmtree(os.path.join(racine, ancien), ignore_errors=True)
+    return dossier
+
+
+# ============================================================
+# INSTANTANÉ
+# ============================================================
+
+class Instantane:
+    """Colonnes d'un instantané (tableaux NumPy en lecture seule, mappés en mémoire)."""
+
+    def __init__(self, dossier: str):
+        with open(os.path.join(dossier, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dossier = dossier
+        self.empreinte = meta["empreinte"]
+        self.dictionnaires = meta["dictionnaires"]
+        self.index_dictionnaires = {nom: {v: code for code, v in enumerate(valeurs)}
+                                    for nom, valeurs in self.dictionnaires.items()}
+        self.colonnes = {}
+        for nom in (*NUMERIQUES, *CODEES):
+            # mmap_mode="r" : pages partagées entre processus, jamais copiées
+            self.colonnes[nom] = np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.colonnes["id"])
+
+    def __getitem__(self, nom: str) -> np.ndarray:
+        return self.colonnes[nom]
+
+    # --------------------------------------------------------
+    def masque(self, **conditions) -> np.ndarray:
+        """
+        Masque booléen des lignes vérifiant colonne == valeur (ex. country="FR"),
+        ou colonne ∈ valeurs si la valeur est une liste (ex. country=["FR", "DE"]).
+        """
+        resultat = np.ones(len(self), dtype=bool)
+        for nom, valeur in conditions.items():
+            plusieurs = isinstance(valeur, (list, tuple, set, frozenset))
+            if nom in CODEES:
+                index = self.index_dictionnaires[nom]
+                valeur = ([index.get(v, -1) for v in valeur] if plusieurs
+                          else index.get(valeur, -1))
+            if plusieurs:
+                resultat &= np.isin(self.colonnes[nom], list(valeur))
+            else:
+                resultat &= self.colonnes[nom] == valeur
+        return resultat
+
+    def _agreger(self, cle, valeur, operation, masque):
+        """(résultats, effectifs) par code de `cle` : tableaux de la taille du dictionnaire."""
+        if operation not in OPERATIONS:
+            raise ValueError(f"Opération inconnue : {operation} ({', '.join(OPERATIONS)})")
+        codes = self.colonnes[cle]
+        valeurs = None if operation == "nb" else np.asarray(self.colonnes[valeur], dtype=float)
+        if valeurs is not None:
+            valides = ~np.isnan(valeurs)           # valeurs NULL
+            masque = valides if masque is None else masque & valides
+        if masque is not None:
+            codes = codes[masque]
+            valeurs = None if valeurs is None else valeurs[masque]
+
+        n = len(self.dictionnaires[cle])
+        effectifs = np.bincount(codes, minlength=n)
+        if operation == "nb":
+            return effectifs, effectifs
+        if operation in ("somme", "moyenne"):
+            resultats = np.bincount(codes, weights=valeurs, minlength=n)
+            if operation == "moyenne":
+                resultats = resultats / np.maximum(effectifs, 1)
+            return resultats, effectifs
+        ufunc = np.maximum if operation == "max" else np.minimum
+        resultats = np.full(n, -np.inf if operation == "max" else np.inf)
+        ufunc.at(resultats, codes, valeurs)
+        return resultats, effectifs
+
+    def _groupes(self, cle, resultats, effectifs, indices) -> list[tuple]:
+        libelles = self.dictionnaires[cle]
+        return [(libelles[i], resultats[i].item(), int(effectifs[i])) for i in indices]
+
+    def grouper(self, cle: str, valeur: str | None = None, operation: str = "nb",
+                masque: np.ndarray | None = None) -> list[tuple]:
+        """
+        Agrège `valeur` par groupe de la colonne codée `cle` :
+        [(libellé, résultat, effectif), ...] des groupes non vides, dans
+        l'ordre du dictionnaire. Les NaN (valeurs NULL) sont ignorés.
+        """
+        resultats, effectifs = self._agreger(cle, valeur, operation, masque)
+        return self._groupes(cle, resultats, effectifs, np.flatnonzero(effectifs))
+
+    def top_groupes(self, cle: str, valeur: str | None = None, operation: str = "nb",
+                    k: int = 10, masque: np.ndarray | None = None) -> list[tuple]:
+        """Les `k` groupes non vides au plus grand résultat, du plus grand au plus petit."""
+        resultats, effectifs = self._agreger(cle, valeur, operation, masque)
+        non_vides = np.flatnonzero(effectifs)
+        choix = self._plus_grands(np.asarray(resultats, dtype=float)[non_vides], k)
+        return self._groupes(cle, resultats, effectifs, non_vides[choix])
+
+    @staticmethod
+    def _plus_grands(valeurs: np.ndarray, k: int) -> np.ndarray:
+        """Positions des `k` plus grandes valeurs, triées (argpartition puis tri de k)."""
+        k = min(k, len(valeurs))
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        choix = np.argpartition(-valeurs, k - 1)[:k]
+        return choix[np.argsort(-valeurs[choix], kind="stable")]
+
+    def top_k(self, colonne: str, k: int = 10, masque: np.ndarray | None = None,
+              decroissant: bool = True) -> np.ndarray:
+        """
+        Indices des `k` lignes aux plus grandes (ou plus petites) valeurs
+        de `colonne` (les valeurs NULL / NaN ne sont jamais retenues).
+        """
+        valeurs = np.asarray(self.colonnes[colonne], dtype=float)
+        valides = ~np.isnan(valeurs)
+        indices = np.flatnonzero(valides if masque is None else masque & valides)
+        cles = valeurs[indices] if decroissant else -valeurs[indices]
+        return indices[self._plus_grands(cles, k)]
+
+    def lignes(self, indices) -> list[dict]:
+        """Lignes décodées (dictionnaires colonne → valeur) des `indices`."""
+        resultat = []
+        for i in np.atleast_1d(indices):
+            ligne = {nom: self.colonnes[nom][i].item() for nom in NUMERIQUES}
+            for nom in COMPTEURS:
+                ligne[nom] = None if np.isnan(ligne[nom]) else int(ligne[nom])
+            for nom in CODEES:
+                ligne[nom] = self.dictionnaires[nom][self.colonnes[nom][i]]
+            resultat.append(ligne)
+        return resultat
+
+
+# ============================================================
+# CHARGEMENT (un instantané par état des données)
+# ============================================================
+
+@lru_cache(maxsize=2)
+def _instantane(fichier_bdd: str, empreinte: str) -> Instantane:
+    dossier = os.path.join(dossier_instantanes(fichier_bdd), _nom_instantane(empreinte))
+    if not os.path.exists(os.path.join(dossier, "meta.json")):
+        dossier = construire(fichier_bdd, empreinte)
+    return Instantane(dossier)
+
+
+def instantane(fichier_bdd: str = FICHIER_BDD) -> Instantane:
+    """Instantané des données courantes (construit au premier appel après un changement)."""
+    return _instantane(os.path.abspath(fichier_bdd), empreinte_donnees(fichier_bdd))
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Construit l'instantané en colonnes et affiche quelques agrégats."
+    )
+    parser.add_argument("--reconstruire", action="store_true",
+                        help="Reconstruit l'instantané même s'il est à jour")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    if args.reconstruire:
+        construire()
+    t = instantane()
+    print(f"{len(t)} datacenters en colonnes ({time.perf_counter() - debut:.3f} s) → {t.dossier}")
+
+    def chrono(titre, fonction):
+        debut = time.perf_counter()
+        resultat = fonction()
+        print(f"\n=== {titre} ({(time.perf_counter() - debut) * 1e6:.0f} µs) ===")
+        return resultat
+
+    for pays, nb, _ in chrono("Top 5 pays", lambda: t.top_groupes("country", k=5)):
+        print(f"  {pays:4s} {nb:6d}")
+    for pays, moyenne, nb in chrono("Moyenne de réseaux par pays (top 5)",
+                                    lambda: t.top_groupes("country", "net_count",
+                                                          "moyenne", k=5)):
+        print(f"  {pays:4s} {moyenne:7.1f}  ({nb} DC)")
+    for org, somme, nb in chrono("Organisations les plus connectées (somme des réseaux)",
+                                 lambda: t.top_groupes("org", "net_count", "somme", k=5)):
+        print(f"  {org[:35]:35s} {somme:8.0f}  ({nb} DC)")
+    for r in t.lignes(chrono("Top 5 DC de France (réseaux)",
+                             lambda: t.top_k("net_count", 5, t.masque(country="FR")))):
+        print(f"  {r['net_count']:5d}  {r['city']:15s} {r['org'][:40]}")
@@ -0,0 +1,307 @@
+# ============================================================
+# db_query.py – Couche d'accès aux données (lecture)
+# Jeu de données : PeeringDB – Datacenters européens
+# ============================================================
+# Point d'entrée unique des lectures de interface.py, carte.py
+# et jointure.py :
+#   - une connexion par thread et par fichier, ouverte (et migrée)
+#     une seule fois puis réutilisée ;
+#   - un registre de requêtes nommées : le texte SQL étant toujours
+#     le même, sqlite3 réutilise la requête déjà préparée (cache de
+#     CACHE_REQUETES instructions par connexion) ;
+#   - des lignes renvoyées sous forme de namedtuple (r.name, r.lat).
+#
+# Usage : python db_query.py   (exécute les 15 requêtes de queries.sql)
+# ============================================================
+
+import os
+import re
+import atexit
+import sqlite3
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+from schema import connecter, CONDITION_GPS, CONDITION_ACTIF
+
+BASE_DIR        = os.path.dirname(os.path.abspath(__file__))
+FICHIER_BDD     = os.path.join(BASE_DIR, "data", "datacenter.sqlite3")
+FICHIER_SQL     = os.path.join(BASE_DIR, "queries.sql")
+CACHE_REQUETES  = 256      # instructions préparées gardées par connexion
+
+
+# ============================================================
+# CONNEXIONS (une par thread)
+# ============================================================
+
+_local = threading.local()
+_toutes = []                 # pour les fermer à la sortie
+_verrou = threading.Lock()
+
+
+def ligne_namedtuple(cursor, row):
+    """row_factory : chaque ligne devient un namedtuple (champs = colonnes)."""
+    return _type_ligne(tuple(d[0] for d in cursor.description))(*row)
+
+
+@lru_cache(maxsize=256)
+def _type_ligne(champs: tuple):
+    return namedtuple("Ligne", champs, rename=True)
+
+
+def connexion(fichier_bdd: str = FICHIER_BDD):
+    """Connexion du thread courant à `fichier_bdd` (ouverte au premier appel)."""
+    connexions = getattr(_local, "connexions", None)
+    if connexions is None:
+        connexions = _local.connexions = {}
+    chemin = os.path.abspath(fichier_bdd)
+    conn = connexions.get(chemin)
+    if conn is None:
+        conn = connecter(chemin, cached_statements=CACHE_REQUETES)
+        conn.row_factory = ligne_namedtuple
+        connexions[chemin] = conn
+        with _verrou:
+            _toutes.append(conn)
+    return conn
+
+
+def fermer():
+    """Ferme les connexions du thread courant."""
+    for conn in getattr(_local, "connexions", {}).values():
+        conn.close()
+        with _verrou:
+            if conn in _toutes:
+                _toutes.remove(conn)
+    _local.connexions = {}
+
+
+@atexit.register
+def _fermer_tout():
+    with _verrou:
+        for conn in _toutes:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:   # créée dans un autre thread
+                pass
+        _toutes.clear()
+
+
+# ============================================================
+# REGISTRE DES REQUÊTES
+# ============================================================
+
+REQUETES = {}       # nom → texte SQL
+TITRES   = {}       # nom → description
+
+
+def enregistrer(nom: str, sql: str, titre: str = ""):
+    """Ajoute une requête nommée au registre."""
+    if nom in REQUETES:
+        raise ValueError(f"Requête déjà enregistrée : {nom}")
+    REQUETES[nom] = sql.strip()
+    TITRES[nom] = titre or nom
+
+
+def charger_fichier_sql(fichier: str = FICHIER_SQL) -> list[tuple[int, str, str]]:
+    """
+    Découpe queries.sql en (numéro, titre, requête) : chaque requête est
+    précédée d'un commentaire « -- N. Titre ».
+    """
+    with open(fichier, encoding="utf-8") as f:
+        texte = f.read()
+    blocs = re.split(r"^-- (\d+)\. (.*)$", texte, flags=re.MULTILINE)
+    requetes = []
+    for i in range(1, len(blocs) - 2, 3):
+        sql = "\n".join(l for l in blocs[i + 2].splitlines()
+                        if not l.startswith("--")).strip().rstrip(";")
+        requetes.append((int(blocs[i]), blocs[i + 1].strip(), sql))
+    return requetes
+
+
+# --- Datacenters avec coordonnées GPS valides (requête de référence) ---
+COLONNES_GPS = """id, name, city, country, net_count, ix_count, website,
+           latitude  AS lat,
+           longitude AS lon"""
+
+enregistrer("datacenters_gps", f"""
+    SELECT {COLONNES_GPS}
+    FROM datacenter
+    WHERE {CONDITION_GPS} AND {CONDITION_ACTIF}
+""", "Datacenters actifs avec coordonnées GPS")
+
+enregistrer("datacenters_gps_pays", f"""
+    SELECT {COLONNES_GPS}
+    FROM datacenter
+    WHERE country = ? AND {CONDITION_GPS} AND {CONDITION_ACTIF}
+""", "Datacenters actifs d'un pays avec coordonnées GPS")
+
+# --- Interface (agrégats lus dans stats_pays, une ligne par pays) ---
+enregistrer("stats_globales", """
+    SELECT nb                               AS total,
+           ROUND(somme_net * 1.0 / nb, 1)   AS moy_reseau,
+           max_net                          AS max_reseau,
+           ROUND(somme_ix * 1.0 / nb, 1)    AS moy_ix,
+           max_ix                           AS max_ix,
+           nb_gps                           AS avec_gps
+    FROM stats_pays
+    WHERE pays = ?
+""", "Statistiques globales")
+
+enregistrer("liste_pays", """
+    SELECT p.code_pays, p.nom_pays, COALESCE(s.nb, 0) AS nb
+    FROM pays p
+    LEFT JOIN stats_pays s ON s.pays = p.code_pays
+    ORDER BY p.nom_pays
+""", "Pays (table pays) et nombre de datacenters")
+
+enregistrer("liste_pays_sans_table", """
+    SELECT pays AS code_pays, pays AS nom_pays, nb
+    FROM stats_pays
+    WHERE pays != ?
+    ORDER BY pays
+""", "Pays (sans table pays) et nombre de datacenters")
+
+enregistrer("datacenters_pays", f"""
+    SELECT id, name, city, net_count, ix_count,
+           latitude  AS lat,
+           longitude AS lon,
+           website
+    FROM datacenter
+    WHERE country = ? AND {CONDITION_ACTIF}
+    ORDER BY net_count DESC
+""", "Datacenters d'un pays")
+
+# --- Liste paginée d'un pays (liste_virtuelle.py) ---
+# Une paire de requêtes par colonne de tri et par sens :
+#   datacenters_pays_<col>_<sens>        : page n° k (LIMIT ? OFFSET ?), pour un saut ;
+#   datacenters_pays_<col>_<sens>_apres  : page qui suit la ligne (valeur, id)
+#                                          donnée (pagination par clé).
+# Les deux parcourent l'index (country, <col>) : pas de tri en mémoire.
+COLONNES_TRI = ("net_count", "ix_count", "name", "city")
+
+
+def enregistrer_pages(nom: str, select: str, where: str, colonnes_tri=COLONNES_TRI):
+    """
+    Enregistre les requêtes paginées `nom`_<col>_<asc|desc>[_apres].
+    SQLite range les NULL en tête en ASC et en queue en DESC : en DESC,
+    les lignes dont `col` est NULL suivent toute clé non NULL, et la
+    comparaison (NULL, id) < (?, ?) ne les renvoie jamais – d'où le
+    « OR col IS NULL ».
+    """
+    for col in colonnes_tri:
+        for sens, cle in (("asc", f"({col}, id) > (?, ?)"),
+                          ("desc", f"(({col}, id) < (?, ?) OR {col} IS NULL)")):
+            ordre = f"ORDER BY {col} {sens.upper()}, id {sens.upper()}"
+            enregistrer(f"{nom}_{col}_{sens}",
+                        f"{select} WHERE {where} {ordre} LIMIT ? OFFSET ?",
+                        f"{nom} triés par {col} ({sens}), par position")
+            enregistrer(f"{nom}_{col}_{sens}_apres",
+                        f"{select} WHERE {where} AND {cle} {ordre} LIMIT ?",
+                        f"{nom} triés par {col} ({sens}), après une clé")
+
+
+enregistrer_pages("datacenters_pays",
+                  "SELECT id, name, city, net_count, ix_count FROM datacenter",
+                  f"country = ? AND {CONDITION_ACTIF}")
+
+# --- Recherche plein texte (recherche.py) ---
+enregistrer("recherche_datacenters", f"""
+    SELECT d.id, d.name, d.org_name, d.city, d.country, d.net_count, d.ix_count
+    FROM datacenter_fts f
+    JOIN datacenter d ON d.id = f.rowid
+    WHERE datacenter_fts MATCH ? AND d.{CONDITION_ACTIF}
+    ORDER BY f.rank
+    LIMIT ?
+""", "Datacenters correspondant à une recherche FTS5, les plus pertinents d'abord")
+
+enregistrer("top_reseaux", f"""
+    SELECT name, city, country, net_count, ix_count
+    FROM datacenter
+    WHERE {CONDITION_ACTIF}
+    ORDER BY net_count DESC
+    LIMIT ?
+""", "Datacenters les plus connectés")
+
+enregistrer("colonnes_datacenter", f"""
+    SELECT id, net_count, ix_count, carrier_count,
+           latitude, longitude,
+           country, city, org_name
+    FROM datacenter
+    WHERE {CONDITION_ACTIF}
+    ORDER BY id
+""", "Datacenters actifs pour l'instantané en colonnes (colonnes.py)")
+
+# --- Jointures stats_pays ⨝ pays ---
+enregistrer("pays_noms", """
+    SELECT code_pays, nom_pays, population FROM pays
+""", "Nom complet et population des pays (jointure avec l'instantané en colonnes)")
+
+enregistrer("jointure_capitales", """
+    SELECT p.nom_pays, p.code_pays,
+           p.lat_capitale, p.lon_capitale,
+           p.capitale,
+           COALESCE(s.nb, 0)                   AS nb_dc,
+           ROUND(s.somme_net * 1.0 / s.nb, 1)  AS moy_reseaux
+    FROM pays p
+    LEFT JOIN stats_pays s ON s.pays = p.code_pays
+    ORDER BY nb_dc DESC
+""", "Nombre de datacenters par pays, positionnés sur la capitale")
+
+enregistrer("capitales", """
+    SELECT code_pays, nom_pays, capitale, lat_capitale AS lat, lon_capitale AS lon
+    FROM pays
+    WHERE lat_capitale IS NOT NULL AND lon_capitale IS NOT NULL
+    ORDER BY nom_pays
+""", "Capitales des pays (coordonnées)")
+
+enregistrer("stats_pays", """
+    SELECT * FROM stats_pays WHERE pays = ?
+""", "Agrégats d'un pays (PAYS_GLOBAL : tous pays)")
+
+enregistrer("empreinte_donnees", """
+    SELECT revision, nb, nb_gps FROM stats_pays WHERE pays = ?
+""", "Empreinte des données (cache des cartes)")
+
+enregistrer("jointure_detail_pays", f"""
+    SELECT d.name, d.city, d.net_count, d.ix_count,
+           d.website, p.nom_pays,
+           d.latitude  AS lat,
+           d.longitude AS lon
+    FROM datacenter d
+    JOIN pays p ON d.country = p.code_pays
+    WHERE p.code_pays = ?
+      AND d.latitude IS NOT NULL AND d.longitude IS NOT NULL
+      AND d.{CONDITION_ACTIF}
+    ORDER BY d.city
+""", "Datacenters d'un pays avec GPS (nom complet du pays)")
+
+# --- Les 15 requêtes de queries.sql (activité 4) ---
+for _numero, _titre, _sql in charger_fichier_sql():
+    enregistrer(f"sql_{_numero:02d}", _sql, _titre)
+
+
+# ============================================================
+# EXÉCUTION
+# ============================================================
+
+def executer(nom: str, parametres=(), fichier_bdd: str = FICHIER_BDD) -> list:
+    """Exécute la requête `nom` du registre et renvoie toutes les lignes."""
+    return connexion(fichier_bdd).execute(REQUETES[nom], parametres).fetchall()
+
+
+def une(nom: str, parametres=(), fichier_bdd: str = FICHIER_BDD):
+    """Exécute la requête `nom` et renvoie la première ligne (ou None)."""
+    return connexion(fichier_bdd).execute(REQUETES[nom], parametres).fetchone()
+
+
+# ============================================================
+if __name__ == "__main__":
+    for nom in sorted(n for n in REQUETES if n.startswith("sql_")):
+        lignes = executer(nom)
+        print(f"\n=== {nom[4:]}. {TITRES[nom]} ===")
+        if lignes:
+            print("  " + " | ".join(lignes[0]._fields))
+        for ligne in lignes[:15]:
+            print("  " + " | ".join(str(v) for v in ligne))
+        if len(lignes) > 15:
+            print(f"  … ({len(lignes)} lignes)")
@@ -0,0 +1,225 @@
+# ============================================================
+# gazetteer.py – Index local de codes postaux et de villes
+# Sources : dumps GeoNames (https://download.geonames.org/export/)
+#   - codes postaux : export/zip/allCountries.txt (12 colonnes)
+#   - villes        : export/dump/cities500.txt   (19 colonnes)
+# ============================================================
+# Les dumps sont chargés une fois dans un index SQLite
+# (data/gazetteer.sqlite3) ; les recherches « code postal + pays »
+# et « ville + pays » se font ensuite sans réseau, par clé primaire.
+#
+# Usage : python gazetteer.py [--postal FICHIER] [--villes FICHIER]
+#                             [--index FICHIER]
+# ============================================================
+
+import os
+import re
+import csv
+import sqlite3
+import argparse
+import unicodedata
+from functools import lru_cache
+
+BASE_DIR       = os.path.dirname(os.path.abspath(__file__))
+FICHIER_INDEX  = os.path.join(BASE_DIR, "data", "gazetteer.sqlite3")
+TAILLE_LOT     = 10000
+
+# Position des colonnes utiles dans les dumps GeoNames
+POSTAL_PAYS, POSTAL_CODE, POSTAL_LAT, POSTAL_LON = 0, 1, 9, 10
+VILLE_NOM, VILLE_ASCII, VILLE_ALTERNATIFS = 1, 2, 3
+VILLE_LAT, VILLE_LON, VILLE_PAYS, VILLE_POPULATION = 4, 5, 8, 14
+
+
+# ============================================================
+# NORMALISATION DES CLÉS
+# ============================================================
+
+def cle_ville(nom: str) -> str:
+    """'Saint-Étienne ' → 'saint etienne' (sans accents ni ponctuation)."""
+    nom = unicodedata.normalize("NFKD", nom)
+    nom = "".join(ch for ch in nom if not unicodedata.combining(ch)).casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", nom).split())
+
+
+def cles_postales(code: str) -> list[str]:
+    """
+    Clés candidates pour un code postal, de la plus précise à la moins précise :
+    'L-6922' → ['6922'], '1098 XG' → ['1098XG', '1098'], 'E14 2AA' → ['E142AA', 'E14'].
+    """
+    code = code.strip().upper()
+    # Préfixe pays collé au code (« L-6922 », « D-60528 », « FR-75001 »)
+    code = re.sub(r"^[A-Z]{1,2}-(?=\d)", "", code)
+    cles = []
+    compact = code.replace(" ", "")
+    if compact:
+        cles.append(compact)
+    premier = code.split(" ")[0]
+    if premier and premier not in cles:
+        cles.append(premier)
+    return cles
+
+
+# ============================================================
+# CONSTRUCTION DE L'INDEX
+# ============================================================
+
+def creer_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS gaz_postal (
+            pays TEXT, cle TEXT, latitude REAL, longitude REAL,
+            PRIMARY KEY (pays, cle)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS gaz_ville (
+            pays TEXT, cle TEXT, latitude REAL, longitude REAL, population INTEGER,
+            PRIMARY KEY (pays, cle)
+        ) WITHOUT ROWID
+    """)
+
+
+def _lignes_tsv(fichier: str):
+    with open(fichier, encoding="utf-8", newline="") as f:
+        yield from csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+
+
+def _inserer_par_lots(conn, requete: str, lignes):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= TAILLE_LOT:
+            conn.executemany(requete, lot)
+            lot.clear()
+    if lot:
+        conn.executemany(requete, lot)
+
+
+def charger_postal(conn, fichier: str) -> int:
+    """Importe un dump GeoNames de codes postaux (plusieurs lieux par code → moyenne)."""
+    def lignes():
+        for r in _lignes_tsv(fichier):
+            if len(r) < 11 or not r[POSTAL_LAT]:
+                continue
+            for cle in cles_postales(r[POSTAL_CODE]):
+                yield (r[POSTAL_PAYS], cle, float(r[POSTAL_LAT]), float(r[POSTAL_LON]))
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_postal (pays, cle, latitude, longitude)")
+    conn.execute("DELETE FROM tmp_postal")
+    _inserer_par_lots(conn, "INSERT INTO tmp_postal VALUES (?, ?, ?, ?)", lignes())
+    conn.execute("""
+        INSERT OR REPLACE INTO gaz_postal
+        SELECT pays, cle, ROUND(AVG(latitude), 6), ROUND(AVG(longitude), 6)
+        FROM tmp_postal GROUP BY pays, cle
+    """)
+    conn.execute("DROP TABLE tmp_postal")
+    return conn.execute("SELECT COUNT(*) FROM gaz_postal").fetchone()[0]
+
+
+def charger_villes(conn, fichier: str) -> int:
+    """Importe un dump GeoNames de villes (nom, nom ASCII et noms alternatifs)."""
+    def lignes():
+        for r in _lignes_tsv(fichier):
+            if len(r) < 15:
+                continue
+            population = int(r[VILLE_POPULATION] or 0)
+            noms = {r[VILLE_NOM], r[VILLE_ASCII], *r[VILLE_ALTERNATIFS].split(",")}
+            for cle in {cle_ville(n) for n in noms if n}:
+                if cle:
+                    yield (r[VILLE_PAYS], cle, float(r[VILLE_LAT]), float(r[VILLE_LON]),
+                           population)
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_ville "
+                 "(pays, cle, latitude, longitude, population)")
+    conn.execute("DELETE FROM tmp_ville")
+    _inserer_par_lots(conn, "INSERT INTO tmp_ville VALUES (?, ?, ?, ?, ?)", lignes())
+    # Homonymes : on garde la ville la plus peuplée (colonnes de la ligne du MAX)
+    conn.execute("""
+        INSERT OR REPLACE INTO gaz_ville
+        SELECT pays, cle, latitude, longitude, MAX(population)
+        FROM tmp_ville GROUP BY pays, cle
+    """)
+    conn.execute("DROP TABLE tmp_ville")
+    return conn.execute("SELECT COUNT(*) FROM gaz_ville").fetchone()[0]
+
+
+def construire_index(fichier_index: str = FICHIER_INDEX, postal: str | None = None,
+                     villes: str | None = None) -> tuple[int, int]:
+    """Crée (ou complète) l'index SQLite à partir des dumps GeoNames."""
+    conn = sqlite3.connect(fichier_index)
+    creer_tables(conn)
+    with conn:
+        nb_postal = charger_postal(conn, postal) if postal else 0
+        nb_villes = charger_villes(conn, villes) if villes else 0
+    conn.close()
+    return nb_postal, nb_villes
+
+
+# ============================================================
+# RECHERCHE
+# ============================================================
+
+class Gazetteer:
+    """
+    Recherche locale de coordonnées par code postal ou par ville.
+    `source` est un index SQLite construit par construire_index(),
+    ou directement un dump GeoNames (.txt), indexé alors en mémoire.
+    """
+
+    def __init__(self, source: str = FICHIER_INDEX):
+        if source.endswith(".txt"):
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+            creer_tables(self.conn)
+            with open(source, encoding="utf-8") as f:
+                nb_colonnes = len(f.readline().split("\t"))
+            if nb_colonnes >= 15:
+                charger_villes(self.conn, source)
+            else:
+                charger_postal(self.conn, source)
+        else:
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"Index gazetteer introuvable : {source}")
+            self.conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True,
+                                        check_same_thread=False)
+        self.par_code_postal = lru_cache(maxsize=65536)(self._par_code_postal)
+        self.par_ville = lru_cache(maxsize=65536)(self._par_ville)
+
+    def _par_code_postal(self, pays: str, code: str) -> tuple[float, float] | None:
+        """Coordonnées du code postal `code` dans `pays` (code ISO), ou None."""
+        for cle in cles_postales(code):
+            r = self.conn.execute(
+                "SELECT latitude, longitude FROM gaz_postal WHERE pays = ? AND cle = ?",
+                (pays.upper(), cle)
+            ).fetchone()
+            if r:
+                return r[0], r[1]
+        return None
+
+    def _par_ville(self, pays: str, ville: str) -> tuple[float, float] | None:
+        """Coordonnées de la ville `ville` dans `pays` (code ISO), ou None."""
+        r = self.conn.execute(
+            "SELECT latitude, longitude FROM gaz_ville WHERE pays = ? AND cle = ?",
+            (pays.upper(), cle_ville(ville))
+        ).fetchone()
+        return (r[0], r[1]) if r else None
+
+    def close(self):
+        self.conn.close()
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Construit l'index local (GeoNames) utilisé par geocode.py."
+    )
+    parser.add_argument("--postal", metavar="FICHIER",
+                        help="Dump GeoNames des codes postaux (ex. allCountries.txt)")
+    parser.add_argument("--villes", metavar="FICHIER",
+                        help="Dump GeoNames des villes (ex. cities500.txt)")
+    parser.add_argument("--index", default=FICHIER_INDEX, metavar="FICHIER",
+                        help="Index SQLite à écrire (défaut : data/gazetteer.sqlite3)")
+    args = parser.parse_args()
+    if not args.postal and not args.villes:
+        parser.error("indiquer au moins --postal ou --villes")
+
+    nb_postal, nb_villes = construire_index(args.index, args.postal, args.villes)
+    print(f"{nb_postal} codes postaux, {nb_villes} noms de villes → {args.index}")
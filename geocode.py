@@ -1,9 +1,35 @@
 # ============================================================
 # geocode.py – Géocodage des datacenters sans coordonnées GPS
-# Utilise Nominatim (OpenStreetMap) via geopy
+# Utilise Nominatim (OpenStreetMap) via geopy, et/ou un index
+# local GeoNames (gazetteer.py) qui fonctionne sans réseau
 # ============================================================
 # Installation : pip install geopy
 # Usage        : python geocode.py [--dry-run] [--limit N]
+#                                 [--ttl-succes J] [--ttl-echec J]
+#                                 [--gazetteer FICHIER [--hors-ligne]]
+#                                 [--endpoint DOMAINE[=DEBIT] ...]
+#                                 [--travailleurs N] [--stub]
+#                                 [--resume [JOURS]]
+# ============================================================
+# Chaque variante d'adresse est d'abord cherchée dans la table
+# `geocode_cache` (adresse normalisée → coordonnées ou échec) :
+# seules les adresses jamais vues (ou expirées) partent vers
+# Nominatim, et le délai ne s'applique qu'à ces requêtes.
+#
+# Avec --gazetteer, les variantes « code postal » et « ville »
+# sont résolues localement ; Nominatim ne reçoit plus que les
+# adresses complètes (rue). --hors-ligne n'utilise aucun réseau.
+#
+# Les adresses identiques de plusieurs datacenters ne sont demandées
+# qu'une fois, et les requêtes partent en parallèle (ordonnanceur.py) :
+# chaque serveur (--endpoint, répétable) a son propre seau à jetons,
+# le débit total est la somme des débits. --stub remplace le réseau
+# par un faux géocodeur.
+#
+# Les résultats sont écrits par lots (TAILLE_LOT résultats ou
+# DELAI_COMMIT secondes) et chaque ligne traitée est notée dans
+# `geocode_progression` (statut, nombre de tentatives) : après une
+# interruption, --resume ignore les lignes déjà tentées récemment.
 # ============================================================
 # Atention : 1 requete/seconde max, User-Agent et obligatoire
 # ============================================================
@@ -14,6 +40,9 @@ import argparse
 import sys
 import os
 import ssl
+import threading
+import unicodedata
+from collections import namedtuple, defaultdict
 
 try:
     import certifi
@@ -24,42 +53,253 @@ try:
     _ssl_ctx = ssl.create_default_context(cafile=certifi.where())
     import geopy.geocoders
     geopy.geocoders.options.default_ssl_context = _ssl_ctx
+    _erreur_import = None
 except ImportError as e:
-    print(f"Il manque une dépendance : {e}\n   Lance : pip install geopy certifi")
-    sys.exit(1)
+    # geopy n'est indispensable que pour interroger Nominatim
+    Nominatim = None
+    _erreur_import = e
+
+    class GeocoderTimedOut(Exception):
+        pass
+
+    class GeocoderServiceError(Exception):
+        pass
+
+from schema import connecter, rafraichir_stats, CONDITION_ACTIF, CONDITION_GPS
+from gazetteer import Gazetteer
+from ordonnanceur import SeauJetons, Ordonnanceur, GeocodeurStub
 
 # -------------------- CONSTANTES ----------------------------
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 FICHIER_BDD = os.path.join(BASE_DIR, "data", "datacenter.sqlite3")
 DELAI       = 1.1          # secondes entre chaque requête (>1 selon ToS)
 MAX_RETRIES = 3
+SOURCE      = "nominatim"
+TTL_SUCCES  = 365          # jours de validité d'une adresse trouvée
+TTL_ECHEC   = 30           # jours avant de retenter une adresse introuvable
+JOUR        = 86400
+USER_AGENT  = "OpenCenter-Geocoder/1.0"
+TRAVAILLEURS = 2           # threads par backend distant
+TAILLE_LOT   = 50          # résultats écrits par transaction...
+DELAI_COMMIT = 5.0         # ...ou toutes les N secondes au plus
+REPRISE      = 1.0         # jours : fenêtre par défaut de --resume
+STATUT_OK    = "ok"
+STATUT_ECHEC = "echec"
+
+# Niveaux de précision des variantes d'adresse
+NIVEAU_RUE    = "rue"      # adresse complète
+NIVEAU_POSTAL = "postal"   # code postal + ville + pays
+NIVEAU_VILLE  = "ville"    # ville + pays
+
+TOUS_NIVEAUX  = (NIVEAU_RUE, NIVEAU_POSTAL, NIVEAU_VILLE)
+
+Variante = namedtuple("Variante", "niveau texte pays code_postal ville")
+
+# Datacenters actifs sans coordonnées valides (CONDITION_GPS ; ceux
+# supprimés en amont, gardés par ingest.py --sync, ne consomment pas
+# de requêtes)
+REQUETE_MANQUANTS = f"""
+    SELECT id, name, city, country, address1, address2,
+           state, zipcode, latitude, longitude
+    FROM datacenter
+    WHERE NOT ({CONDITION_GPS}) AND {CONDITION_ACTIF}
+    ORDER BY country, city
+"""
+
+# Lignes déjà tentées depuis une date donnée (mode --resume)
+FILTRE_REPRISE = "id NOT IN (SELECT id FROM geocode_progression WHERE date >= ?)"
 
 
 # ============================================================
-def geocoder_adresse(geocoder, adresse: str) -> tuple[float, float] | None:
+def interroger(geocoder, adresse: str,
+               avant_requete=None) -> tuple[tuple[float, float] | None, bool]:
     """
-    Tente de géocoder une adresse.
-    Retourne (lat, lon) ou None si introuvable.
+    Interroge le service pour une adresse.
+    Retourne (coords, definitif) : coords vaut (lat, lon) ou None ;
+    definitif est False si le service n'a pas pu répondre (timeout,
+    erreur), auquel cas l'échec ne doit pas être mis en cache.
+    `avant_requete()` est appelée avant chaque tentative, nouvelles
+    tentatives comprises (BackendDistant : prise d'un jeton du seau).
     """
     for tentative in range(MAX_RETRIES):
+        if avant_requete:
+            avant_requete()
         try:
             location = geocoder.geocode(adresse, timeout=10)
             if location:
-                return round(location.latitude, 6), round(location.longitude, 6)
-            return None
+                return (round(location.latitude, 6), round(location.longitude, 6)), True
+            return None, True
         except GeocoderTimedOut:
             if tentative < MAX_RETRIES - 1:
                 time.sleep(2)
         except GeocoderServiceError as e:
             print(f"Erreur service : {e}")
-            return None
-    return None
+            return None, False
+    return None, False
 
 
-def construire_adresse(row) -> list[str]:
+def geocoder_adresse(geocoder, adresse: str) -> tuple[float, float] | None:
+    """
+    Tente de géocoder une adresse.
+    Retourne (lat, lon) ou None si introuvable.
+    """
+    return interroger(geocoder, adresse)[0]
+
+
+# ============================================================
+# BACKENDS DE GÉOCODAGE
+# ============================================================
+# Un backend expose :
+#   nom       : source enregistrée dans le cache
+#   distant   : True s'il passe par le réseau (cache + débit limité,
+#               attribut `seau`, appelé depuis plusieurs threads)
+#   accepte(variante) -> bool
+#   geocoder(variante) -> (coords, definitif)
+
+class BackendDistant:
+    """
+    Service de géocodage en ligne (objet au format geopy), dont le débit
+    est limité par son propre SeauJetons ; utilisable depuis plusieurs threads.
+    """
+
+    distant = True
+
+    def __init__(self, geocodeur, nom: str = SOURCE, niveaux=TOUS_NIVEAUX,
+                 debit: float = 1 / DELAI):
+        self.geocodeur = geocodeur
+        self.nom = nom
+        self.niveaux = set(niveaux)
+        self.seau = SeauJetons(debit)
+        self.requetes = 0
+        self._verrou = threading.Lock()
+
+    def accepte(self, variante: Variante) -> bool:
+        return variante.niveau in self.niveaux
+
+    def _avant_requete(self):
+        # chaque tentative (y compris après un timeout) est une requête
+        # et consomme un jeton : le débit reste celui du seau
+        self.seau.acquerir()
+        with self._verrou:
+            self.requetes += 1
+
+    def geocoder(self, variante: Variante):
+        return interroger(self.geocodeur, variante.texte, self._avant_requete)
+
+
+class BackendNominatim(BackendDistant):
+    """Service Nominatim (OSM) ; `domaine` permet de viser un autre serveur."""
+
+    def __init__(self, niveaux=TOUS_NIVEAUX, user_agent: str = USER_AGENT,
+                 domaine: str | None = None, debit: float = 1 / DELAI):
+        if Nominatim is None:
+            raise RuntimeError(f"Il manque une dépendance : {_erreur_import}\n"
+                               "   Lance : pip install geopy certifi")
+        options = {"domain": domaine} if domaine else {}
+        super().__init__(Nominatim(user_agent=user_agent, **options), SOURCE,
+                         niveaux, debit)
+
+
+class BackendGazetteer:
+    """Index local GeoNames : codes postaux et villes, sans réseau."""
+
+    nom = "gazetteer"
+    distant = False
+
+    def __init__(self, source: str):
+        self.gazetteer = source if isinstance(source, Gazetteer) else Gazetteer(source)
+
+    def accepte(self, variante: Variante) -> bool:
+        return variante.niveau in (NIVEAU_POSTAL, NIVEAU_VILLE) and bool(variante.pays)
+
+    def geocoder(self, variante: Variante):
+        if variante.niveau == NIVEAU_POSTAL:
+            coords = self.gazetteer.par_code_postal(variante.pays, variante.code_postal)
+        else:
+            coords = self.gazetteer.par_ville(variante.pays, variante.ville)
+        return coords, True
+
+
+def lire_endpoint(texte: str) -> tuple[str, float]:
+    """'nominatim.exemple.org=2' → ('nominatim.exemple.org', 2.0) ; débit par défaut 1/DELAI."""
+    domaine, _, debit = texte.partition("=")
+    return domaine.strip(), float(debit) if debit else 1 / DELAI
+
+
+def construire_backends(gazetteer: str | None = None, hors_ligne: bool = False,
+                        endpoints=None, stub: bool = False) -> list:
+    """
+    Backends dans l'ordre où ils sont essayés :
+    - sans gazetteer : service distant pour toutes les variantes ;
+    - avec gazetteer : index local, puis service distant pour les adresses de rue ;
+    - hors ligne     : index local uniquement.
+    `endpoints` est une liste de (domaine, débit) : un backend Nominatim
+    (avec son propre débit) par serveur. `stub` remplace le réseau par
+    un GeocodeurStub.
+    """
+    if hors_ligne and not gazetteer:
+        raise ValueError("Le mode hors ligne nécessite un gazetteer.")
+    backends = [BackendGazetteer(gazetteer)] if gazetteer else []
+    if hors_ligne:
+        return backends
+
+    niveaux = (NIVEAU_RUE,) if gazetteer else TOUS_NIVEAUX
+    if stub:
+        backends.append(BackendDistant(GeocodeurStub(), "stub", niveaux, debit=50))
+    else:
+        for domaine, debit in endpoints or [(None, 1 / DELAI)]:
+            backends.append(BackendNominatim(niveaux, domaine=domaine, debit=debit))
+    return backends
+
+
+# ============================================================
+# CACHE DE GÉOCODAGE
+# ============================================================
+
+def normaliser_adresse(adresse: str) -> str:
+    """Clé du cache : minuscules, Unicode NFKC, espaces et virgules uniformisés."""
+    adresse = unicodedata.normalize("NFKC", adresse).casefold()
+    parties = (" ".join(p.split()) for p in adresse.split(","))
+    return ", ".join(p for p in parties if p)
+
+
+def lire_cache(c, adresse: str, ttl_succes: int = TTL_SUCCES,
+               ttl_echec: int = TTL_ECHEC, maintenant: float | None = None):
+    """
+    Cherche une adresse dans `geocode_cache`.
+    Retourne (trouve, coords) : trouve est False si l'adresse est absente
+    ou expirée ; sinon coords vaut (lat, lon) ou None (échec connu).
+    """
+    c.execute("SELECT latitude, longitude, date FROM geocode_cache WHERE adresse = ?",
+              (normaliser_adresse(adresse),))
+    ligne = c.fetchone()
+    if ligne is None:
+        return False, None
+    lat, lon, date = ligne[0], ligne[1], ligne[2]
+    age = (maintenant or time.time()) - (date or 0)
+    if lat is None or lon is None:
+        return age < ttl_echec * JOUR, None
+    return age < ttl_succes * JOUR, (lat, lon)
+
+
+def ecrire_cache(c, adresse: str, coords: tuple[float, float] | None,
+                 source: str = SOURCE):
+    """Enregistre le résultat (ou l'échec si coords est None) d'une adresse."""
+    lat, lon = coords if coords else (None, None)
+    c.execute("""
+        INSERT OR REPLACE INTO geocode_cache (adresse, latitude, longitude, source, date)
+        VALUES (?, ?, ?, ?, ?)
+    """, (normaliser_adresse(adresse), lat, lon, source, int(time.time())))
+
+
+# ============================================================
+# VARIANTES D'ADRESSE
+# ============================================================
+
+def variantes_adresse(row) -> list[Variante]:
     """
     Construit plusieurs variantes d'adresse pour maximiser les chances
-    de géocodage (du plus précis au moins précis).
+    de géocodage (du plus précis au moins précis), avec leur niveau.
     """
     variantes = []
     addr1  = (row["address1"] or "").strip()
@@ -69,100 +309,317 @@ def construire_adresse(row) -> list[str]:
     zip_   = (row["zipcode"] or "").strip()
     pays   = (row["country"] or "").strip()
 
+    def ajouter(niveau, parts):
+        texte = ", ".join(parts)
+        if parts and texte not in (v.texte for v in variantes):
+            variantes.append(Variante(niveau, texte, pays, zip_, city))
+
     # Variante 1 : adresse complète
     parts = [p for p in [addr1, addr2, zip_, city, state, pays] if p]
-    if parts:
-        variantes.append(", ".join(parts))
+    if addr1 or addr2:
+        ajouter(NIVEAU_RUE, parts)
+    else:
+        ajouter(NIVEAU_POSTAL if zip_ else NIVEAU_VILLE, parts)
 
     # Variante 2 : sans adresse de rue (code postal + ville + pays)
     parts2 = [p for p in [zip_, city, state, pays] if p]
-    if parts2 and parts2 != parts:
-        variantes.append(", ".join(parts2))
+    ajouter(NIVEAU_POSTAL if zip_ else NIVEAU_VILLE, parts2)
 
     # Variante 3 : ville + pays uniquement
     parts3 = [p for p in [city, pays] if p]
-    if parts3:
-        variantes.append(", ".join(parts3))
+    ajouter(NIVEAU_VILLE, parts3)
 
     return variantes
 
 
+def construire_adresse(row) -> list[str]:
+    """
+    Construit plusieurs variantes d'adresse pour maximiser les chances
+    de géocodage (du plus précis au moins précis).
+    """
+    return [v.texte for v in variantes_adresse(row)]
+
+
+def resoudre(c, backend, variante: Variante, ttl_succes: int = TTL_SUCCES,
+             ttl_echec: int = TTL_ECHEC, ecrire: bool = True):
+    """
+    Géocode une variante avec un backend ; pour un backend distant,
+    le cache est consulté avant et mis à jour après la requête.
+    Retourne (coords, origine) avec origine 'cache' ou le nom du backend.
+    """
+    if not backend.distant:
+        return backend.geocoder(variante)[0], backend.nom
+
+    trouve, coords = lire_cache(c, variante.texte, ttl_succes, ttl_echec)
+    if trouve:
+        return coords, "cache"
+    coords, definitif = backend.geocoder(variante)
+    if definitif and ecrire:
+        ecrire_cache(c, variante.texte, coords, backend.nom)
+    return coords, backend.nom
+
+
+def geocoder_ligne(c, backends, row, ttl_succes: int = TTL_SUCCES,
+                   ttl_echec: int = TTL_ECHEC, ecrire: bool = True):
+    """
+    Essaie les variantes d'une ligne avec chaque backend qui les accepte.
+    Retourne (coords, variante, origine) ou (None, None, None).
+    """
+    for variante in variantes_adresse(row):
+        for backend in backends:
+            if not backend.accepte(variante):
+                continue
+            coords, origine = resoudre(c, backend, variante, ttl_succes, ttl_echec, ecrire)
+            if coords:
+                return coords, variante, origine
+    return None, None, None
+
+
 # ============================================================
-def geocoder_manquants(dry_run=False, limite=None):
+def geocoder_hors_ligne(conn, gazetteer) -> tuple[int, int]:
     """
-    Parcourt tous les datacenters sans coordinates valides,
-    tente de les geocoder via Nominatim, et met à jour la BDD.
+    Géocode en un seul lot toutes les lignes sans GPS avec l'index local
+    (aucune requête réseau). Les mises à jour sont écrites via executemany,
+    dans la transaction éventuellement ouverte par l'appelant (ingest).
+    Retourne (succes, echecs).
     """
-    conn = sqlite3.connect(FICHIER_BDD)
+    backends = [BackendGazetteer(gazetteer)]
+    c = conn.cursor()
+    ancien_row_factory = conn.row_factory
     conn.row_factory = sqlite3.Row
+    try:
+        lignes = conn.execute(REQUETE_MANQUANTS).fetchall()
+    finally:
+        conn.row_factory = ancien_row_factory
+
+    mises_a_jour = []
+    for row in lignes:
+        coords, _, _ = geocoder_ligne(c, backends, row)
+        if coords:
+            mises_a_jour.append((coords[0], coords[1], row["id"]))
+    c.executemany("UPDATE datacenter SET latitude=?, longitude=? WHERE id=?", mises_a_jour)
+    return len(mises_a_jour), len(lignes) - len(mises_a_jour)
+
+
+# ============================================================
+# GÉOCODAGE CONCURRENT
+# ============================================================
+# Les lignes sont traitées par étapes : l'étape k prend la k-ième
+# variante de chaque ligne encore sans coordonnées. Les variantes
+# identiques (après normalisation) ne sont résolues qu'une fois ;
+# l'index local et le cache répondent tout de suite, le reste part
+# vers les backends distants en parallèle (Ordonnanceur). Toutes les
+# lectures/écritures SQLite restent dans le thread principal et sont
+# regroupées par lots de `taille_lot` résultats.
+
+class _Ecritures:
+    """
+    Tampon des écritures (cache, coordonnées, progression) vidé par lots :
+    dès `taille_lot` résultats ou `delai` secondes depuis le dernier commit.
+    """
+
+    def __init__(self, conn, taille_lot: int, actif: bool = True,
+                 delai: float = DELAI_COMMIT):
+        self.conn = conn
+        self.taille_lot = max(1, taille_lot)
+        self.actif = actif
+        self.delai = delai
+        self.dernier_commit = time.monotonic()
+        self.cache = []
+        self.coords = []
+        self.progression = []
+
+    def ajouter_cache(self, variante: Variante, coords, source: str):
+        if self.actif:
+            lat, lon = coords if coords else (None, None)
+            self.cache.append((normaliser_adresse(variante.texte), lat, lon,
+                               source, int(time.time())))
+            self._seuil()
+
+    def ajouter_coords(self, id_, coords, source: str):
+        if self.actif:
+            self.coords.append((coords[0], coords[1], id_))
+            self.progression.append((id_, STATUT_OK, source, int(time.time())))
+            self._seuil()
+
+    def ajouter_echec(self, id_):
+        if self.actif:
+            self.progression.append((id_, STATUT_ECHEC, None, int(time.time())))
+            self._seuil()
+
+    def _seuil(self):
+        taille = len(self.cache) + len(self.coords) + len(self.progression)
+        if (taille >= self.taille_lot
+                or time.monotonic() - self.dernier_commit >= self.delai):
+            self.vider()
+
+    def vider(self):
+        self.dernier_commit = time.monotonic()
+        if not (self.cache or self.coords or self.progression):
+            return
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO geocode_cache (adresse, latitude, longitude, source, date)
+                VALUES (?, ?, ?, ?, ?)
+            """, self.cache)
+            self.conn.executemany("UPDATE datacenter SET latitude=?, longitude=? WHERE id=?",
+                                  self.coords)
+            self.conn.executemany("""
+                INSERT INTO geocode_progression (id, statut, tentatives, source, date)
+                VALUES (?1, ?2, 1, ?3, ?4)
+                ON CONFLICT(id) DO UPDATE SET statut = ?2, tentatives = tentatives + 1,
+                                              source = ?3, date = ?4
+            """, self.progression)
+        self.cache.clear()
+        self.coords.clear()
+        self.progression.clear()
+
+
+def geocoder_lignes(conn, backends, lignes, ttl_succes: int = TTL_SUCCES,
+                    ttl_echec: int = TTL_ECHEC, par_backend: int = TRAVAILLEURS,
+                    taille_lot: int = TAILLE_LOT, dry_run: bool = False) -> dict:
+    """
+    Géocode `lignes` (sqlite3.Row de REQUETE_MANQUANTS) en dédupliquant les
+    adresses et en interrogeant les backends distants en parallèle.
+    Retourne {id: (coords, variante, origine)} pour les lignes trouvées.
+    """
+    locaux   = [b for b in backends if not b.distant]
+    distants = [b for b in backends if b.distant]
+    ecritures = _Ecritures(conn, taille_lot, actif=not dry_run)
     c = conn.cursor()
 
-    # Récupérer les DC sans GPS valide
-    c.execute("""
-        SELECT id, name, city, country, address1, address2,
-               state, zipcode, latitude, longitude
-        FROM datacenter
-        WHERE (latitude  IS NULL OR latitude  = '' OR CAST(latitude  AS REAL) = 0)
-           OR (longitude IS NULL OR longitude = '' OR CAST(longitude AS REAL) = 0)
-        ORDER BY country, city
-    """)
-    a_geocoder = c.fetchall()
+    noms = {row["id"]: row["name"] for row in lignes}
+    restants = {row["id"]: variantes_adresse(row) for row in lignes}
+    resultats = {}
+
+    def resolu(cle, variante, coords, origine):
+        for id_ in groupes[cle]:
+            resultats[id_] = (coords, variante, origine)
+            del restants[id_]
+            ecritures.ajouter_coords(id_, coords, origine)
+            print(f"  ✓ {noms[id_][:40]:<40s} {coords[0]}, {coords[1]}"
+                  f"  ({origine}: \"{variante.texte}\")")
+
+    etape = 0
+    while restants:
+        # Regroupement des lignes par variante normalisée
+        groupes = defaultdict(list)
+        variantes = {}
+        for id_, vs in list(restants.items()):
+            if etape >= len(vs):
+                del restants[id_]   # plus de variante à essayer
+                ecritures.ajouter_echec(id_)
+                continue
+            cle = normaliser_adresse(vs[etape].texte)
+            groupes[cle].append(id_)
+            variantes.setdefault(cle, vs[etape])
+        if not groupes:
+            break
+
+        a_demander = []
+        for cle, variante in variantes.items():
+            coords, origine = None, None
+            for backend in locaux:
+                if backend.accepte(variante):
+                    coords = backend.geocoder(variante)[0]
+                    if coords:
+                        origine = backend.nom
+                        break
+            if not coords and distants and all(b.accepte(variante) for b in distants):
+                trouve, coords = lire_cache(c, variante.texte, ttl_succes, ttl_echec)
+                if trouve:
+                    origine = "cache"
+                else:
+                    a_demander.append(variante)
+            if coords:
+                resolu(cle, variante, coords, origine)
+
+        nb_lignes = sum(map(len, groupes.values()))
+        print(f"Étape {etape + 1} : {nb_lignes} lignes, {len(variantes)} adresses uniques, "
+              f"{len(a_demander)} requêtes réseau")
+
+        for variante, (coords, definitif), nom in Ordonnanceur(distants, par_backend).executer(a_demander):
+            if definitif:
+                ecritures.ajouter_cache(variante, coords, nom)
+            if coords:
+                resolu(normaliser_adresse(variante.texte), variante, coords, nom)
+
+        ecritures.vider()
+        etape += 1
+
+    ecritures.vider()
+    return resultats
 
+
+# ============================================================
+def geocoder_manquants(dry_run=False, limite=None,
+                       ttl_succes=TTL_SUCCES, ttl_echec=TTL_ECHEC,
+                       gazetteer=None, hors_ligne=False, endpoints=None,
+                       stub=False, par_backend=TRAVAILLEURS, taille_lot=TAILLE_LOT,
+                       reprise=None):
+    """
+    Parcourt tous les datacenters sans coordinates valides,
+    tente de les geocoder (cache, index local, Nominatim), et met à jour la BDD.
+    Avec `reprise` (en jours), les lignes déjà tentées dans cette fenêtre
+    (table geocode_progression) sont ignorées.
+    Retourne (succes, echecs).
+    """
+    backends = construire_backends(gazetteer, hors_ligne, endpoints, stub)
+
+    conn = connecter(FICHIER_BDD)
+    conn.row_factory = sqlite3.Row
+
+    # Récupérer les DC sans GPS valide
+    a_geocoder = conn.execute(REQUETE_MANQUANTS).fetchall()
     total = len(a_geocoder)
+
+    if reprise is not None:
+        depuis = int(time.time() - reprise * JOUR)
+        requete = REQUETE_MANQUANTS.replace(
+            "ORDER BY", f"AND {FILTRE_REPRISE}\n    ORDER BY")
+        a_geocoder = conn.execute(requete, (depuis,)).fetchall()
+
+    deja_tentes = total - len(a_geocoder)
+
     if limite:
         a_geocoder = a_geocoder[:limite]
 
     print(f"🔍  {total} datacenters sans coordonnées GPS trouvés.")
+    if reprise is not None:
+        print(f"    → Reprise : {deja_tentes} déjà tentés ignorés.")
     if limite:
         print(f"    → Traitement limité à {limite} entrées.")
     if dry_run:
         print("    [DRY-RUN] Aucune écriture en base.\n")
 
-    geocoder = Nominatim(user_agent="OpenCenter-Geocoder/1.0")
-
-    succes = 0
-    echecs = 0
-
-    for i, row in enumerate(a_geocoder, 1):
-        print(f"[{i:4d}/{len(a_geocoder)}] {row['name'][:50]:<50s} | {row['city']}, {row['country']}")
-
-        variantes = construire_adresse(row)
-        if not variantes:
-            print("           Aucune adresse disponible, ignoré.\n")
-            echecs += 1
-            continue
-
-        coords = None
-        for variante in variantes:
-            coords = geocoder_adresse(geocoder, variante)
-            if coords:
-                print(f"          ✓ {coords[0]}, {coords[1]}  (via: \"{variante}\")")
-                break
-            time.sleep(DELAI)
-
-        if coords:
-            if not dry_run:
-                c.execute(
-                    "UPDATE datacenter SET latitude=?, longitude=? WHERE id=?",
-                    (str(coords[0]), str(coords[1]), row["id"])
-                )
-                conn.commit()
-            succes += 1
-        else:
-            print(f"           ❌  Introuvable.")
-            echecs += 1
-
-        # Respecter le délai Nominatim
-        time.sleep(DELAI)
-
-    conn.close()
+    debut = time.monotonic()
+    depart = int(time.time())
+    try:
+        resultats = geocoder_lignes(conn, backends, a_geocoder, ttl_succes, ttl_echec,
+                                    par_backend, taille_lot, dry_run)
+    finally:
+        # Même après Ctrl-C ou une erreur de backend : les lots déjà
+        # écrits ont changé `datacenter`, stats_pays (et l'empreinte des
+        # caches) doit suivre
+        if not dry_run and conn.execute(
+                "SELECT 1 FROM geocode_progression WHERE statut = ? AND date >= ? LIMIT 1",
+                (STATUT_OK, depart)).fetchone():
+            with conn:
+                rafraichir_stats(conn)
+        conn.close()
+    duree = time.monotonic() - debut
 
+    succes = len(resultats)
+    echecs = len(a_geocoder) - succes
+    requetes = sum(getattr(b, "requetes", 0) for b in backends)
     print(f"\n{'─'*60}")
     print(f"✓ Géocodés avec succès : {succes}")
     print(f"X  Non trouvés          : {echecs}")
     print(f"Total traités        : {succes + echecs} / {total}")
+    print(f"Requêtes réseau      : {requetes} en {duree:.1f} s")
     if not dry_run and succes > 0:
         print(f"Base de données update : {FICHIER_BDD}")
+    return succes, echecs
 
 
 # ============================================================
@@ -178,6 +635,47 @@ if __name__ == "__main__":
         "--limite", type=int, default=None, metavar="N",
         help="Limite le traitement à N entrées (pratique pour tester)."
     )
+    parser.add_argument(
+        "--ttl-succes", type=int, default=TTL_SUCCES, metavar="JOURS",
+        help=f"Durée de validité d'une adresse trouvée en cache (défaut : {TTL_SUCCES} j)."
+    )
+    parser.add_argument(
+        "--ttl-echec", type=int, default=TTL_ECHEC, metavar="JOURS",
+        help=f"Délai avant de retenter une adresse introuvable (défaut : {TTL_ECHEC} j)."
+    )
+    parser.add_argument(
+        "--gazetteer", default=None, metavar="FICHIER",
+        help="Index local (gazetteer.py) ou dump GeoNames pour les codes postaux / villes."
+    )
+    parser.add_argument(
+        "--hors-ligne", action="store_true",
+        help="N'utilise que le gazetteer (aucune requête réseau)."
+    )
+    parser.add_argument(
+        "--endpoint", action="append", type=lire_endpoint, default=None,
+        metavar="DOMAINE[=DEBIT]",
+        help="Serveur Nominatim (requêtes/s, défaut 1/DELAI), option répétable."
+    )
+    parser.add_argument(
+        "--travailleurs", type=int, default=TRAVAILLEURS, metavar="N",
+        help=f"Requêtes simultanées par serveur (défaut : {TRAVAILLEURS})."
+    )
+    parser.add_argument(
+        "--stub", action="store_true",
+        help="Remplace le réseau par un faux géocodeur (implique --dry-run)."
+    )
+    parser.add_argument(
+        "--resume", nargs="?", type=float, const=REPRISE, default=None, metavar="JOURS",
+        help=f"Ignore les lignes déjà tentées depuis JOURS jours (défaut : {REPRISE})."
+    )
     args = parser.parse_args()
 
-    geocoder_manquants(dry_run=args.dry_run, limite=args.limite)
+    try:
+        geocoder_manquants(dry_run=args.dry_run or args.stub, limite=args.limite,
+                           ttl_succes=args.ttl_succes, ttl_echec=args.ttl_echec,
+                           gazetteer=args.gazetteer, hors_ligne=args.hors_ligne,
+                           endpoints=args.endpoint, stub=args.stub,
+                           par_backend=args.travailleurs, reprise=args.resume)
+    except (RuntimeError, ValueError) as e:
+        print(e)
+        sys.exit(1)
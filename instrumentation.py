@@ -0,0 +1,293 @@
+# ============================================================
+# instrumentation.py – Mesure des requêtes SQL (sur demande)
+# ============================================================
+# Quand l'instrumentation est active, schema.connecter() (donc
+# db_query, interface, carte, jointure, geocode…) ouvre des
+# connexions ConnexionInstrumentee. Pour chaque requête (texte SQL
+# normalisé) sont cumulés :
+#   - le nombre d'appels, la durée totale et maximale (exécution
+#     + lecture des lignes, qui est l'essentiel du travail SQLite) ;
+#   - le nombre de lignes renvoyées (ou modifiées) ;
+#   - les pas de la machine virtuelle SQLite (set_progress_handler,
+#     un tic tous les PAS_VM opcodes : une requête qui parcourt toute
+#     une table en consomme beaucoup pour peu de lignes).
+# Une exécution plus longue que le seuil est « lente » : son plan
+# (EXPLAIN QUERY PLAN) est capturé, et elle est écrite avec ses
+# paramètres (texte reçu par set_trace_callback, sinon requête et
+# liste des paramètres) dans le journal des requêtes lentes s'il est
+# demandé (une ligne JSON par requête ; ses « lignes » sont celles lues
+# au moment où le seuil est franchi).
+# Un rapport est affiché à la sortie du programme ; l'interface
+# l'affiche aussi dans l'onglet « Debug SQL » (--debug-sql).
+#
+# Activation : variables d'environnement (avant le lancement)
+#   OPENCENTER_SQL=1               statistiques + rapport à la sortie
+#   OPENCENTER_SQL_LENT=MS         seuil des requêtes lentes (défaut 50)
+#   OPENCENTER_SQL_JOURNAL=FICHIER journal des requêtes lentes
+# ou activer(seuil_ms, journal) avant d'ouvrir les connexions.
+#
+# Usage : OPENCENTER_SQL=1 python jointure.py
+# ============================================================
+
+import os
+import re
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+
+SEUIL_MS  = 50.0       # au-delà : requête lente
+PAS_VM    = 1000       # opcodes SQLite entre deux appels du progress handler
+LARGEUR   = 70         # caractères de SQL affichés dans le rapport
+
+# littéraux (texte, blob, nombre) et paramètres (?, ?1, :nom) : remplacés par « ? »
+# pour reconnaître une requête dans le texte reçu par set_trace_callback
+LITTERAUX = re.compile(r"'(?:[^']|'')*'|[xX]'[0-9a-fA-F]*'|-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"
+                       r"|\bNULL\b|\?\d*|[:@$]\w+")
+
+_config = {"actif": False, "seuil": SEUIL_MS / 1000, "journal": None}
+_verrou = threading.Lock()
+_local = threading.local()       # mesure en cours dans le thread (progress handler)
+STATISTIQUES = {}                # SQL normalisé → Statistique
+
+
+class Statistique:
+    """Cumul des exécutions d'une même requête."""
+
+    __slots__ = ("sql", "squelette", "appels", "duree", "duree_max", "lignes", "pas_vm",
+                 "lentes", "plan")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.squelette = squelette(sql)
+        self.appels = 0
+        self.duree = 0.0
+        self.duree_max = 0.0
+        self.lignes = 0
+        self.pas_vm = 0
+        self.lentes = 0
+        self.plan = None          # lignes de EXPLAIN QUERY PLAN (requête lente)
+
+    @property
+    def parcours_complet(self) -> bool:
+        """
+        Le plan contient un « SCAN table » sans index (un SCAN d'une table
+        virtuelle, ex. FTS5 MATCH, passe par l'index de son module).
+        """
+        return bool(self.plan) and any(
+            etape.startswith("SCAN") and "USING" not in etape
+            and "VIRTUAL TABLE" not in etape for etape in self.plan)
+
+
+def normaliser(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def squelette(sql: str) -> str:
+    """SQL normalisé, littéraux et paramètres remplacés par « ? »."""
+    return normaliser(LITTERAUX.sub("?", sql))
+
+
+def actif() -> bool:
+    return _config["actif"]
+
+
+def activer(seuil_ms: float = SEUIL_MS, journal: str | None = None, rapport: bool = True):
+    """Active l'instrumentation des connexions ouvertes ensuite."""
+    deja_actif = _config["actif"]
+    _config.update(actif=True, seuil=seuil_ms / 1000, journal=journal)
+    if rapport and not deja_actif:
+        atexit.register(afficher_rapport)
+
+
+def reinitialiser():
+    with _verrou:
+        STATISTIQUES.clear()
+
+
+# ============================================================
+# CONNEXION ET CURSEUR INSTRUMENTÉS
+# ============================================================
+
+class _Execution:
+    """Une exécution d'une requête : durée et lignes cumulées au fil des lectures."""
+
+    __slots__ = ("stat", "parametres", "duree", "lignes", "signalee", "texte")
+
+    def __init__(self, stat, parametres):
+        self.stat = stat
+        self.parametres = parametres
+        self.duree = 0.0
+        self.lignes = 0
+        self.signalee = False
+        self.texte = None         # SQL avec paramètres (set_trace_callback)
+
+
+class CurseurInstrumente(sqlite3.Cursor):
+    """Curseur qui chronomètre execute() et chaque lecture de lignes."""
+
+    _execution = None
+
+    def _mesurer(self, compter, fonction, *args):
+        """Appelle `fonction` en chronométrant ; compter(résultat) → lignes lues."""
+        execution = self._execution
+        _local.execution = execution
+        debut = time.perf_counter()
+        try:
+            resultat = fonction(*args)
+        except BaseException:          # StopIteration (fin des lignes) ou erreur SQL
+            _local.execution = None
+            if execution is not None:
+                _cumuler(self.connection, execution, time.perf_counter() - debut, 0)
+            raise
+        duree = time.perf_counter() - debut
+        _local.execution = None
+        if execution is not None:
+            _cumuler(self.connection, execution, duree, compter(resultat))
+        return resultat
+
+    def _commencer(self, sql, parametres):
+        with _verrou:
+            cle = normaliser(sql)
+            stat = STATISTIQUES.get(cle)
+            if stat is None:
+                stat = STATISTIQUES[cle] = Statistique(cle)
+            stat.appels += 1
+        self._execution = _Execution(stat, parametres)
+
+    def execute(self, sql, parametres=()):
+        self._commencer(sql, parametres)
+        # INSERT / UPDATE / DELETE : lignes modifiées
+        return self._mesurer(lambda c: max(c.rowcount, 0) if c.description is None else 0,
+                             super().execute, sql, parametres)
+
+    def executemany(self, sql, sequence):
+        self._commencer(sql, None)
+        return self._mesurer(lambda c: max(c.rowcount, 0), super().executemany, sql, sequence)
+
+    def fetchone(self):
+        return self._mesurer(lambda ligne: ligne is not None, super().fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._mesurer(len, super().fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._mesurer(len, super().fetchall)
+
+    def __next__(self):
+        return self._mesurer(lambda ligne: 1, super().__next__)
+
+
+class ConnexionInstrumentee(sqlite3.Connection):
+    """Connexion dont toutes les requêtes passent par CurseurInstrumente."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_progress_handler(_progression, PAS_VM)
+        self.set_trace_callback(_trace)
+
+    def cursor(self, factory=CurseurInstrumente):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametres=()):
+        return self.cursor().execute(sql, parametres)
+
+    def executemany(self, sql, sequence):
+        return self.cursor().executemany(sql, sequence)
+
+
+def _progression():
+    execution = getattr(_local, "execution", None)
+    if execution is not None:
+        execution.stat.pas_vm += 1
+    return 0          # ne jamais interrompre la requête
+
+
+def _trace(texte):
+    # Seul le texte de la requête mesurée est gardé : SQLite trace aussi les
+    # instructions internes (ex. « PRAGMA data_version » d'un MATCH FTS5)
+    execution = getattr(_local, "execution", None)
+    if (execution is not None and execution.texte is None
+            and squelette(texte) == execution.stat.squelette):
+        execution.texte = texte
+
+
+def _cumuler(conn, execution, duree, lignes):
+    stat = execution.stat
+    with _verrou:
+        stat.duree += duree
+        stat.lignes += lignes
+        execution.duree += duree
+        execution.lignes += lignes
+        stat.duree_max = max(stat.duree_max, execution.duree)
+        lente = not execution.signalee and execution.duree >= _config["seuil"]
+        if lente:
+            execution.signalee = True
+            stat.lentes += 1
+    if lente:
+        _signaler_lente(conn, execution)
+
+
+def _signaler_lente(conn, execution):
+    """Capture le plan de la requête lente et l'écrit dans le journal."""
+    stat = execution.stat
+    if stat.plan is None and execution.parametres is not None:
+        try:
+            # curseur non instrumenté : n'entre pas dans les statistiques
+            curseur = sqlite3.Cursor(conn)
+            curseur.row_factory = None
+            stat.plan = [ligne[3] for ligne in curseur.execute(
+                "EXPLAIN QUERY PLAN " + stat.sql, execution.parametres)]
+        except sqlite3.Error:
+            stat.plan = []
+    journal = _config["journal"]
+    if journal:
+        entree = {
+            "date":     datetime.now().isoformat(timespec="milliseconds"),
+            "duree_ms": round(execution.duree * 1000, 2),
+            "lignes":   execution.lignes,
+            "sql":      execution.texte or stat.sql,
+            "plan":     stat.plan,
+        }
+        if execution.texte is None and execution.parametres:
+            entree["parametres"] = list(execution.parametres)
+        with _verrou, open(journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entree, ensure_ascii=False, default=str) + "\n")
+
+
+# ============================================================
+# RAPPORT
+# ============================================================
+
+def rapport() -> list[Statistique]:
+    """Statistiques des requêtes, de la plus coûteuse (durée totale) à la moins coûteuse."""
+    with _verrou:
+        return sorted(STATISTIQUES.values(), key=lambda s: s.duree, reverse=True)
+
+
+def afficher_rapport(limite: int = 20):
+    stats = rapport()
+    if not stats:
+        return
+    total = sum(s.duree for s in stats)
+    print(f"\n=== Requêtes SQL : {sum(s.appels for s in stats)} exécutions, "
+          f"{total * 1000:.1f} ms ===")
+    print(f"  {'appels':>7s} {'total ms':>9s} {'moy ms':>8s} {'max ms':>8s} "
+          f"{'lignes':>8s} {'pas VM':>7s}  requête")
+    for s in stats[:limite]:
+        marque = "  [SCAN]" if s.parcours_complet else ""
+        print(f"  {s.appels:7d} {s.duree * 1000:9.1f} {s.duree / s.appels * 1000:8.2f} "
+              f"{s.duree_max * 1000:8.2f} {s.lignes:8d} {s.pas_vm:7d}  "
+              f"{s.sql[:LARGEUR]}{marque}")
+        for etape in s.plan or ():
+            print(f"{'':56s}↳ {etape}")
+    if len(stats) > limite:
+        print(f"  … ({len(stats) - limite} autres requêtes)")
+
+
+# Activation par l'environnement
+if os.environ.get("OPENCENTER_SQL") or os.environ.get("OPENCENTER_SQL_JOURNAL"):
+    activer(float(os.environ.get("OPENCENTER_SQL_LENT", SEUIL_MS)),
+            os.environ.get("OPENCENTER_SQL_JOURNAL"))
@@ -2,19 +2,43 @@
 # ACTIVITe 8 : Interface graphique Tkinter – OpenCenter
 # Gestion et visualisation des datacenters europeens
 # ============================================================
+# Démarrage rapide : folium (et carte.py) ne sont importés qu'à la
+# première génération de carte, et la fenêtre s'affiche tout de suite
+# avec des valeurs d'attente (« … ») ; statistiques, pays et top 20
+# sont lus dans stats_pays par une tâche de fond.
+#
+# Usage : python interface.py [--profile-startup] [--debug-sql]
+#   --profile-startup : affiche le temps d'import, de premier affichage
+#   et de chargement des données, puis ferme la fenêtre.
+#   --debug-sql : mesure les requêtes SQL (instrumentation.py) et les
+#   affiche dans l'onglet « Debug SQL ».
+# ============================================================
+
+import time
+DEBUT = time.perf_counter()
 
+import sys
 import sqlite3
+import argparse
 import webbrowser
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-import folium
-from folium.plugins import MarkerCluster
+
+import db_query
+from schema import PAYS_GLOBAL
+import cache_cartes
+import instrumentation
+from taches import ExecuteurTaches
+from liste_virtuelle import ListeVirtuelle, SourcePages
+from recherche import rechercher
 
 BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
 FICHIER_BDD   = os.path.join(BASE_DIR, "data",   "datacenter.sqlite3")
 OUTPUT_DIR    = os.path.join(BASE_DIR, "output")
-CENTRE_EUROPE = (50.0, 15.0)
+MODULES_LOURDS = ("folium", "branca", "jinja2", "numpy")
+DELAI_RECHERCHE_MS = 250     # pause de frappe avant de lancer la recherche
+DELAI_DEBUG_MS     = 2000    # rafraîchissement de l'onglet Debug SQL
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
@@ -23,156 +47,39 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # ============================================================
 
 def get_connexion():
-    conn = sqlite3.connect(FICHIER_BDD)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return db_query.connexion(FICHIER_BDD)
 
 
 def get_stats_globales():
-    conn = get_connexion()
-    c = conn.cursor()
-    c.execute("""
-        SELECT COUNT(*)                  AS total,
-               ROUND(AVG(net_count), 1)  AS moy_reseau,
-               MAX(net_count)            AS max_reseau,
-               ROUND(AVG(ix_count), 1)   AS moy_ix,
-               MAX(ix_count)             AS max_ix,
-               SUM(CASE WHEN latitude!='' AND latitude IS NOT NULL THEN 1 ELSE 0 END) AS avec_gps
-        FROM datacenter
-    """)
-    row = c.fetchone()
-    conn.close()
-    return row
+    return db_query.une("stats_globales", (PAYS_GLOBAL,), FICHIER_BDD)
 
 
 def get_liste_pays():
-    conn = get_connexion()
-    c = conn.cursor()
     try:
-        c.execute("""
-            SELECT p.code_pays, p.nom_pays, COUNT(d.id) AS nb
-            FROM pays p
-            LEFT JOIN datacenter d ON d.country = p.code_pays
-            GROUP BY p.code_pays
-            ORDER BY p.nom_pays
-        """)
-    except sqlite3.OperationalError:
-        c.execute("""
-            SELECT country AS code_pays, country AS nom_pays, COUNT(*) AS nb
-            FROM datacenter GROUP BY country ORDER BY country
-        """)
-    rows = c.fetchall()
-    conn.close()
-    return rows
+        return db_query.executer("liste_pays", fichier_bdd=FICHIER_BDD)
+    except sqlite3.OperationalError:   # table pays pas encore importée
+        return db_query.executer("liste_pays_sans_table", (PAYS_GLOBAL,),
+                                 FICHIER_BDD)
 
 
 def get_datacenters_pays(code_pays):
-    conn = get_connexion()
-    c = conn.cursor()
-    c.execute("""
-        SELECT id, name, city, net_count, ix_count,
-               CAST(latitude  AS REAL) AS lat,
-               CAST(longitude AS REAL) AS lon,
-               website
-        FROM datacenter
-        WHERE country = ?
-        ORDER BY net_count DESC
-    """, (code_pays,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return db_query.executer("datacenters_pays", (code_pays,), FICHIER_BDD)
 
 
-def get_top_dc(n=20):
-    conn = get_connexion()
-    c = conn.cursor()
-    c.execute("""
-        SELECT name, city, country, net_count, ix_count
-        FROM datacenter
-        ORDER BY net_count DESC
-        LIMIT ?
-    """, (n,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+def get_source_pays(code_pays):
+    """Datacenters d'un pays lus page par page (nombre total lu dans stats_pays)."""
+    stats = db_query.une("stats_pays", (code_pays,), FICHIER_BDD)
+    return SourcePages("datacenters_pays", (code_pays,), stats.nb if stats else 0,
+                       FICHIER_BDD)
 
 
-# ============================================================
-# GeNeRATION DE CARTES
-# ============================================================
+def get_top_dc(n=20):
+    return db_query.executer("top_reseaux", (n,), FICHIER_BDD)
 
-def generer_carte_tous(fichier=None):
-    if fichier is None:
-        fichier = os.path.join(OUTPUT_DIR, "carte_interface_tous.html")
-    conn = get_connexion()
-    c = conn.cursor()
-    c.execute("""
-        SELECT name, city, country, net_count, ix_count, website,
-               CAST(latitude  AS REAL) AS lat,
-               CAST(longitude AS REAL) AS lon
-        FROM datacenter
-        WHERE latitude  IS NOT NULL AND latitude  != ''
-          AND longitude IS NOT NULL AND longitude != ''
-          AND CAST(latitude  AS REAL) BETWEEN -90  AND 90
-          AND CAST(longitude AS REAL) BETWEEN -180 AND 180
-    """)
-    rows = c.fetchall()
-    conn.close()
-
-    carte = folium.Map(location=CENTRE_EUROPE, zoom_start=5,
-                       attr='© Contributeurs OpenStreetMap')
-    cluster = MarkerCluster(name="Datacenters").add_to(carte)
-    for r in rows:
-        folium.Marker(
-            location=(r['lat'], r['lon']),
-            popup=folium.Popup(
-                f"<b>{r['name']}</b><br>{r['city']} ({r['country']})<br>"
-                f"Reseaux : {r['net_count']} | IX : {r['ix_count']}", max_width=250),
-            tooltip=r['name'],
-            icon=folium.Icon(color='blue', icon='server', prefix='fa')
-        ).add_to(cluster)
-    folium.LayerControl().add_to(carte)
-    carte.save(fichier)
-    return fichier, len(rows)
-
-
-def generer_carte_pays(code_pays, nom_pays, fichier=None):
-    if fichier is None:
-        fichier = os.path.join(OUTPUT_DIR, f"carte_{code_pays.lower()}_interface.html")
-    conn = get_connexion()
-    c = conn.cursor()
-    c.execute("""
-        SELECT name, city, net_count, ix_count, website,
-               CAST(latitude  AS REAL) AS lat,
-               CAST(longitude AS REAL) AS lon
-        FROM datacenter
-        WHERE country = ?
-          AND latitude  IS NOT NULL AND latitude  != ''
-          AND longitude IS NOT NULL AND longitude != ''
-          AND CAST(latitude  AS REAL) BETWEEN -90  AND 90
-          AND CAST(longitude AS REAL) BETWEEN -180 AND 180
-    """, (code_pays,))
-    rows = c.fetchall()
-    conn.close()
-    if not rows:
-        return None, 0
-    centre_lat = sum(r['lat'] for r in rows) / len(rows)
-    centre_lon = sum(r['lon'] for r in rows) / len(rows)
-    carte = folium.Map(location=(centre_lat, centre_lon), zoom_start=6,
-                       attr='© Contributeurs OpenStreetMap')
-    cluster = MarkerCluster(name=f"DC {nom_pays}").add_to(carte)
-    for r in rows:
-        folium.Marker(
-            location=(r['lat'], r['lon']),
-            popup=folium.Popup(
-                f"<b>{r['name']}</b><br>{r['city']}<br>"
-                f"Reseaux : {r['net_count']} | IX : {r['ix_count']}", max_width=250),
-            tooltip=r['name'],
-            icon=folium.Icon(color='red', icon='server', prefix='fa')
-        ).add_to(cluster)
-    folium.LayerControl().add_to(carte)
-    carte.save(fichier)
-    return fichier, len(rows)
+
+def get_donnees_initiales(_tache=None):
+    """Statistiques globales, liste des pays et top 20 (tâche de démarrage)."""
+    return get_stats_globales(), get_liste_pays(), get_top_dc(20)
 
 
 # ============================================================
@@ -192,17 +99,51 @@ class AppOpenCenter(tk.Tk):
     YELLOW    = "#f9e2af"
     BORDER    = "#45475a"
 
-    def __init__(self):
+    def __init__(self, profil=False):
         super().__init__()
         self.title("OpenCenter – Datacenters Europeens")
         self.geometry("1100x700")
         self.configure(bg=self.BG)
         self.resizable(True, True)
+        self.profil = profil
+        self.mesures = {"import": time.perf_counter() - DEBUT}
+        self._pays_data = []
 
         self._style()
         self._build_ui()
-        self._charger_stats()
-        self._charger_pays()
+        # Requêtes et cartes en arrière-plan (voir taches.py)
+        self.taches = ExecuteurTaches(self, progression=self.status_var.set)
+        self.protocol("WM_DELETE_WINDOW", self._fermer)
+        self.after_idle(self._premier_affichage)
+        self.status_var.set("Chargement des donnees…")
+        self.taches.soumettre("demarrage", get_donnees_initiales,
+                              quand_fini=self._donnees_initiales)
+
+    def _fermer(self):
+        self.taches.fermer()
+        self.destroy()
+
+    def _premier_affichage(self):
+        self.update_idletasks()
+        self.mesures["premier_affichage"] = time.perf_counter() - DEBUT
+
+    def _donnees_initiales(self, resultat):
+        stats, pays, top = resultat
+        self._charger_stats(stats)
+        self._remplir_top(top)
+        self._charger_pays(pays)
+        self.mesures["donnees"] = time.perf_counter() - DEBUT
+        if self.profil:
+            self.after_idle(self._rapport_demarrage)
+
+    def _rapport_demarrage(self):
+        m = self.mesures
+        print(f"Import des modules   : {m['import'] * 1000:7.1f} ms")
+        print(f"Premier affichage    : {m.get('premier_affichage', 0) * 1000:7.1f} ms")
+        print(f"Donnees affichees    : {m['donnees'] * 1000:7.1f} ms")
+        charges = [nom for nom in MODULES_LOURDS if nom in sys.modules]
+        print(f"Modules lourds charges : {', '.join(charges) or 'aucun'}")
+        self._fermer()
 
     # ----------------------------------------------------------
     def _style(self):
@@ -268,15 +209,27 @@ class AppOpenCenter(tk.Tk):
 
         self.frame_stats = ttk.Frame(left, style="Panel.TFrame")
         self.frame_stats.pack(fill="x", padx=10, pady=4)
+        self._build_stats()
 
         ttk.Label(left, text="Filtrer par pays",
                   foreground=self.ACCENT, background=self.BG_PANEL,
                   font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=10, pady=(14, 4))
 
         self.combo_pays = ttk.Combobox(left, state="readonly", width=28)
+        self.combo_pays.set("Chargement…")
         self.combo_pays.pack(padx=10, pady=4, fill="x")
         self.combo_pays.bind("<<ComboboxSelected>>", self._on_pays_change)
 
+        ttk.Label(left, text="Rechercher",
+                  foreground=self.ACCENT, background=self.BG_PANEL,
+                  font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=10, pady=(14, 4))
+
+        # Recherche à la frappe : relancée DELAI_RECHERCHE_MS après la dernière touche
+        self.recherche_var = tk.StringVar()
+        self._id_recherche = None
+        ttk.Entry(left, textvariable=self.recherche_var).pack(padx=10, pady=4, fill="x")
+        self.recherche_var.trace_add("write", self._on_recherche_change)
+
         btn_frame = ttk.Frame(left, style="Panel.TFrame")
         btn_frame.pack(fill="x", padx=10, pady=6)
 
@@ -308,6 +261,17 @@ class AppOpenCenter(tk.Tk):
         self.notebook.add(self.tab_top, text="  Top 20 (reseaux)  ")
         self._build_tree_top()
 
+        # Tab 3 : Résultats de la recherche plein texte
+        self.tab_recherche = ttk.Frame(self.notebook)
+        self.notebook.add(self.tab_recherche, text="  Recherche  ")
+        self._build_tree_recherche()
+
+        # Tab 4 : Statistiques des requêtes SQL (instrumentation active)
+        if instrumentation.actif():
+            self.tab_debug = ttk.Frame(self.notebook)
+            self.notebook.add(self.tab_debug, text="  Debug SQL  ")
+            self._build_tree_debug()
+
         # --- Barre de statut ---
         self.status_var = tk.StringVar(value="Prêt")
         status_bar = tk.Label(self, textvariable=self.status_var,
@@ -318,23 +282,16 @@ class AppOpenCenter(tk.Tk):
 
     # ----------------------------------------------------------
     def _build_tree_pays(self):
-        cols = ("name", "city", "net_count", "ix_count")
-        self.tree_pays = ttk.Treeview(self.tab_pays, columns=cols,
-                                      show="headings", selectmode="browse")
-        for col, header, w in [
-            ("name",      "Nom",           300),
-            ("city",      "Ville",         130),
-            ("net_count", "Reseaux",        80),
-            ("ix_count",  "IX",             60),
-        ]:
-            self.tree_pays.heading(col, text=header)
-            self.tree_pays.column(col, width=w, anchor="w")
-
-        sb = ttk.Scrollbar(self.tab_pays, orient="vertical",
-                           command=self.tree_pays.yview)
-        self.tree_pays.configure(yscrollcommand=sb.set)
-        self.tree_pays.pack(side="left", fill="both", expand=True)
-        sb.pack(side="right", fill="y")
+        # Liste virtuelle : seules les lignes visibles sont créées,
+        # les autres sont lues page par page au défilement
+        self.liste_pays = ListeVirtuelle(self.tab_pays, [
+            ("name",      "Nom",           300, "asc"),
+            ("city",      "Ville",         130, "asc"),
+            ("net_count", "Reseaux",        80, "desc"),
+            ("ix_count",  "IX",             60, "desc"),
+        ], tri=("net_count", "desc"))
+        self.liste_pays.pack(fill="both", expand=True)
+        self.tree_pays = self.liste_pays.tree
 
     def _build_tree_top(self):
         cols = ("name", "city", "country", "net_count", "ix_count")
@@ -356,32 +313,105 @@ class AppOpenCenter(tk.Tk):
         self.tree_top.pack(side="left", fill="both", expand=True)
         sb.pack(side="right", fill="y")
 
-        # Remplissage immediat
-        for r in get_top_dc(20):
+    def _remplir_top(self, rows):
+        for r in rows:
             self.tree_top.insert("", "end",
-                                 values=(r['name'], r['city'], r['country'],
-                                         r['net_count'], r['ix_count']))
+                                 values=(r.name, r.city, r.country,
+                                         r.net_count, r.ix_count))
+
+    def _build_tree_recherche(self):
+        cols = ("name", "org_name", "city", "country", "net_count")
+        self.tree_recherche = ttk.Treeview(self.tab_recherche, columns=cols,
+                                           show="headings", selectmode="browse")
+        for col, header, w in [
+            ("name",      "Nom",          260),
+            ("org_name",  "Organisation", 160),
+            ("city",      "Ville",        110),
+            ("country",   "Pays",          50),
+            ("net_count", "Reseaux",       70),
+        ]:
+            self.tree_recherche.heading(col, text=header)
+            self.tree_recherche.column(col, width=w, anchor="w")
+
+        sb = ttk.Scrollbar(self.tab_recherche, orient="vertical",
+                           command=self.tree_recherche.yview)
+        self.tree_recherche.configure(yscrollcommand=sb.set)
+        self.tree_recherche.pack(side="left", fill="both", expand=True)
+        sb.pack(side="right", fill="y")
+
+    def _build_tree_debug(self):
+        cols = ("appels", "total", "moyenne", "max", "lignes", "pas_vm", "scan", "sql", "plan")
+        self.tree_debug = ttk.Treeview(self.tab_debug, columns=cols,
+                                       show="headings", selectmode="browse")
+        for col, header, w, anchor in [
+            ("appels",  "Appels",    60, "e"),
+            ("total",   "Total ms",  75, "e"),
+            ("moyenne", "Moy. ms",   65, "e"),
+            ("max",     "Max ms",    65, "e"),
+            ("lignes",  "Lignes",    70, "e"),
+            ("pas_vm",  "Pas VM",    65, "e"),
+            ("scan",    "",          50, "w"),
+            ("sql",     "Requête",  320, "w"),
+            ("plan",    "Plan",     240, "w"),
+        ]:
+            self.tree_debug.heading(col, text=header)
+            self.tree_debug.column(col, width=w, anchor=anchor)
+
+        sb = ttk.Scrollbar(self.tab_debug, orient="vertical",
+                           command=self.tree_debug.yview)
+        self.tree_debug.configure(yscrollcommand=sb.set)
+        self.tree_debug.pack(side="left", fill="both", expand=True)
+        sb.pack(side="right", fill="y")
+
+        self.notebook.bind("<<NotebookTabChanged>>", lambda _e: self._rafraichir_debug())
+        self.after(DELAI_DEBUG_MS, self._sonder_debug)
+
+    def _rafraichir_debug(self):
+        """Recopie instrumentation.rapport() dans l'onglet, s'il est affiché."""
+        if self.notebook.select() != str(self.tab_debug):
+            return
+        self.tree_debug.delete(*self.tree_debug.get_children())
+        for s in instrumentation.rapport():
+            self.tree_debug.insert("", "end", values=(
+                s.appels, f"{s.duree * 1000:.1f}", f"{s.duree / s.appels * 1000:.2f}",
+                f"{s.duree_max * 1000:.2f}", s.lignes, s.pas_vm,
+                "[SCAN]" if s.parcours_complet else "",
+                s.sql, " | ".join(s.plan or ())))
+
+    def _sonder_debug(self):
+        # toutes les DELAI_DEBUG_MS ; ne relit les statistiques que si l'onglet est visible
+        self._rafraichir_debug()
+        self.after(DELAI_DEBUG_MS, self._sonder_debug)
 
     # ----------------------------------------------------------
-    def _charger_stats(self):
-        s = get_stats_globales()
-        donnees = [
-            ("Total datacenters",    s['total'],      self.GREEN),
-            ("Avec coordonnees GPS", s['avec_gps'],   self.ACCENT),
-            ("Moy. reseaux conn.",   s['moy_reseau'], self.YELLOW),
-            ("Max reseaux conn.",    s['max_reseau'], self.RED),
-            ("Moy. pts d'echange",   s['moy_ix'],     self.YELLOW),
-        ]
-        for key, val, color in donnees:
+    STATS = [
+        ("total",      "Total datacenters",    GREEN),
+        ("avec_gps",   "Avec coordonnees GPS", ACCENT),
+        ("moy_reseau", "Moy. reseaux conn.",   YELLOW),
+        ("max_reseau", "Max reseaux conn.",    RED),
+        ("moy_ix",     "Moy. pts d'echange",   YELLOW),
+    ]
+
+    def _build_stats(self):
+        """Étiquettes des statistiques, avec « … » en attendant les données."""
+        self.labels_stats = {}
+        for champ, key, color in self.STATS:
             row = ttk.Frame(self.frame_stats, style="Panel.TFrame")
             row.pack(fill="x", pady=2)
             ttk.Label(row, text=key, style="Stat.TLabel").pack(anchor="w")
-            tk.Label(row, text=str(val), fg=color, bg=self.BG_PANEL,
-                     font=("Segoe UI", 15, "bold")).pack(anchor="w", padx=4)
+            self.labels_stats[champ] = tk.Label(row, text="…", fg=color, bg=self.BG_PANEL,
+                                                font=("Segoe UI", 15, "bold"))
+            self.labels_stats[champ].pack(anchor="w", padx=4)
+
+    def _charger_stats(self, s):
+        if s is None:
+            return
+        for champ, label in self.labels_stats.items():
+            label.configure(text=str(getattr(s, champ)))
 
-    def _charger_pays(self):
-        self._pays_data = get_liste_pays()
-        labels = [f"{r['nom_pays']} ({r['code_pays']}) – {r['nb']} DC"
+    def _charger_pays(self, pays):
+        self._pays_data = pays
+        labels = [f"{r.nom_pays} ({r.code_pays}) – {r.nb} DC"
                   for r in self._pays_data]
         self.combo_pays['values'] = labels
         if labels:
@@ -393,14 +423,47 @@ class AppOpenCenter(tk.Tk):
         idx = self.combo_pays.current()
         if idx < 0:
             return
-        code = self._pays_data[idx]['code_pays']
-        rows = get_datacenters_pays(code)
-        self.tree_pays.delete(*self.tree_pays.get_children())
+        code = self._pays_data[idx].code_pays
+        self.status_var.set(f"Chargement des datacenters de {code}…")
+        tri = self.liste_pays.tri
+        taille = self.liste_pays.taille_page
+
+        def premiere_page(tache):
+            source = get_source_pays(code)
+            return source, (tri, source.lire(*tri, taille))
+
+        # groupe « pays » : un changement rapide de pays annule la requête précédente
+        self.taches.soumettre(("pays", code), premiere_page, groupe="pays",
+                              quand_fini=lambda res: self._afficher_pays(code, *res))
+
+    def _afficher_pays(self, code, source, premiere_page):
+        self.liste_pays.charger(source, premiere_page)
+        self.status_var.set(f"{source.total} datacenters pour {code}")
+
+    # ----------------------------------------------------------
+    def _on_recherche_change(self, *_args):
+        if self._id_recherche is not None:
+            self.after_cancel(self._id_recherche)
+        self._id_recherche = self.after(DELAI_RECHERCHE_MS, self._lancer_recherche)
+
+    def _lancer_recherche(self):
+        self._id_recherche = None
+        texte = self.recherche_var.get()
+        # groupe « recherche » : seule la dernière saisie est affichée
+        self.taches.soumettre(("recherche", texte),
+                              lambda tache: rechercher(texte, fichier_bdd=FICHIER_BDD),
+                              groupe="recherche",
+                              quand_fini=lambda rows: self._afficher_recherche(texte, rows))
+
+    def _afficher_recherche(self, texte, rows):
+        self.tree_recherche.delete(*self.tree_recherche.get_children())
         for r in rows:
-            self.tree_pays.insert("", "end",
-                                  values=(r['name'], r['city'],
-                                          r['net_count'], r['ix_count']))
-        self.status_var.set(f"{len(rows)} datacenters charges pour {code}")
+            self.tree_recherche.insert("", "end",
+                                       values=(r.name, r.org_name, r.city,
+                                               r.country, r.net_count))
+        if texte.strip():
+            self.notebook.select(self.tab_recherche)
+            self.status_var.set(f"{len(rows)} résultats pour « {texte.strip()} »")
 
     # ----------------------------------------------------------
     def _ouvrir_carte(self, fichier):
@@ -408,43 +471,85 @@ class AppOpenCenter(tk.Tk):
         webbrowser.open(f"file://{path}")
         self.status_var.set(f"Carte ouverte : {fichier}")
 
+    def _generer_en_fond(self, cle, titre, type_carte, parametres, generer, quand_fini):
+        """Génère (ou reprend du cache) une carte dans un thread de travail."""
+        def travail(tache):
+            tache.progression(f"Generation {titre} en cours…")
+            return cache_cartes.carte_en_cache(type_carte, parametres, generer, FICHIER_BDD)
+
+        def erreur(e):
+            messagebox.showerror("Erreur", str(e))
+            self.status_var.set(f"Erreur : {e}")
+
+        self.status_var.set(f"Generation {titre} en attente…")
+        self.taches.soumettre(cle, travail, quand_fini=quand_fini, quand_erreur=erreur)
+
     def _carte_pays(self):
         idx = self.combo_pays.current()
         if idx < 0:
             return
         r = self._pays_data[idx]
-        self.status_var.set("Generation de la carte en cours…")
-        self.update()
-        fichier, nb = generer_carte_pays(r['code_pays'], r['nom_pays'])
-        if fichier:
-            self._ouvrir_carte(fichier)
-            self.status_var.set(f"Carte {r['nom_pays']} : {nb} marqueurs → {fichier}")
-        else:
-            messagebox.showwarning("Avertissement",
-                                   "Aucun datacenter avec GPS pour ce pays.")
-            self.status_var.set("Aucun point GPS disponible.")
+
+        def fini(resultat):
+            fichier, depuis_cache = resultat
+            if fichier:
+                self._ouvrir_carte(fichier)
+                origine = " (cache)" if depuis_cache else ""
+                self.status_var.set(f"Carte {r.nom_pays}{origine} → {fichier}")
+            else:
+                messagebox.showwarning("Avertissement",
+                                       "Aucun datacenter avec GPS pour ce pays.")
+                self.status_var.set("Aucun point GPS disponible.")
+
+        def generer(fichier):
+            from carte import carte_interface_pays    # folium : import différé
+            return carte_interface_pays(r.code_pays, r.nom_pays, fichier, FICHIER_BDD)
+
+        self._generer_en_fond(
+            ("carte", r.code_pays), f"de la carte {r.nom_pays}", "pays", (r.code_pays,),
+            generer, fini)
 
     def _carte_tous(self):
-        self.status_var.set("Generation carte globale…")
-        self.update()
-        fichier, nb = generer_carte_tous()
-        self._ouvrir_carte(fichier)
-        self.status_var.set(f"Carte globale : {nb} marqueurs → {fichier}")
+        def fini(resultat):
+            fichier, depuis_cache = resultat
+            self._ouvrir_carte(fichier)
+            origine = " (cache)" if depuis_cache else ""
+            self.status_var.set(f"Carte globale{origine} → {fichier}")
+
+        def generer(fichier):
+            from carte import carte_interface_tous    # folium : import différé
+            return carte_interface_tous(fichier, FICHIER_BDD)
+
+        self._generer_en_fond(("carte", "tous"), "carte globale", "tous", (), generer, fini)
 
     def _carte_bulles(self):
-        self.status_var.set("Generation carte bulles par pays…")
-        self.update()
-        try:
-            from jointure import carte_par_pays
-            f = os.path.join(OUTPUT_DIR, "carte_bulles_interface.html")
-            carte_par_pays(f)
-            self._ouvrir_carte(f)
-            self.status_var.set("Carte bulles generee.")
-        except Exception as e:
-            messagebox.showerror("Erreur", str(e))
+        def generer(fichier):
+            from jointure import carte_par_pays    # folium : import différé
+            return carte_par_pays(fichier)
+
+        def fini(resultat):
+            fichier, depuis_cache = resultat
+            self._ouvrir_carte(fichier)
+            self.status_var.set("Carte bulles (cache)." if depuis_cache
+                                else "Carte bulles generee.")
+
+        self._generer_en_fond(("carte", "bulles"), "carte bulles par pays", "bulles", (),
+                              generer, fini)
 
 
 # ============================================================
 if __name__ == "__main__":
-    app = AppOpenCenter()
+    parser = argparse.ArgumentParser(description="Interface graphique OpenCenter.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Mesure le temps de démarrage puis quitte")
+    parser.add_argument("--debug-sql", action="store_true",
+                        help="Mesure les requêtes SQL (onglet Debug SQL, rapport à la sortie)")
+    parser.add_argument("--journal-sql", default=None, metavar="FICHIER",
+                        help="Journal des requêtes lentes (avec --debug-sql)")
+    args = parser.parse_args()
+
+    if args.debug_sql:
+        instrumentation.activer(journal=args.journal_sql)
+
+    app = AppOpenCenter(profil=args.profile_startup)
     app.mainloop()
@@ -6,10 +6,13 @@
 # ============================================================
 
 import os
-import sqlite3
 import folium
 from folium.plugins import MarkerCluster
 
+import db_query
+from colonnes import instantane
+from carte import MODE_LEGER, ajouter_calque_leger, ajouter_calque_groupes
+
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 FICHIER_BDD = os.path.join(BASE_DIR, "data", "datacenter.sqlite3")
 OUTPUT_DIR  = os.path.join(BASE_DIR, "output")
@@ -21,57 +24,62 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # ============================================================
 
 def afficher_requetes_jointure():
-    """Exécute et affiche plusieurs requêtes SQL avec JOIN."""
-    conn = sqlite3.connect(FICHIER_BDD)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
+    """
+    Affiche plusieurs agrégats par pays joints à la table pays.
+    Les GROUP BY / top-k sont calculés sur l'instantané en colonnes
+    (colonnes.py) ; la table pays (quelques dizaines de lignes) est lue
+    une fois et jointe en Python sur datacenter.country = pays.code_pays.
+    """
+    pays = {p.code_pays: p for p in db_query.executer("pays_noms", fichier_bdd=FICHIER_BDD)}
+    t = instantane(FICHIER_BDD)
+    # jointure interne : seuls les datacenters d'un pays de la table pays
+    dans_pays = t.masque(country=list(pays))
 
     # --- Jointure 1 : nombre de datacenters par pays (avec nom complet) ---
     print("\n=== Nombre de datacenters par pays (nom complet) ===")
-    c.execute("""
-        SELECT p.nom_pays, d.country, COUNT(*) AS nb
-        FROM datacenter d
-        JOIN pays p ON d.country = p.code_pays
-        GROUP BY d.country
-        ORDER BY nb DESC
-        LIMIT 15
-    """)
-    # La jointure se fait ici sur : datacenter.country = pays.code_pays
-    for row in c.fetchall():
-        print(f"  {row['nom_pays']:30s} ({row['country']}) : {row['nb']}")
+    for code, nb, _ in t.top_groupes("country", k=15, masque=dans_pays):
+        print(f"  {pays[code].nom_pays:30s} ({code}) : {nb}")
 
     # --- Jointure 2 : moyenne de réseaux par pays avec population ---
     print("\n=== Moyenne réseaux connectés vs population ===")
-    c.execute("""
-        SELECT p.nom_pays,
-               COUNT(*)                  AS nb_dc,
-               ROUND(AVG(d.net_count),1) AS moy_reseaux,
-               p.population
-        FROM datacenter d
-        JOIN pays p ON d.country = p.code_pays
-        GROUP BY d.country
-        ORDER BY moy_reseaux DESC
-        LIMIT 10
-    """)
-    for row in c.fetchall():
-        print(f"  {row['nom_pays']:30s} : {row['nb_dc']} DC, "
-              f"moy. réseaux={row['moy_reseaux']}, pop={row['population']:,}")
+    for code, moyenne, nb in t.top_groupes("country", "net_count", "moyenne",
+                                           k=10, masque=dans_pays):
+        print(f"  {pays[code].nom_pays:30s} : {nb} DC, "
+              f"moy. réseaux={round(moyenne, 1)}, pop={pays[code].population:,}")
 
     # --- Jointure 3 : datacenters en France avec nom du pays ---
     print("\n=== Datacenters en France (jointure) ===")
-    c.execute("""
-        SELECT d.name, d.city, p.nom_pays, d.latitude, d.longitude
-        FROM datacenter d
-        JOIN pays p ON d.country = p.code_pays
-        WHERE p.code_pays = 'FR'
-          AND d.latitude  IS NOT NULL AND d.latitude  != ''
-          AND d.longitude IS NOT NULL AND d.longitude != ''
-        ORDER BY d.city
-    """)
-    rows_fr = c.fetchall()
+    rows_fr = db_query.executer("jointure_detail_pays", ("FR",), FICHIER_BDD)
     print(f"  {len(rows_fr)} datacenters français avec GPS")
 
-    conn.close()
+
+# ============================================================
+# PROXIMITÉ : capitale → datacenter le plus proche (proximite.py)
+# ============================================================
+
+SEUIL_IX = 10     # « gros » point d'échange : au moins SEUIL_IX IX présents
+
+def afficher_capitales_proches(seuil_ix=SEUIL_IX):
+    """
+    Pour chaque capitale de la table pays, affiche le datacenter le plus
+    proche comptant au moins `seuil_ix` points d'échange, et sa distance.
+    Retourne la liste (capitale, distance_km, datacenter).
+    """
+    from proximite import index_bdd
+
+    index = index_bdd(FICHIER_BDD)
+    gros_ix = lambda r: (r.ix_count or 0) >= seuil_ix
+    print(f"\n=== Capitale → datacenter le plus proche (≥ {seuil_ix} IX) ===")
+    resultats = []
+    for cap in db_query.executer("capitales", fichier_bdd=FICHIER_BDD):
+        proches = index.plus_proches(cap.lat, cap.lon, 1, gros_ix)
+        if not proches:
+            continue
+        distance, dc = proches[0]
+        resultats.append((cap, distance, dc))
+        print(f"  {cap.capitale[:18]:18s} ({cap.code_pays}) : {distance:7.1f} km  "
+              f"{dc.name[:40]} – {dc.city} ({dc.country}, {dc.ix_count} IX)")
+    return resultats
 
 
 # ============================================================
@@ -90,28 +98,12 @@ def couleur_par_nb(nb):
 def carte_par_pays(fichier=None):
     """
     Crée une carte avec un marqueur par pays positionné sur la capitale,
-    indiquant le nombre de datacenters.
+    indiquant le nombre de datacenters. Retourne le chemin du fichier.
     """
     if fichier is None:
         fichier = os.path.join(OUTPUT_DIR, "carte_par_pays.html")
-    conn = sqlite3.connect(FICHIER_BDD)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
     # Jointure : datacenter x pays  →  nb dc + coord capitale
-    c.execute("""
-        SELECT p.nom_pays, p.code_pays,
-               p.lat_capitale, p.lon_capitale,
-               p.capitale,
-               COUNT(d.id)              AS nb_dc,
-               ROUND(AVG(d.net_count),1) AS moy_reseaux
-        FROM pays p
-        LEFT JOIN datacenter d ON d.country = p.code_pays
-        GROUP BY p.code_pays
-        ORDER BY nb_dc DESC
-    """)
-    rows = c.fetchall()
-    conn.close()
+    rows = db_query.executer("jointure_capitales", fichier_bdd=FICHIER_BDD)
 
     carte = folium.Map(
         location=(50.0, 15.0),
@@ -120,31 +112,33 @@ def carte_par_pays(fichier=None):
     )
 
     for r in rows:
-        if r['lat_capitale'] and r['lon_capitale']:
+        if r.lat_capitale and r.lon_capitale:
             folium.CircleMarker(
-                location=(r['lat_capitale'], r['lon_capitale']),
-                radius=max(5, min(30, r['nb_dc'] / 5)),
-                color=couleur_par_nb(r['nb_dc']),
+                location=(r.lat_capitale, r.lon_capitale),
+                radius=max(5, min(30, r.nb_dc / 5)),
+                color=couleur_par_nb(r.nb_dc),
                 fill=True,
                 fill_opacity=0.7,
                 popup=folium.Popup(
-                    f"<b>{r['nom_pays']}</b><br>"
-                    f"Datacenters : {r['nb_dc']}<br>"
-                    f"Moy. réseaux connectés : {r['moy_reseaux']}",
+                    f"<b>{r.nom_pays}</b><br>"
+                    f"Datacenters : {r.nb_dc}<br>"
+                    f"Moy. réseaux connectés : {r.moy_reseaux}",
                     max_width=250
                 ),
-                tooltip=f"{r['nom_pays']} : {r['nb_dc']} DC"
+                tooltip=f"{r.nom_pays} : {r.nb_dc} DC"
             ).add_to(carte)
 
     carte.save(fichier)
     print(f"Carte sauvegardée : {fichier}")
+    return fichier
 
 
 # ============================================================
 # CARTE 2 : Datacenters d'un pays spécifique (ex : France)
 # ============================================================
 
-def carte_pays_detail(code_pays='FR', fichier=None):
+def carte_pays_detail(code_pays='FR', fichier=None, leger=MODE_LEGER,
+                      regroupement=False):
     """
     Crée une carte avec tous les datacenters d'un pays donné.
     La jointure permet d'afficher le nom complet du pays.
@@ -152,57 +146,46 @@ def carte_pays_detail(code_pays='FR', fichier=None):
     if fichier is None:
         fichier = os.path.join(OUTPUT_DIR, f"carte_{code_pays.lower()}.html")
 
-    conn = sqlite3.connect(FICHIER_BDD)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
     # Jointure pour récupérer le nom du pays
-    c.execute("""
-        SELECT d.name, d.city, d.net_count, d.ix_count,
-               d.website, p.nom_pays,
-               CAST(d.latitude  AS REAL) AS lat,
-               CAST(d.longitude AS REAL) AS lon
-        FROM datacenter d
-        JOIN pays p ON d.country = p.code_pays
-        WHERE p.code_pays = ?
-          AND d.latitude  IS NOT NULL AND d.latitude  != ''
-          AND d.longitude IS NOT NULL AND d.longitude != ''
-          AND CAST(d.latitude  AS REAL) BETWEEN -90  AND 90
-          AND CAST(d.longitude AS REAL) BETWEEN -180 AND 180
-    """, (code_pays,))
-    rows = c.fetchall()
+    rows = db_query.executer("jointure_detail_pays", (code_pays,), FICHIER_BDD)
 
     # Centre de la carte = centroïde des points
     if rows:
-        centre_lat = sum(r['lat'] for r in rows) / len(rows)
-        centre_lon = sum(r['lon'] for r in rows) / len(rows)
+        centre_lat = sum(r.lat for r in rows) / len(rows)
+        centre_lon = sum(r.lon for r in rows) / len(rows)
     else:
         centre_lat, centre_lon = 46.2, 2.2
 
-    nom_pays = rows[0]['nom_pays'] if rows else code_pays
-    conn.close()
+    nom_pays = rows[0].nom_pays if rows else code_pays
 
     carte = folium.Map(
         location=(centre_lat, centre_lon),
         zoom_start=6,
         attr='© Contributeurs OpenStreetMap'
     )
-    cluster = MarkerCluster(name=f"Datacenters {nom_pays}").add_to(carte)
+    if regroupement:
+        # Groupes précalculés par zoom, bulles proportionnelles aux réseaux
+        from regroupement import pyramide_bdd
+        ajouter_calque_groupes(carte, pyramide_bdd(code_pays, FICHIER_BDD))
+    elif leger:
+        ajouter_calque_leger(carte, rows, f"Datacenters {nom_pays}")
+    else:
+        cluster = MarkerCluster(name=f"Datacenters {nom_pays}").add_to(carte)
 
-    for r in rows:
-        folium.Marker(
-            location=(r['lat'], r['lon']),
-            popup=folium.Popup(
-                f"<b>{r['name']}</b><br>"
-                f"Ville : {r['city']}<br>"
-                f"Pays : {r['nom_pays']}<br>"
-                f"Réseaux : {r['net_count']} | IX : {r['ix_count']}<br>"
-                f"<a href='{r['website']}' target='_blank'>Site web</a>",
-                max_width=300
-            ),
-            tooltip=r['name'],
-            icon=folium.Icon(color='blue', icon='server', prefix='fa')
-        ).add_to(cluster)
+        for r in rows:
+            folium.Marker(
+                location=(r.lat, r.lon),
+                popup=folium.Popup(
+                    f"<b>{r.name}</b><br>"
+                    f"Ville : {r.city}<br>"
+                    f"Pays : {r.nom_pays}<br>"
+                    f"Réseaux : {r.net_count} | IX : {r.ix_count}<br>"
+                    f"<a href='{r.website}' target='_blank'>Site web</a>",
+                    max_width=300
+                ),
+                tooltip=r.name,
+                icon=folium.Icon(color='blue', icon='server', prefix='fa')
+            ).add_to(cluster)
 
     folium.LayerControl().add_to(carte)
     carte.save(fichier)
@@ -214,11 +197,14 @@ if __name__ == "__main__":
     # 1. Affichage des requêtes avec jointure dans le terminal
     afficher_requetes_jointure()
 
-    # 2. Carte par pays (cercles proportionnels)
+    # 2. Distance de chaque capitale au plus proche gros nœud d'échange
+    afficher_capitales_proches()
+
+    # 3. Carte par pays (cercles proportionnels)
     carte_par_pays()
 
-    # 3. Carte détaillée France
+    # 4. Carte détaillée France
     carte_pays_detail('FR')
 
-    # 4. Carte détaillée Allemagne
+    # 5. Carte détaillée Allemagne
     carte_pays_detail('DE')
@@ -0,0 +1,242 @@
+# ============================================================
+# liste_virtuelle.py – Treeview paginé pour les grandes listes
+# ============================================================
+# Un ttk.Treeview classique garde un élément par ligne : insérer les
+# milliers de datacenters d'un pays un par un fige l'interface.
+# ListeVirtuelle n'affiche que les lignes visibles (autant d'éléments
+# que la hauteur du widget en permet) et lit les lignes par pages de
+# TAILLE_PAGE dans SQLite, à mesure du défilement :
+#   - page suivante d'une page connue : pagination par clé
+#     WHERE (tri, id) > (dernière ligne) – l'index est parcouru
+#     directement à partir de la clé (en DESC, les lignes dont le tri
+#     est NULL, rangées en dernier, sont ajoutées par « OR tri IS NULL ») ;
+#   - saut (barre de défilement tirée) : LIMIT ? OFFSET ? ;
+#   - seules les PAGES_GARDEES dernières pages utilisées restent en
+#     mémoire (tampon autour de la zone visible).
+# Un clic sur un en-tête de colonne change le ORDER BY de la requête
+# (index (country, colonne)) au lieu de trier les lignes en Python.
+# Les requêtes sont celles de db_query.enregistrer_pages().
+# ============================================================
+
+from tkinter import ttk
+from collections import OrderedDict
+
+import db_query
+
+TAILLE_PAGE    = 100      # lignes lues par requête
+PAGES_GARDEES  = 5        # pages gardées en mémoire
+LIGNES_MOLETTE = 3        # lignes défilées par cran de molette
+FLECHES        = {"asc": " ▲", "desc": " ▼"}
+
+
+class SourcePages:
+    """Lignes d'une requête paginée du registre (`nom` = préfixe passé à enregistrer_pages)."""
+
+    def __init__(self, nom: str, parametres=(), total: int = 0,
+                 fichier_bdd: str = db_query.FICHIER_BDD):
+        self.nom = nom
+        self.parametres = tuple(parametres)
+        self.total = total
+        self.fichier_bdd = fichier_bdd
+
+    def lire(self, colonne: str, sens: str, limite: int,
+             offset: int = 0, apres: tuple | None = None) -> list:
+        """`limite` lignes triées, à partir de la position `offset` ou après la clé `apres`."""
+        if apres is not None:
+            return db_query.executer(f"{self.nom}_{colonne}_{sens}_apres",
+                                     (*self.parametres, *apres, limite), self.fichier_bdd)
+        return db_query.executer(f"{self.nom}_{colonne}_{sens}",
+                                 (*self.parametres, limite, offset), self.fichier_bdd)
+
+
+class ListeVirtuelle(ttk.Frame):
+    """
+    Treeview + barre de défilement alimentés par une SourcePages.
+    `colonnes` : [(colonne, titre, largeur, sens du premier clic), ...] ;
+    les lignes lues doivent avoir ces champs et un champ `id`.
+    """
+
+    def __init__(self, parent, colonnes, tri=("net_count", "desc"),
+                 taille_page: int = TAILLE_PAGE, pages_gardees: int = PAGES_GARDEES):
+        super().__init__(parent)
+        self.colonnes = [c[0] for c in colonnes]
+        self.titres = {c[0]: c[1] for c in colonnes}
+        self.sens_initial = {c[0]: c[3] for c in colonnes}
+        self.tri = tuple(tri)
+        self.taille_page = taille_page
+        self.pages_gardees = pages_gardees
+
+        self.source = None
+        self.total = 0
+        self.debut = 0               # index de la première ligne visible
+        self.nb_visibles = 1
+        self.selection = None        # index de la ligne sélectionnée
+        self._pages = OrderedDict()  # n° de page → lignes (du moins récent au plus récent)
+
+        self.tree = ttk.Treeview(self, columns=self.colonnes, show="headings",
+                                 selectmode="browse")
+        for col, titre, largeur, _sens in colonnes:
+            self.tree.heading(col, text=titre, command=lambda c=col: self.trier(c))
+            self.tree.column(col, width=largeur, anchor="w")
+        self._titres_entetes()
+
+        self.barre = ttk.Scrollbar(self, orient="vertical", command=self._defiler)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.barre.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self._redimensionner)
+        self.tree.bind("<MouseWheel>", self._molette)
+        self.tree.bind("<Button-4>", lambda e: self._faire_defiler(-LIGNES_MOLETTE))
+        self.tree.bind("<Button-5>", lambda e: self._faire_defiler(LIGNES_MOLETTE))
+        self.tree.bind("<<TreeviewSelect>>", self._selectionner)
+        self.tree.bind("<Up>", lambda e: self._deplacer(-1))
+        self.tree.bind("<Down>", lambda e: self._deplacer(1))
+        self.tree.bind("<Prior>", lambda e: self._deplacer(-self.nb_visibles))
+        self.tree.bind("<Next>", lambda e: self._deplacer(self.nb_visibles))
+
+    # --------------------------------------------------------
+    # DONNÉES
+    # --------------------------------------------------------
+    def charger(self, source: SourcePages, premiere_page=None):
+        """
+        Affiche `source` depuis le début. `premiere_page` = (tri, lignes)
+        déjà lues (ex. dans une tâche de fond) ; ignorée si le tri a changé.
+        """
+        self.source = source
+        self.total = source.total
+        self.debut = 0
+        self.selection = None
+        self._pages.clear()
+        if premiere_page is not None and tuple(premiere_page[0]) == self.tri:
+            self._pages[0] = premiere_page[1]
+        self._afficher()
+
+    def vider(self):
+        self.source = None
+        self.total = 0
+        self._pages.clear()
+        self._afficher()
+
+    def ligne(self, index: int):
+        """Ligne n° `index` dans l'ordre de tri courant (lue si besoin)."""
+        numero, position = divmod(index, self.taille_page)
+        lignes = self._page(numero)
+        return lignes[position] if position < len(lignes) else None
+
+    def ligne_selectionnee(self):
+        return None if self.selection is None else self.ligne(self.selection)
+
+    def _page(self, numero: int) -> list:
+        if numero in self._pages:
+            self._pages.move_to_end(numero)
+            return self._pages[numero]
+
+        colonne, sens = self.tri
+        precedente = self._pages.get(numero - 1)
+        derniere = precedente[-1] if precedente else None
+        # (valeur NULL : la comparaison (tri, id) > (NULL, id) ne renvoie rien)
+        if (derniere is not None and len(precedente) == self.taille_page
+                and getattr(derniere, colonne) is not None):
+            lignes = self.source.lire(colonne, sens, self.taille_page,
+                                      apres=(getattr(derniere, colonne), derniere.id))
+        else:
+            lignes = self.source.lire(colonne, sens, self.taille_page,
+                                      offset=numero * self.taille_page)
+        self._pages[numero] = lignes
+        while len(self._pages) > self.pages_gardees:
+            self._pages.popitem(last=False)
+        return lignes
+
+    # --------------------------------------------------------
+    # TRI
+    # --------------------------------------------------------
+    def trier(self, colonne: str):
+        """Clic sur un en-tête : trie par `colonne` (second clic : sens inverse)."""
+        if self.tri[0] == colonne:
+            sens = "asc" if self.tri[1] == "desc" else "desc"
+        else:
+            sens = self.sens_initial[colonne]
+        self.tri = (colonne, sens)
+        self._titres_entetes()
+        self.debut = 0
+        self.selection = None
+        self._pages.clear()
+        self._afficher()
+
+    def _titres_entetes(self):
+        for col in self.colonnes:
+            fleche = FLECHES[self.tri[1]] if col == self.tri[0] else ""
+            self.tree.heading(col, text=self.titres[col] + fleche)
+
+    # --------------------------------------------------------
+    # AFFICHAGE
+    # --------------------------------------------------------
+    def _afficher(self):
+        """Remplit les éléments du Treeview avec les lignes debut … debut + nb_visibles."""
+        fin = min(self.total, self.debut + self.nb_visibles) if self.source else 0
+        elements = self.tree.get_children()
+        nb = fin - self.debut if fin > self.debut else 0
+        if len(elements) > nb:
+            self.tree.delete(*elements[nb:])
+        for i in range(nb):
+            r = self.ligne(self.debut + i)
+            valeurs = [getattr(r, col) for col in self.colonnes] if r else []
+            if i < len(elements):
+                self.tree.item(elements[i], values=valeurs)
+            else:
+                self.tree.insert("", "end", iid=str(i), values=valeurs)
+
+        visible = self.selection is not None and self.debut <= self.selection < fin
+        self.tree.selection_set((str(self.selection - self.debut),) if visible else ())
+        if self.total:
+            self.barre.set(self.debut / self.total, fin / self.total)
+        else:
+            self.barre.set(0.0, 1.0)
+
+    def _faire_defiler(self, delta: int):
+        debut = max(0, min(self.debut + delta, self.total - self.nb_visibles))
+        if debut != self.debut:
+            self.debut = debut
+            self._afficher()
+
+    def _defiler(self, action, valeur, unite=None):
+        """Commande de la barre de défilement (moveto / scroll)."""
+        if action == "moveto":
+            self._faire_defiler(round(float(valeur) * self.total) - self.debut)
+        elif action == "scroll":
+            pas = self.nb_visibles if unite == "pages" else 1
+            self._faire_defiler(int(valeur) * pas)
+
+    def _molette(self, event):
+        self._faire_defiler(-LIGNES_MOLETTE if event.delta > 0 else LIGNES_MOLETTE)
+
+    def _redimensionner(self, event):
+        hauteur_ligne = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+        # une ligne est réservée aux en-têtes
+        nb = max(1, event.height // hauteur_ligne - 1)
+        if nb != self.nb_visibles:
+            self.nb_visibles = nb
+            self.debut = max(0, min(self.debut, self.total - nb))
+            self._afficher()
+
+    # --------------------------------------------------------
+    # SÉLECTION
+    # --------------------------------------------------------
+    def _selectionner(self, _event):
+        elements = self.tree.selection()
+        if elements:
+            self.selection = self.debut + int(elements[0])
+
+    def _deplacer(self, delta: int):
+        """Flèches / page préc. / page suiv. : déplace la sélection en faisant défiler."""
+        if not self.total:
+            return "break"
+        depart = self.debut if self.selection is None else self.selection
+        self.selection = max(0, min(depart + delta, self.total - 1))
+        if self.selection < self.debut:
+            self.debut = self.selection
+        elif self.selection >= self.debut + self.nb_visibles:
+            self.debut = self.selection - self.nb_visibles + 1
+        self._afficher()
+        self.tree.focus(str(self.selection - self.debut))
+        return "break"
@@ -0,0 +1,150 @@
+# ============================================================
+# ordonnanceur.py – Requêtes concurrentes à débit limité
+# ============================================================
+# SeauJetons  : limiteur de débit (seau à jetons) partagé entre
+#               plusieurs threads ; chaque backend distant a le sien.
+# Ordonnanceur: répartit une liste de tâches (adresses uniques)
+#               entre des threads de travail, plusieurs par backend,
+#               chacun attendant un jeton de son backend avant
+#               d'envoyer sa requête. Le débit total atteint la somme
+#               des débits configurés sans temps mort : l'attente
+#               porte sur l'heure de départ, pas sur la fin de la
+#               requête précédente.
+# GeocodeurStub : faux service (mêmes méthodes que geopy) pour
+#               tester le pipeline sans réseau.
+# ============================================================
+
+import time
+import queue
+import hashlib
+import threading
+from collections import namedtuple
+
+Location = namedtuple("Location", "latitude longitude address")
+
+
+# ============================================================
+class SeauJetons:
+    """
+    Limiteur de débit : `debit` jetons par seconde, au plus `rafale`
+    d'avance. acquerir() réserve le prochain créneau puis dort jusqu'à
+    lui (algorithme GCRA), ce qui le rend sûr entre threads.
+    """
+
+    def __init__(self, debit: float, rafale: int = 1):
+        if debit <= 0:
+            raise ValueError("Le débit doit être strictement positif.")
+        self.intervalle = 1.0 / debit
+        self.rafale = max(1, rafale)
+        self._prochain = 0.0          # heure théorique du prochain jeton
+        self._verrou = threading.Lock()
+
+    def reserver(self) -> float:
+        """Réserve un jeton ; retourne le délai d'attente (s) avant de l'utiliser."""
+        with self._verrou:
+            maintenant = time.monotonic()
+            theorique = max(self._prochain, maintenant)
+            depart = max(maintenant, theorique - (self.rafale - 1) * self.intervalle)
+            self._prochain = theorique + self.intervalle
+        return depart - maintenant
+
+    def acquerir(self):
+        """Bloque jusqu'à ce qu'un jeton soit disponible."""
+        attente = self.reserver()
+        if attente > 0:
+            time.sleep(attente)
+
+
+# ============================================================
+_FIN = object()
+
+
+class Ordonnanceur:
+    """
+    Exécute des tâches sur plusieurs backends distants, chacun ayant
+    son propre SeauJetons (`backend.seau`) et `par_backend` threads.
+    Toutes les tâches doivent être acceptées par tous les backends
+    (ex. plusieurs serveurs Nominatim).
+    """
+
+    def __init__(self, backends: list, par_backend: int = 2):
+        self.backends = backends
+        self.par_backend = max(1, par_backend)
+
+    def _travailler(self, backend, taches: queue.Queue, resultats: queue.Queue):
+        while True:
+            tache = taches.get()
+            if tache is _FIN:
+                return
+            try:
+                resultat = backend.geocoder(tache)
+            except Exception as e:   # un échec isolé ne doit pas bloquer le lot
+                print(f"Erreur {backend.nom} : {e}")
+                resultat = (None, False)
+            resultats.put((tache, resultat, backend.nom))
+
+    def executer(self, taches):
+        """
+        Traite `taches` et renvoie les résultats au fur et à mesure
+        (générateur de (tache, (coords, definitif), nom_backend)).
+        """
+        taches = list(taches)
+        if not taches:
+            return
+        file_taches = queue.Queue()
+        file_resultats = queue.Queue()
+        for tache in taches:
+            file_taches.put(tache)
+
+        threads = []
+        for backend in self.backends:
+            for _ in range(self.par_backend):
+                t = threading.Thread(target=self._travailler, daemon=True,
+                                     args=(backend, file_taches, file_resultats))
+                threads.append(t)
+        for _ in threads:
+            file_taches.put(_FIN)
+        for t in threads:
+            t.start()
+
+        try:
+            for _ in range(len(taches)):
+                yield file_resultats.get()
+        finally:
+            # Interruption : vider la file pour que les threads s'arrêtent
+            try:
+                while True:
+                    if file_taches.get_nowait() is not _FIN:
+                        continue
+            except queue.Empty:
+                pass
+            for _ in threads:
+                file_taches.put(_FIN)
+
+
+# ============================================================
+class GeocodeurStub:
+    """
+    Faux géocodeur déterministe (même interface que geopy) :
+    les coordonnées sont dérivées d'un hachage de l'adresse.
+    Les adresses contenant un des mots de `introuvables` n'ont pas
+    de résultat ; `latence` simule le temps de réponse du réseau.
+    """
+
+    def __init__(self, latence: float = 0.0, introuvables=("introuvable",)):
+        self.latence = latence
+        self.introuvables = tuple(m.casefold() for m in introuvables)
+        self.appels = []
+        self._verrou = threading.Lock()
+
+    def geocode(self, adresse: str, timeout=None):
+        with self._verrou:
+            self.appels.append((time.monotonic(), adresse))
+        if self.latence:
+            time.sleep(self.latence)
+        if any(m in adresse.casefold() for m in self.introuvables):
+            return None
+        h = hashlib.md5(adresse.encode("utf-8")).digest()
+        lat = 35.0 + h[0] / 255 * 35.0      # Europe : 35°N – 70°N
+        lon = -10.0 + h[1] / 255 * 50.0     #          10°W – 40°E
+        return Location(lat, lon, adresse)
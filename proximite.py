@@ -0,0 +1,160 @@
+# ============================================================
+# proximite.py – Index spatial et requêtes de proximité
+# ============================================================
+# Les datacenters géolocalisés sont rangés dans une grille de
+# cellules de TAILLE_CELLULE degrés (dictionnaire cellule → points) :
+# une requête ne parcourt que les cellules qui recoupent la zone
+# cherchée, puis filtre les candidats avec la distance haversine.
+#   - dans_rectangle(lat_min, lon_min, lat_max, lon_max)
+#   - dans_rayon(lat, lon, rayon_km)
+#   - plus_proches(lat, lon, k)   (rayon doublé jusqu'à k résultats)
+# L'index de la base est construit une fois par état des données
+# (index_bdd), ce qui rend les requêtes utilisables depuis l'interface.
+#
+# Usage : python proximite.py LAT LON [--rayon KM] [-k N]
+# ============================================================
+
+import math
+import argparse
+from functools import lru_cache
+
+import db_query
+from cache_cartes import empreinte_donnees, FICHIER_BDD
+
+RAYON_TERRE    = 6371.0088       # km (rayon moyen)
+KM_PAR_DEGRE   = math.pi * RAYON_TERRE / 180
+DEMI_TOUR      = math.pi * RAYON_TERRE   # distance maximale entre deux points
+TAILLE_CELLULE = 1.0             # degrés
+
+
+# ============================================================
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance orthodromique en km entre deux points (degrés décimaux)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RAYON_TERRE * math.asin(min(1.0, math.sqrt(a)))
+
+
+class IndexSpatial:
+    """
+    Grille de points (objets ayant des attributs `lat` et `lon`,
+    ex. lignes de la requête datacenters_gps).
+    """
+
+    def __init__(self, points, taille_cellule: float = TAILLE_CELLULE):
+        self.taille = taille_cellule
+        self.cellules = {}
+        self.points = list(points)
+        for p in self.points:
+            self.cellules.setdefault(self._cellule(p.lat, p.lon), []).append(p)
+        self.nb_colonnes = math.ceil(360 / taille_cellule)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cellule(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.taille), math.floor((lon + 180) / self.taille)
+
+    def _candidats(self, lat_min, lon_min, lat_max, lon_max):
+        """Points des cellules recoupant le rectangle (lon_min > lon_max : passe l'antiméridien)."""
+        i0 = math.floor(lat_min / self.taille)
+        i1 = math.floor(lat_max / self.taille)
+        j0 = math.floor((lon_min + 180) / self.taille)
+        j1 = math.floor((lon_max + 180) / self.taille)
+        if lon_min > lon_max:
+            j1 += self.nb_colonnes
+        colonnes = {j % self.nb_colonnes for j in range(j0, j1 + 1)}
+        for i in range(i0, i1 + 1):
+            for j in colonnes:
+                yield from self.cellules.get((i, j), ())
+
+    # --------------------------------------------------------
+    def dans_rectangle(self, lat_min: float, lon_min: float,
+                       lat_max: float, lon_max: float) -> list:
+        """Points dont les coordonnées sont dans le rectangle."""
+        traverse = lon_min > lon_max
+        return [
+            p for p in self._candidats(lat_min, lon_min, lat_max, lon_max)
+            if lat_min <= p.lat <= lat_max
+            and ((p.lon >= lon_min or p.lon <= lon_max) if traverse
+                 else lon_min <= p.lon <= lon_max)
+        ]
+
+    def dans_rayon(self, lat: float, lon: float, rayon_km: float,
+                   filtre=None) -> list[tuple[float, object]]:
+        """(distance_km, point) à moins de `rayon_km`, du plus proche au plus lointain."""
+        dlat = rayon_km / KM_PAR_DEGRE
+        lat_min, lat_max = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+        if cos_lat <= 1e-9 or rayon_km / (KM_PAR_DEGRE * cos_lat) >= 180:
+            lon_min, lon_max = -180.0, 180.0          # pôle ou très grand rayon
+        else:
+            dlon = rayon_km / (KM_PAR_DEGRE * cos_lat)
+            lon_min = (lon - dlon + 180) % 360 - 180
+            lon_max = (lon + dlon + 180) % 360 - 180
+        resultats = []
+        for p in self._candidats(lat_min, lon_min, lat_max, lon_max):
+            if filtre is not None and not filtre(p):
+                continue
+            d = haversine(lat, lon, p.lat, p.lon)
+            if d <= rayon_km:
+                resultats.append((d, p))
+        resultats.sort(key=lambda t: t[0])
+        return resultats
+
+    def plus_proches(self, lat: float, lon: float, k: int = 1,
+                     filtre=None) -> list[tuple[float, object]]:
+        """Les `k` points les plus proches (distance_km, point), avec `filtre` optionnel."""
+        rayon = self.taille * KM_PAR_DEGRE
+        while True:
+            resultats = self.dans_rayon(lat, lon, rayon, filtre)
+            if len(resultats) >= k or rayon >= DEMI_TOUR:
+                return resultats[:k]
+            rayon = min(rayon * 2, DEMI_TOUR)
+
+
+# ============================================================
+@lru_cache(maxsize=4)
+def _index(fichier_bdd: str, empreinte: str) -> IndexSpatial:
+    return IndexSpatial(db_query.executer("datacenters_gps", fichier_bdd=fichier_bdd))
+
+
+def index_bdd(fichier_bdd: str = FICHIER_BDD) -> IndexSpatial:
+    """Index des datacenters géolocalisés (reconstruit quand les données changent)."""
+    return _index(fichier_bdd, empreinte_donnees(fichier_bdd))
+
+
+def dans_rectangle(lat_min, lon_min, lat_max, lon_max, fichier_bdd=FICHIER_BDD) -> list:
+    return index_bdd(fichier_bdd).dans_rectangle(lat_min, lon_min, lat_max, lon_max)
+
+
+def dans_rayon(lat, lon, rayon_km, filtre=None, fichier_bdd=FICHIER_BDD) -> list:
+    return index_bdd(fichier_bdd).dans_rayon(lat, lon, rayon_km, filtre)
+
+
+def plus_proches(lat, lon, k=1, filtre=None, fichier_bdd=FICHIER_BDD) -> list:
+    return index_bdd(fichier_bdd).plus_proches(lat, lon, k, filtre)
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Datacenters proches d'un point (distance haversine)."
+    )
+    parser.add_argument("lat", type=float)
+    parser.add_argument("lon", type=float)
+    parser.add_argument("--rayon", type=float, default=None, metavar="KM",
+                        help="Tous les datacenters à moins de KM km")
+    parser.add_argument("-k", type=int, default=5, metavar="N",
+                        help="Les N plus proches (défaut : 5)")
+    args = parser.parse_args()
+
+    if args.rayon is not None:
+        resultats = dans_rayon(args.lat, args.lon, args.rayon)
+    else:
+        resultats = plus_proches(args.lat, args.lon, args.k)
+    for distance, r in resultats:
+        print(f"  {distance:8.1f} km  {r.name[:45]:45s} {r.city} ({r.country})")
+    print(f"{len(resultats)} datacenters")
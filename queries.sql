@@ -1,6 +1,7 @@
 -- ============================================================
 -- ACTIVITÉ 4 : Requêtes SQL – Base de données Datacenters
 -- Jeu de données : PeeringDB – Datacenters européens
+-- Schéma typé (schema.py) : latitude/longitude REAL, NULL si absentes
 -- ============================================================
 
 -- 1. Nombre total de datacenters
@@ -48,14 +49,12 @@ LIMIT 10;
 -- 8. Nombre de datacenters disposant de coordonnées GPS valides
 SELECT COUNT(*) AS avec_gps
 FROM datacenter
-WHERE latitude  IS NOT NULL AND latitude  != ''
-  AND longitude IS NOT NULL AND longitude != '';
+WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
 
 -- 9. Datacenters sans coordonnées GPS
 SELECT COUNT(*) AS sans_gps
 FROM datacenter
-WHERE latitude  IS NULL OR latitude  = ''
-   OR longitude IS NULL OR longitude = '';
+WHERE latitude IS NULL OR longitude IS NULL;
 
 -- 10. Répartition par statut
 SELECT status, COUNT(*) AS nb
@@ -81,8 +80,7 @@ WHERE country = 'FR';
 SELECT name AS datacenter, city AS ville, latitude, longitude
 FROM datacenter
 WHERE country = 'FR'
-  AND latitude  IS NOT NULL AND latitude  != ''
-  AND longitude IS NOT NULL AND longitude != ''
+  AND latitude IS NOT NULL AND longitude IS NOT NULL
 ORDER BY city;
 
 -- 14. Datacenters créés après 2020
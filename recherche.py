@@ -0,0 +1,56 @@
+# ============================================================
+# recherche.py – Recherche plein texte des datacenters (FTS5)
+# ============================================================
+# La table virtuelle `datacenter_fts` (schema.py, version 6) indexe
+# le nom, l'alias, l'organisation, la ville, l'adresse et le code
+# CLLI de chaque datacenter ; des triggers la tiennent à jour à
+# chaque import, synchronisation ou modification de `datacenter`.
+#
+# Le texte saisi est découpé en mots ; chaque mot devient une
+# recherche par préfixe ("equin"* trouve Equinix), tous les mots
+# devant être présents. Les accents sont ignorés (« zurich » trouve
+# « Zürich ») et les résultats sont classés par bm25, le nom pesant
+# plus que l'adresse (schema.COLONNES_RECHERCHE).
+#
+# Usage : python recherche.py MOTS… [--limite N]
+# ============================================================
+
+import re
+import argparse
+
+import db_query
+
+LIMITE        = 100     # résultats renvoyés au plus
+LONGUEUR_MIN  = 2       # caractères avant de lancer une recherche
+MOT           = re.compile(r"\w+", re.UNICODE)
+
+
+def expression_fts(texte: str) -> str:
+    """Texte libre → expression MATCH : "mot1"* "mot2"* ('' si rien à chercher)."""
+    mots = MOT.findall(texte)
+    return " ".join(f'"{mot}"*' for mot in mots)
+
+
+def rechercher(texte: str, limite: int = LIMITE,
+               fichier_bdd: str = db_query.FICHIER_BDD) -> list:
+    """Datacenters actifs correspondant à `texte`, les plus pertinents d'abord."""
+    expression = expression_fts(texte)
+    if len(texte.strip()) < LONGUEUR_MIN or not expression:
+        return []
+    return db_query.executer("recherche_datacenters", (expression, limite), fichier_bdd)
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recherche un datacenter par nom, organisation, ville, adresse ou CLLI."
+    )
+    parser.add_argument("mots", nargs="+")
+    parser.add_argument("--limite", type=int, default=20, metavar="N",
+                        help="Nombre maximal de résultats (défaut : 20)")
+    args = parser.parse_args()
+
+    resultats = rechercher(" ".join(args.mots), args.limite)
+    for r in resultats:
+        print(f"  {r.name[:40]:40s} {(r.org_name or '')[:25]:25s} {r.city} ({r.country})")
+    print(f"{len(resultats)} datacenters")
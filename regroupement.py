@@ -0,0 +1,115 @@
+# ============================================================
+# regroupement.py – Regroupement des datacenters par grille (NumPy)
+# ============================================================
+# Alternative à MarkerCluster (qui regroupe dans le navigateur à
+# chaque ouverture et à chaque zoom) : les groupes sont calculés une
+# fois en Python pour tous les niveaux de zoom.
+#
+# Au zoom z, la carte est une grille de 2^z tuiles de 256 px ; chaque
+# tuile est divisée en SUBDIVISION x SUBDIVISION cellules et les
+# points d'une même cellule forment un groupe. La grille de z-1
+# s'obtient en divisant par 2 les indices de cellule (cle // 2) : on
+# part du zoom le plus fin et on agrège les groupes, pas les points.
+# Chaque groupe garde son effectif, son barycentre et la somme des
+# net_count / ix_count de ses datacenters.
+# ============================================================
+
+import numpy as np
+from functools import lru_cache
+
+import db_query
+from cache_cartes import empreinte_donnees, FICHIER_BDD
+
+ZOOM_MIN    = 0
+ZOOM_MAX    = 15         # au-delà, les groupes restants ne bougent plus
+SUBDIVISION = 4          # 4 x 4 cellules de 64 px par tuile
+LAT_MAX     = 85.05112878
+
+
+# ============================================================
+def cellules(lat, lon, zoom: int):
+    """Indices (x, y) des cellules de la grille au `zoom` donné (vectorisé)."""
+    n = (2 ** zoom) * SUBDIVISION
+    phi = np.radians(np.clip(lat, -LAT_MAX, LAT_MAX))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(phi)) / np.pi) / 2.0 * n)
+    return (np.clip(x, 0, n - 1).astype(np.int64),
+            np.clip(y, 0, n - 1).astype(np.int64))
+
+
+def _agreger(x, y, poids: dict, premier, zoom: int):
+    """Fusionne les éléments de même cellule (x, y) ; sommes pondérées par bincount."""
+    n = (2 ** zoom) * SUBDIVISION
+    uniques, inverse = np.unique(x * n + y, return_inverse=True)
+    sommes = {k: np.bincount(inverse, weights=v, minlength=len(uniques))
+              for k, v in poids.items()}
+    representant = np.full(len(uniques), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(representant, inverse, premier)
+    return uniques // n, uniques % n, sommes, representant
+
+
+def pyramide(lat, lon, net=None, ix=None, noms=None,
+             zoom_min: int = ZOOM_MIN, zoom_max: int = ZOOM_MAX) -> dict:
+    """
+    Groupes de chaque niveau de zoom :
+    {zoom: [[lat, lon, nb, somme_net, somme_ix, nom], ...]}
+    (nom renseigné seulement pour les groupes d'un seul datacenter).
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    net = np.zeros_like(lat) if net is None else np.nan_to_num(np.asarray(net, dtype=float))
+    ix = np.zeros_like(lat) if ix is None else np.nan_to_num(np.asarray(ix, dtype=float))
+    if lat.size == 0:
+        return {z: [] for z in range(zoom_min, zoom_max + 1)}
+
+    x, y = cellules(lat, lon, zoom_max)
+    poids = {"nb": np.ones_like(lat), "lat": lat, "lon": lon, "net": net, "ix": ix}
+    premier = np.arange(lat.size, dtype=np.int64)
+
+    niveaux = {}
+    for zoom in range(zoom_max, zoom_min - 1, -1):
+        x, y, poids, premier = _agreger(x, y, poids, premier, zoom)
+        nb = poids["nb"]
+        niveaux[zoom] = [
+            [round(la, 5), round(lo, 5), int(n), int(s_net), int(s_ix),
+             noms[p] if noms is not None and n == 1 else ""]
+            for la, lo, n, s_net, s_ix, p in zip(
+                (poids["lat"] / nb).tolist(), (poids["lon"] / nb).tolist(),
+                nb.tolist(), poids["net"].tolist(), poids["ix"].tolist(), premier.tolist())
+        ]
+        x, y = x // 2, y // 2     # cellules du niveau de zoom inférieur
+    return niveaux
+
+
+# ============================================================
+# DONNÉES DE LA BASE (chargées une fois par état des données)
+# ============================================================
+
+@lru_cache(maxsize=4)
+def _tableaux(fichier_bdd: str, empreinte: str) -> dict:
+    rows = db_query.executer("datacenters_gps", fichier_bdd=fichier_bdd)
+    return {
+        "lat":  np.fromiter((r.lat for r in rows), float, len(rows)),
+        "lon":  np.fromiter((r.lon for r in rows), float, len(rows)),
+        "net":  np.fromiter((r.net_count or 0 for r in rows), float, len(rows)),
+        "ix":   np.fromiter((r.ix_count or 0 for r in rows), float, len(rows)),
+        "pays": np.array([r.country or "" for r in rows]),
+        "noms": [r.name for r in rows],
+    }
+
+
+def tableaux_bdd(fichier_bdd: str = FICHIER_BDD) -> dict:
+    """Tableaux NumPy lat / lon / net / ix / pays (+ liste des noms) des DC géolocalisés."""
+    return _tableaux(fichier_bdd, empreinte_donnees(fichier_bdd))
+
+
+def pyramide_bdd(code_pays: str | None = None, fichier_bdd: str = FICHIER_BDD,
+                 zoom_min: int = ZOOM_MIN, zoom_max: int = ZOOM_MAX) -> dict:
+    """pyramide() des datacenters de la base, éventuellement d'un seul pays."""
+    t = tableaux_bdd(fichier_bdd)
+    if code_pays is None:
+        return pyramide(t["lat"], t["lon"], t["net"], t["ix"], t["noms"], zoom_min, zoom_max)
+    masque = t["pays"] == code_pays
+    noms = [nom for nom, garde in zip(t["noms"], masque) if garde]
+    return pyramide(t["lat"][masque], t["lon"][masque], t["net"][masque], t["ix"][masque],
+                    noms, zoom_min, zoom_max)
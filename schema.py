@@ -0,0 +1,459 @@
+# ============================================================
+# schema.py – Schéma typé et migrations de la base SQLite3
+# ============================================================
+# La table `schema_version` garde la trace des migrations
+# appliquées. Chaque script qui ouvre la base appelle migrer()
+# (ou connecter()) : si la base est en retard, les migrations
+# manquantes sont appliquées dans une transaction.
+# Les migrations à partir de la version 2 doivent être idempotentes
+# (elles sont rejouées par initialiser() sur une table neuve).
+#
+# Version 1 : colonnes typées (latitude/longitude en REAL, NULL si
+#             absentes ; created/updated en ISO-8601 UTC triable),
+#             `id` en clé primaire, index de recherche et index
+#             partiel sur les lignes géolocalisées.
+# Version 2 : table `geocode_cache` (résultats de géocodage par
+#             adresse normalisée, succès comme échecs).
+# Version 3 : table `geocode_progression` (état du géocodage de
+#             chaque datacenter, pour reprendre un traitement interrompu).
+# Version 4 : table `stats_pays` (agrégats par pays + ligne globale
+#             PAYS_GLOBAL), recalculée par rafraichir_stats() après
+#             chaque import, synchronisation, géocodage ou import
+#             de la table pays (scripts/import_pays.py).
+# Version 5 : index composites (country, colonne de tri) pour la liste
+#             paginée de l'interface (voir liste_virtuelle.py).
+# Version 6 : index plein texte FTS5 `datacenter_fts` (nom, aka,
+#             organisation, ville, adresse, code CLLI), tenu à jour
+#             par des triggers sur `datacenter` (voir recherche.py).
+# Version 7 : coordonnées à 0 comptées comme absentes (CONDITION_GPS) :
+#             index partiel GPS recréé, stats_pays recalculée.
+#
+# Usage : python schema.py   (applique les migrations en attente)
+# ============================================================
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import instrumentation
+
+BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
+FICHIER_BDD = os.path.join(BASE_DIR, "data", "datacenter.sqlite3")
+
+# Types SQLite des colonnes de `datacenter` (colonne absente → TEXT)
+TYPES_COLONNES = {
+    "id":            "INTEGER",
+    "org_id":        "INTEGER",
+    "net_count":     "INTEGER",
+    "ix_count":      "INTEGER",
+    "carrier_count": "INTEGER",
+    "latitude":      "REAL",
+    "longitude":     "REAL",
+    "created":       "TEXT",    # 'YYYY-MM-DDTHH:MM:SSZ'
+    "updated":       "TEXT",    # 'YYYY-MM-DDTHH:MM:SSZ'
+}
+COLONNES_DATE = ("created", "updated")
+FORMAT_DATE   = "%Y-%m-%dT%H:%M:%SZ"
+
+# Condition « coordonnées GPS valides », identique à celle de l'index
+# partiel ; une coordonnée à 0 (valeur par défaut de l'export) compte comme
+# absente, les lignes qui ne la vérifient pas sont à géocoder (geocode.py)
+CONDITION_GPS = ("latitude IS NOT NULL AND longitude IS NOT NULL"
+                 " AND latitude != 0 AND longitude != 0")
+
+# Datacenters actifs (ingest.py --sync garde les DC supprimés en amont)
+CONDITION_ACTIF = "status = 'ok'"
+
+# Agrégats de `stats_pays` : ligne de l'ensemble des pays, et bornes
+# basses des classes des histogrammes (dernière classe ouverte)
+PAYS_GLOBAL = "*"
+CLASSES_NET = (0, 1, 6, 11, 51, 101)    # 0 | 1-5 | 6-10 | 11-50 | 51-100 | 101+
+CLASSES_IX  = (0, 1, 2, 4, 11)          # 0 | 1 | 2-3 | 4-10 | 11+
+
+INDEX_DATACENTER = [
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_country   ON datacenter(country)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_net_count ON datacenter(net_count)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_ix_count  ON datacenter(ix_count)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_city      ON datacenter(city)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_org_id    ON datacenter(org_id)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_gps "
+    f"ON datacenter(country, latitude, longitude) WHERE {CONDITION_GPS}",
+    # Pagination par clé (country = ?, ORDER BY <tri>, id) : `id` étant
+    # la clé primaire (rowid), il termine implicitement chaque index
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_pays_net  ON datacenter(country, net_count)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_pays_ix   ON datacenter(country, ix_count)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_pays_nom  ON datacenter(country, name)",
+    "CREATE INDEX IF NOT EXISTS idx_datacenter_pays_city ON datacenter(country, city)",
+]
+
+
+# ============================================================
+# DÉFINITION DE LA TABLE
+# ============================================================
+
+def type_colonne(nom_colonne: str) -> str:
+    """Retourne le type SQLite d'une colonne de `datacenter`."""
+    return TYPES_COLONNES.get(nom_colonne, "TEXT")
+
+
+def definition_table(colonnes: list[str], nom_table: str = "datacenter") -> str:
+    """Requête CREATE TABLE typée pour les colonnes données."""
+    definitions = ", ".join(
+        f'"{col}" {type_colonne(col)}' + (" PRIMARY KEY" if col == "id" else "")
+        for col in colonnes
+    )
+    return f'CREATE TABLE IF NOT EXISTS "{nom_table}" ({definitions})'
+
+
+def creer_index(cursor):
+    """Crée les index de la table `datacenter`."""
+    for requete in INDEX_DATACENTER:
+        cursor.execute(requete)
+
+
+# ============================================================
+# RECHERCHE PLEIN TEXTE (FTS5)
+# ============================================================
+
+# Colonnes indexées et leur poids dans le classement bm25
+COLONNES_RECHERCHE = {
+    "name":     10.0,
+    "aka":       5.0,
+    "clli":      5.0,
+    "org_name":  3.0,
+    "city":      2.0,
+    "address1":  1.0,
+}
+
+
+def creer_recherche(cursor):
+    """
+    (Re)crée la table FTS5 `datacenter_fts` (contenu externe : les textes
+    restent dans `datacenter`), ses triggers de synchronisation, puis
+    reconstruit l'index. Sans effet si la table `datacenter` n'existe pas.
+    """
+    existantes = colonnes_table(cursor.connection)
+    colonnes = [col for col in COLONNES_RECHERCHE if col in existantes]
+    if not colonnes:
+        return
+
+    for suffixe in ("ai", "ad", "au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS datacenter_fts_{suffixe}")
+    cursor.execute("DROP TABLE IF EXISTS datacenter_fts")
+    noms = ", ".join(colonnes)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE datacenter_fts USING fts5(
+            {noms},
+            content='datacenter', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+
+    nouvelles = ", ".join(f"new.{col}" for col in colonnes)
+    anciennes = ", ".join(f"old.{col}" for col in colonnes)
+    cursor.execute(f"""
+        CREATE TRIGGER datacenter_fts_ai AFTER INSERT ON datacenter BEGIN
+            INSERT INTO datacenter_fts (rowid, {noms}) VALUES (new.id, {nouvelles});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER datacenter_fts_ad AFTER DELETE ON datacenter BEGIN
+            INSERT INTO datacenter_fts (datacenter_fts, rowid, {noms})
+            VALUES ('delete', old.id, {anciennes});
+        END
+    """)
+    # Les mises à jour des coordonnées (géocodage) ne touchent pas l'index
+    cursor.execute(f"""
+        CREATE TRIGGER datacenter_fts_au AFTER UPDATE OF id, {noms} ON datacenter BEGIN
+            INSERT INTO datacenter_fts (datacenter_fts, rowid, {noms})
+            VALUES ('delete', old.id, {anciennes});
+            INSERT INTO datacenter_fts (rowid, {noms}) VALUES (new.id, {nouvelles});
+        END
+    """)
+
+    poids = ", ".join(str(COLONNES_RECHERCHE[col]) for col in colonnes)
+    cursor.execute("INSERT INTO datacenter_fts (datacenter_fts, rank) VALUES ('rank', ?)",
+                   (f"bm25({poids})",))
+    cursor.execute("INSERT INTO datacenter_fts (datacenter_fts) VALUES ('rebuild')")
+
+
+@contextmanager
+def recherche_differee(cursor):
+    """
+    Chargement en masse : les triggers FTS sont retirés le temps du bloc
+    et l'index est reconstruit une seule fois à la fin. Avec les triggers,
+    chaque INSERT d'un executemany force FTS5 à écrire un nouveau segment
+    (plusieurs fois plus lent). En cas d'erreur, le ROLLBACK de l'appelant
+    rétablit les triggers.
+    """
+    for suffixe in ("ai", "ad", "au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS datacenter_fts_{suffixe}")
+    yield cursor
+    creer_recherche(cursor)
+
+
+# ============================================================
+# VERSIONS
+# ============================================================
+
+def version_schema(conn) -> int:
+    """Version actuelle du schéma (0 si la base n'a jamais été migrée)."""
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'"
+    ).fetchone()
+    if not existe:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def marquer_version(cursor, version: int):
+    """Enregistre `version` comme appliquée."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version     INTEGER PRIMARY KEY,
+            applique_le TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (?)", (version,))
+
+
+def colonnes_table(conn, nom_table: str = "datacenter") -> list[str]:
+    """Liste des colonnes d'une table ([] si elle n'existe pas)."""
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{nom_table}")')]
+
+
+# ============================================================
+# STATISTIQUES PAR PAYS
+# ============================================================
+
+def _histogramme(colonne: str, classes: tuple) -> str:
+    """Expression SQL json_array() des effectifs de `colonne` par classe."""
+    termes = []
+    for i, bas in enumerate(classes):
+        condition = f"{colonne} >= {bas}"
+        if i + 1 < len(classes):
+            condition += f" AND {colonne} < {classes[i + 1]}"
+        termes.append(f"COALESCE(SUM(CASE WHEN {condition} THEN 1 ELSE 0 END), 0)")
+    return f"json_array({', '.join(termes)})"
+
+
+def _requete_stats(cle: str, group_by: str = "") -> str:
+    return f"""
+        SELECT {cle}, COUNT(*),
+               COALESCE(SUM(CASE WHEN {CONDITION_GPS} THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(net_count), 0), COALESCE(SUM(ix_count), 0),
+               MIN(net_count), MAX(net_count), MIN(ix_count), MAX(ix_count),
+               {_histogramme("net_count", CLASSES_NET)},
+               {_histogramme("ix_count", CLASSES_IX)},
+               ?
+        FROM datacenter
+        WHERE {CONDITION_ACTIF}
+        {group_by}
+    """
+
+
+def rafraichir_stats(cursor) -> int:
+    """
+    Recalcule `stats_pays` (une ligne par pays + la ligne PAYS_GLOBAL)
+    à partir de `datacenter`, dans la transaction de l'appelant.
+    Retourne le nouveau numéro de révision.
+    """
+    revision = cursor.execute(
+        "SELECT COALESCE(MAX(revision), 0) + 1 FROM stats_pays").fetchone()[0]
+    cursor.execute("DELETE FROM stats_pays")
+    par_pays = _requete_stats("COALESCE(country, '')", "GROUP BY country")
+    cursor.execute(f"INSERT INTO stats_pays {par_pays}", (revision,))
+    cursor.execute(f"INSERT INTO stats_pays {_requete_stats('?')}", (PAYS_GLOBAL, revision))
+    return revision
+
+
+# ============================================================
+# MIGRATIONS
+# ============================================================
+
+def _expression_typee(col: str) -> str:
+    """Expression SQL convertissant l'ancienne colonne TEXT vers son type."""
+    source = f"NULLIF(TRIM(\"{col}\"), '')"
+    if col == "latitude":
+        return (f"CASE WHEN CAST({source} AS REAL) BETWEEN -90 AND 90 "
+                f"THEN CAST({source} AS REAL) END")
+    if col == "longitude":
+        return (f"CASE WHEN CAST({source} AS REAL) BETWEEN -180 AND 180 "
+                f"THEN CAST({source} AS REAL) END")
+    if col in COLONNES_DATE:
+        return f"strftime('{FORMAT_DATE}', {source})"
+    if type_colonne(col) == "INTEGER":
+        return f"CAST({source} AS INTEGER)"
+    return f'"{col}"'
+
+
+def _migration_1(c):
+    """Colonnes typées, clé primaire sur `id` et index."""
+    colonnes = colonnes_table(c.connection)
+    if not colonnes:
+        return   # pas encore de table : csv_to_sqlite / ingest la créeront typée
+
+    c.execute("DROP TABLE IF EXISTS datacenter_v1")
+    c.execute(definition_table(colonnes, "datacenter_v1"))
+    noms = ", ".join(f'"{col}"' for col in colonnes)
+    expressions = ", ".join(_expression_typee(col) for col in colonnes)
+    c.execute(f'INSERT OR REPLACE INTO datacenter_v1 ({noms}) '
+              f'SELECT {expressions} FROM datacenter')
+    c.execute("DROP TABLE datacenter")
+    c.execute("ALTER TABLE datacenter_v1 RENAME TO datacenter")
+    creer_index(c)
+
+
+def _migration_2(c):
+    """Cache persistant des résultats de géocodage (voir geocode.py)."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            adresse   TEXT PRIMARY KEY,   -- adresse normalisée
+            latitude  REAL,               -- NULL : adresse introuvable
+            longitude REAL,
+            source    TEXT,               -- service ayant répondu
+            date      INTEGER             -- horodatage Unix de la réponse
+        )
+    """)
+
+
+def _migration_3(c):
+    """Suivi du géocodage ligne par ligne (reprise avec geocode.py --resume)."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_progression (
+            id         INTEGER PRIMARY KEY,  -- datacenter.id
+            statut     TEXT,                 -- 'ok' ou 'echec'
+            tentatives INTEGER DEFAULT 0,    -- nombre de passages
+            source     TEXT,                 -- origine des coordonnées
+            date       INTEGER               -- horodatage Unix du dernier passage
+        )
+    """)
+
+
+def _migration_4(c):
+    """Agrégats par pays matérialisés (voir rafraichir_stats)."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS stats_pays (
+            pays      TEXT PRIMARY KEY,   -- code pays, ou PAYS_GLOBAL
+            nb        INTEGER,            -- datacenters actifs
+            nb_gps    INTEGER,            -- dont géolocalisés
+            somme_net INTEGER,
+            somme_ix  INTEGER,
+            min_net   INTEGER,
+            max_net   INTEGER,
+            min_ix    INTEGER,
+            max_ix    INTEGER,
+            histo_net TEXT,               -- JSON : effectifs par classe CLASSES_NET
+            histo_ix  TEXT,               -- JSON : effectifs par classe CLASSES_IX
+            revision  INTEGER             -- incrémentée à chaque recalcul
+        )
+    """)
+    if "status" in colonnes_table(c.connection):
+        rafraichir_stats(c)
+
+
+def _migration_5(c):
+    """Index (country, colonne de tri) de la liste paginée."""
+    if colonnes_table(c.connection):
+        creer_index(c)
+
+
+def _migration_6(c):
+    """Recherche plein texte sur les datacenters (voir creer_recherche)."""
+    creer_recherche(c)
+
+
+def _migration_7(c):
+    """Coordonnées à 0 = absentes : index partiel GPS et nb_gps selon CONDITION_GPS."""
+    colonnes = colonnes_table(c.connection)
+    if not colonnes:
+        return
+    c.execute("DROP INDEX IF EXISTS idx_datacenter_gps")
+    creer_index(c)
+    if "status" in colonnes:
+        rafraichir_stats(c)
+
+
+# (version, fonction) dans l'ordre d'application
+MIGRATIONS = [
+    (1, _migration_1),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, _migration_4),
+    (5, _migration_5),
+    (6, _migration_6),
+    (7, _migration_7),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def initialiser(cursor):
+    """
+    À appeler juste après la création d'une table `datacenter` typée
+    (dans la transaction de l'appelant) : la version 1 est acquise, les
+    migrations suivantes (idempotentes) sont appliquées puis enregistrées.
+    """
+    marquer_version(cursor, 1)
+    for numero, migration in MIGRATIONS:
+        if numero > 1:
+            migration(cursor)
+            marquer_version(cursor, numero)
+
+
+def migrer(conn) -> int:
+    """
+    Applique les migrations en attente, chacune dans sa transaction.
+    Retourne la version du schéma après migration.
+    """
+    version = version_schema(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    isolation = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for numero, migration in MIGRATIONS:
+            if numero <= version:
+                continue
+            c = conn.cursor()
+            c.execute("BEGIN")
+            try:
+                migration(c)
+                marquer_version(c, numero)
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+            print(f"  Schéma migré en version {numero}")
+            version = numero
+    finally:
+        conn.isolation_level = isolation
+    return version
+
+
+_bases_migrees = set()
+
+
+def connecter(fichier_bdd: str = FICHIER_BDD, **options):
+    """
+    sqlite3.connect() qui applique les migrations (une fois par fichier).
+    Connexion instrumentée si instrumentation.activer() a été appelé.
+    """
+    if instrumentation.actif():
+        options.setdefault("factory", instrumentation.ConnexionInstrumentee)
+    conn = sqlite3.connect(fichier_bdd, **options)
+    chemin = os.path.abspath(fichier_bdd)
+    if chemin not in _bases_migrees:
+        migrer(conn)
+        _bases_migrees.add(chemin)
+    return conn
+
+
+# ============================================================
+if __name__ == "__main__":
+    conn = sqlite3.connect(FICHIER_BDD)
+    avant = version_schema(conn)
+    apres = migrer(conn)
+    conn.close()
+    print(f"Schéma : version {avant} → {apres} ({FICHIER_BDD})")
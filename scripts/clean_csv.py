@@ -1,30 +1,137 @@
-import pandas as pd
+# ============================================================
+# clean_csv.py – Nettoyage et filtrage de datacenter.csv
+# ============================================================
+# Le CSV est lu par blocs de TAILLE_BLOC lignes (mémoire bornée,
+# même pour l'export mondial) :
+#   - seules les colonnes utiles sont lues (usecols : celles de
+#     COLONNES_SUPPRIMEES sont écartées dès la lecture) ;
+#   - toutes les cellules sont lues en texte (dtype explicite, pas
+#     d'inférence de types ni de « NA » converti en valeur manquante :
+#     le code pays de la Namibie reste « NA ») et réécrites telles quelles ;
+#   - chaque filtre « colonne ∈ valeurs » est appliqué en une passe
+#     (isin), les filtres sur plusieurs colonnes se cumulant (ET).
+# Le résultat est écrit dans un fichier temporaire du même dossier,
+# renommé à la fin : une erreur ne laisse jamais de CSV à moitié écrit.
+#
+# pandas n'est importé que dans filtrer_csv : ingest.py réutilise
+# COLONNES_SUPPRIMEES sans dépendre de pandas.
+#
+# Usage : python scripts/clean_csv.py [--source FICHIER] [--sortie FICHIER]
+#                                     [--garder COLONNE=V1,V2 …]
+#   --garder  Filtre répétable (défaut : region_continent=Europe)
+# ============================================================
+
+import os
+import argparse
+import contextlib
+
+BASE_DIR       = os.path.dirname(os.path.abspath(__file__))
+FICHIER_CSV    = os.path.join(BASE_DIR, "..", "data", "datacenter.csv")
+TAILLE_BLOC    = 50_000      # lignes lues à la fois
+FILTRES_DEFAUT = {"region_continent": ["Europe"]}
+
+# Colonnes de l'export PeeringDB inutiles pour le projet (supprimées du CSV)
+COLONNES_SUPPRIMEES = ['campus_id', 'name_long','tech_email','tech_phone','available_voltage_services', 'diverse_serving_substations','property','status_dashboard','rencode','npanxx','logo','floor','suite']
+
+
+def filtrer_csv(source: str, filtres: dict[str, list] = FILTRES_DEFAUT,
+                destination: str | None = None,
+                taille_bloc: int = TAILLE_BLOC) -> tuple[int, int]:
+    """
+    Ne garde que les lignes de `source` dont chaque colonne de `filtres`
+    vaut l'une des valeurs associées, sans les colonnes de COLONNES_SUPPRIMEES.
+
+    :param source:      CSV à lire
+    :param filtres:     {colonne: [valeurs gardées]} (ET entre les colonnes)
+    :param destination: CSV à écrire (défaut : `source`, remplacé à la fin)
+    :param taille_bloc: nombre de lignes lues à la fois
+    :return: (lignes lues, lignes gardées)
+    """
+    import pandas as pd
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"CSV introuvable : {source}")
+    destination = destination or source
+    filtres = {col: [str(v) for v in valeurs] for col, valeurs in filtres.items()}
+
+    with open(source, encoding="utf-8", newline="") as f:
+        entete = pd.read_csv(f, nrows=0).columns
+    colonnes = [col for col in entete if col not in COLONNES_SUPPRIMEES]
+    absentes = [col for col in filtres if col not in colonnes]
+    if absentes:
+        raise ValueError(f"Colonnes de filtre absentes du CSV : {', '.join(absentes)}")
+
+    nb_lus = nb_gardes = 0
+    temporaire = f"{destination}.{os.getpid()}.tmp"
+    try:
+        with open(temporaire, "w", encoding="utf-8", newline="") as sortie:
+            blocs = pd.read_csv(source, usecols=colonnes, dtype=dict.fromkeys(colonnes, str),
+                                keep_default_na=False, na_filter=False,
+                                chunksize=taille_bloc)
+            for i, bloc in enumerate(blocs):
+                nb_lus += len(bloc)
+                if filtres:
+                    garder = bloc[list(filtres)].isin(filtres).all(axis=1)
+                    bloc = bloc[garder]
+                nb_gardes += len(bloc)
+                bloc.to_csv(sortie, header=(i == 0), index=False, columns=colonnes)
+            if nb_lus == 0:                       # CSV sans lignes : garder l'en-tête
+                pd.DataFrame(columns=colonnes).to_csv(sortie, index=False)
+            # données sur disque avant le renommage (sinon une coupure
+            # peut laisser un fichier renommé mais vide)
+            sortie.flush()
+            os.fsync(sortie.fileno())
+        os.replace(temporaire, destination)
+    except BaseException:
+        # le temporaire peut ne pas exister (échec de open)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporaire)
+        raise
+    return nb_lus, nb_gardes
+
 
 def remove_specific_row_from_csv(file, column_name, *args):
-	'''
-	Enlève les lignes d'un fichier csv qui ont une valeur spécifique dans une colonne donnée.
-	Exemple : remove_specific_row_from_csv("data/datacenter.csv", "region_continent
-", "Europe") enlèvera toutes les lignes où la colonne "region_continent" a la valeur "Europe".
-
-	'''
-	row_to_remove = []
-	for row_name in args:
-		row_to_remove.append(row_name)
-	try:
-		df = pd.read_csv(file)
-		df = df.drop(columns=['campus_id', 'name_long','tech_email','tech_phone','available_voltage_services', 'diverse_serving_substations','property','status_dashboard','rencode','npanxx','logo','floor','suite'])
-		for row in row_to_remove:
-			df = df[eval("df.{}".format(column_name)) == row]
-		df.to_csv(file, index=False)
-	except Exception  as e:
-		raise Exception("Oh nannnnn une erreur : {}".format(e))
-		
-
-import os as _os
-_BASE = _os.path.dirname(_os.path.abspath(__file__))
-remove_specific_row_from_csv(
-    _os.path.join(_BASE, "..", "data", "datacenter.csv"),
-    "region_continent",
-    "Europe"
-)
+    '''
+    Ne garde que les lignes d'un fichier csv dont la colonne donnée vaut l'une des valeurs.
+    Exemple : remove_specific_row_from_csv("data/datacenter.csv", "region_continent", "Europe")
+    ne gardera que les lignes où la colonne "region_continent" a la valeur "Europe".
+    (Raccourci de filtrer_csv pour un seul filtre, le fichier étant remplacé ;
+    sans valeur, toutes les lignes sont gardées, seules les colonnes
+    inutiles sont retirées.)
+    '''
+    return filtrer_csv(file, {column_name: list(args)} if args else {})
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Filtre data/datacenter.csv (Europe par défaut) et retire les colonnes inutiles"
+    )
+    parser.add_argument(
+        "--source", default=FICHIER_CSV, metavar="FICHIER",
+        help="CSV à nettoyer (défaut : data/datacenter.csv)"
+    )
+    parser.add_argument(
+        "--sortie", default=None, metavar="FICHIER",
+        help="CSV à écrire (défaut : remplace la source)"
+    )
+    parser.add_argument(
+        "--garder", action="append", default=None, metavar="COLONNE=V1,V2",
+        help="Ne garder que ces valeurs de la colonne, option répétable "
+             "(défaut : region_continent=Europe)"
+    )
+    parser.add_argument(
+        "--bloc", type=int, default=TAILLE_BLOC, metavar="N",
+        help=f"Lignes lues à la fois (défaut : {TAILLE_BLOC})"
+    )
+    args = parser.parse_args()
+
+    filtres = FILTRES_DEFAUT
+    if args.garder:
+        filtres = {}
+        for filtre in args.garder:
+            colonne, _, valeurs = filtre.partition("=")
+            filtres.setdefault(colonne, []).extend(valeurs.split(","))
 
+    nb_lus, nb_gardes = filtrer_csv(args.source, filtres, args.sortie, args.bloc)
+    print(f"{nb_gardes} lignes gardées sur {nb_lus} → {args.sortie or args.source}")
@@ -2,24 +2,45 @@
 # csv_to_sqlite.py – Importe datacenter.csv dans SQLite3
 # ============================================================
 # Remplace l'import manuel via DB Browser for SQLite.
-# Lit les colonnes et types directement depuis le CSV et crée
-# la table `datacenter` dans data/datacenter.sqlite3.
+# Lit les colonnes directement depuis le CSV et crée la table
+# `datacenter` dans data/datacenter.sqlite3, avec les types et
+# index définis dans schema.py.
 #
-# Usage : python scripts/csv_to_sqlite.py [--reset]
-#   --reset  Supprime et recrée la table si elle existe déjà
+# Les lignes sont insérées par lots (executemany) dans une seule
+# transaction, avec journal/synchronisation assouplis le temps
+# du chargement.
+#
+# La source peut aussi être datacenter.parquet (fichier_parquet.py) :
+# valeurs déjà typées, colonnes lues directement. C'est la source par
+# défaut quand pyarrow est installé et que le fichier est à jour.
+#
+# Usage : python scripts/csv_to_sqlite.py [--reset] [--lot N] [--source FICHIER]
+#   --reset   Supprime et recrée la table si elle existe déjà
+#   --lot     Nombre de lignes par lot (défaut : 5000)
+#   --source  datacenter.csv ou datacenter.parquet
 # ============================================================
 
 import os
+import sys
 import csv
 import sqlite3
 import argparse
+from contextlib import contextmanager
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import schema  # noqa: E402
 
-BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
-FICHIER_CSV = os.path.join(BASE_DIR, "..", "data", "datacenter.csv")
-FICHIER_BDD = os.path.join(BASE_DIR, "..", "data", "datacenter.sqlite3")
+BASE_DIR        = os.path.dirname(os.path.abspath(__file__))
+FICHIER_CSV     = os.path.join(BASE_DIR, "..", "data", "datacenter.csv")
+FICHIER_PARQUET = os.path.join(BASE_DIR, "..", "data", "datacenter.parquet")
+FICHIER_BDD     = os.path.join(BASE_DIR, "..", "data", "datacenter.sqlite3")
 
-# Colonnes stockées en INTEGER dans la BDD (toutes les autres → TEXT)
-COLONNES_INT = {"id", "org_id", "net_count", "ix_count"}
+# Colonnes stockées en INTEGER / REAL dans la BDD (toutes les autres → TEXT)
+COLONNES_INT  = {col for col, t in schema.TYPES_COLONNES.items() if t == "INTEGER"}
+COLONNES_REEL = {col for col, t in schema.TYPES_COLONNES.items() if t == "REAL"}
+
+TAILLE_LOT = 5000   # lignes par appel à executemany
 
 
 # ============================================================
@@ -30,92 +51,246 @@ def detecter_colonnes(fichier_csv: str) -> list[str]:
         return next(reader)
 
 
+def est_parquet(fichier: str) -> bool:
+    return fichier.endswith(".parquet")
+
+
+def colonnes_source(fichier: str) -> list[str]:
+    """Colonnes d'un CSV ou d'un fichier Parquet (selon l'extension)."""
+    if est_parquet(fichier):
+        import fichier_parquet
+        return fichier_parquet.detecter_colonnes(fichier)
+    return detecter_colonnes(fichier)
+
+
+@contextmanager
+def ouvrir_source(fichier: str):
+    """Lignes (sans l'en-tête) d'un CSV ou d'un fichier Parquet."""
+    if est_parquet(fichier):
+        import fichier_parquet
+        yield fichier_parquet.lire_lignes(fichier)
+        return
+    with open(fichier, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader)  # sauter l'en-tête
+        yield reader
+
+
+def source_par_defaut(fichier_csv: str = FICHIER_CSV,
+                      fichier_pq: str = FICHIER_PARQUET) -> str:
+    """datacenter.parquet s'il est lisible (pyarrow) et pas plus ancien que le CSV."""
+    import fichier_parquet
+    if (fichier_parquet.disponible() and os.path.exists(fichier_pq)
+            and (not os.path.exists(fichier_csv)
+                 or os.path.getmtime(fichier_pq) >= os.path.getmtime(fichier_csv))):
+        return fichier_pq
+    return fichier_csv
+
+
 def type_sqlite(nom_colonne: str) -> str:
     """Retourne le type SQLite selon le nom de la colonne."""
-    return "INTEGER" if nom_colonne in COLONNES_INT else "TEXT"
+    return schema.type_colonne(nom_colonne)
 
 
 def creer_table(cursor, colonnes: list[str], reset: bool):
-    """Crée (ou recrée) la table `datacenter`."""
+    """
+    Crée (ou recrée) la table `datacenter`, typée et indexée.
+    Une table existante (sans `reset`) est gardée telle quelle : elle a
+    déjà été migrée (schema.migrer), inutile de rejouer initialiser().
+    """
     if reset:
         cursor.execute("DROP TABLE IF EXISTS datacenter")
         print("  Table existante supprimée.")
+    elif schema.colonnes_table(cursor.connection):
+        return
 
-    definitions = ", ".join(
-        f'"{col}" {type_sqlite(col)}' for col in colonnes
-    )
-    cursor.execute(f'CREATE TABLE IF NOT EXISTS "datacenter" ({definitions})')
+    cursor.execute(schema.definition_table(colonnes))
+    schema.creer_index(cursor)
+    schema.initialiser(cursor)
+
+
+# ============================================================
+# CHARGEMENT EN MASSE
+# ============================================================
+
+def _entier(val):
+    """Convertit une cellule INTEGER ('' / None / invalide → None)."""
+    if val is None or val == "":
+        return None
+    try:
+        return int(val)
+    except ValueError:
+        return None
+
+
+def _reel(val, minimum: float, maximum: float):
+    """Convertit une cellule REAL ('' / invalide / hors [minimum, maximum] → None)."""
+    if val is None or val == "":
+        return None
+    try:
+        val = float(val)
+    except ValueError:
+        return None
+    return val if minimum <= val <= maximum else None
+
+
+def _latitude(val):
+    return _reel(val, -90.0, 90.0)
+
+
+def _longitude(val):
+    return _reel(val, -180.0, 180.0)
+
+
+def _texte(val):
+    """Convertit une cellule TEXT ('' → None)."""
+    return None if val == "" else val
+
+
+def table_convertisseurs(colonnes: list[str]) -> list:
+    """Fonction de conversion de chaque colonne, construite une seule fois."""
+    speciaux = {"latitude": _latitude, "longitude": _longitude}
+    return [speciaux.get(col) or (_entier if col in COLONNES_INT else _texte)
+            for col in colonnes]
 
 
-def importer_csv(fichier_csv: str, fichier_bdd: str, reset: bool = False):
+def convertir_lot(convertisseurs: list, lot: list[list]) -> list[tuple]:
+    """
+    Convertit un lot de lignes colonne par colonne :
+    chaque convertisseur est appliqué (via map) à toute une colonne du lot.
+    Les lignes trop courtes sont complétées par None, les trop longues tronquées.
+    """
+    n = len(convertisseurs)
+    lot = [ligne if len(ligne) == n else (list(ligne) + [None] * n)[:n]
+           for ligne in lot]
+    colonnes = [map(conv, col) for conv, col in zip(convertisseurs, zip(*lot))]
+    return list(zip(*colonnes))
+
+
+@contextmanager
+def mode_chargement(conn):
+    """
+    Ouvre une transaction explicite unique pour un chargement en masse.
+    `journal_mode` et `synchronous` sont assouplis le temps du chargement,
+    puis remis à leur valeur d'origine (COMMIT si tout va bien, sinon ROLLBACK).
+    """
+    ancien_journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    ancien_sync    = conn.execute("PRAGMA synchronous").fetchone()[0]
+    isolation      = conn.isolation_level
+    conn.isolation_level = None   # BEGIN / COMMIT gérés ici
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.execute(f"PRAGMA journal_mode = {ancien_journal}")
+        conn.execute(f"PRAGMA synchronous = {ancien_sync}")
+        conn.isolation_level = isolation
+
+
+def inserer_lots(conn, colonnes: list[str], lignes, taille_lot: int = TAILLE_LOT,
+                 debut: int = 2, requete: str | None = None) -> tuple[int, int]:
+    """
+    Insère `lignes` (listes de cellules texte) par lots via executemany.
+    Doit être appelée dans une transaction ouverte (voir mode_chargement).
+    Si un lot échoue, il est annulé puis rejoué ligne par ligne pour
+    signaler précisément les lignes fautives.
+
+    :param debut:   numéro de la première ligne (pour les messages d'erreur)
+    :param requete: requête d'insertion (défaut : INSERT de toutes les colonnes)
+    :return: (nb_inseres, nb_erreurs)
+    """
+    if requete is None:
+        placeholders = ", ".join("?" * len(colonnes))
+        requete = f'INSERT INTO "datacenter" VALUES ({placeholders})'
+    convertisseurs = table_convertisseurs(colonnes)
+
+    nb_inseres = 0
+    nb_erreurs = 0
+    numero = debut
+    lignes = iter(lignes)
+
+    while True:
+        lot = list(islice(lignes, taille_lot))
+        if not lot:
+            break
+        valeurs = convertir_lot(convertisseurs, lot)
+
+        conn.execute("SAVEPOINT lot")
+        try:
+            conn.executemany(requete, valeurs)
+            nb_inseres += len(valeurs)
+        except sqlite3.Error:
+            # Rejouer uniquement ce lot, ligne par ligne
+            conn.execute("ROLLBACK TO lot")
+            for i, v in enumerate(valeurs):
+                try:
+                    conn.execute(requete, v)
+                    nb_inseres += 1
+                except sqlite3.Error as e:
+                    print(f"  ⚠  Ligne {numero + i} ignorée : {e}")
+                    nb_erreurs += 1
+        conn.execute("RELEASE lot")
+        numero += len(lot)
+
+    return nb_inseres, nb_erreurs
+
+
+def importer_csv(fichier_csv: str, fichier_bdd: str, reset: bool = False,
+                 taille_lot: int = TAILLE_LOT):
     """
     Lit le CSV et l'insère dans la table `datacenter` de la BDD SQLite3.
 
-    :param fichier_csv: chemin vers data/datacenter.csv
+    :param fichier_csv: chemin vers data/datacenter.csv (ou datacenter.parquet)
     :param fichier_bdd: chemin vers data/datacenter.sqlite3
     :param reset:       si True, recrée la table même si elle existe
+    :param taille_lot:  nombre de lignes par appel à executemany
     """
     if not os.path.exists(fichier_csv):
         raise FileNotFoundError(f"CSV introuvable : {fichier_csv}")
 
     conn = sqlite3.connect(fichier_bdd)
-    c = conn.cursor()
+    if not reset:
+        schema.migrer(conn)
 
     # --- Détection des colonnes ---
-    colonnes = detecter_colonnes(fichier_csv)
+    colonnes = colonnes_source(fichier_csv)
     print(f"  Colonnes détectées : {len(colonnes)}")
-    print(f"  Dont INTEGER       : {sorted(COLONNES_INT)}")
+    print(f"  Dont INTEGER       : {sorted(COLONNES_INT & set(colonnes))}")
+    print(f"  Dont REAL          : {sorted(COLONNES_REEL & set(colonnes))}")
 
-    # --- Création de la table ---
-    creer_table(c, colonnes, reset)
+    nb_inseres = 0
+    nb_erreurs = 0
 
-    # --- Comptage des lignes existantes ---
-    c.execute("SELECT COUNT(*) FROM datacenter")
-    nb_existants = c.fetchone()[0]
-    if nb_existants > 0 and not reset:
-        print(f"  ⚠  La table contient déjà {nb_existants} lignes.")
-        print("     Utilisez --reset pour la recréer depuis zéro.")
-        conn.close()
-        return
+    with mode_chargement(conn):
+        c = conn.cursor()
 
-    # --- Insertion des données ---
-    placeholders = ", ".join("?" * len(colonnes))
-    requete_insert = f'INSERT INTO "datacenter" VALUES ({placeholders})'
+        # --- Création de la table ---
+        creer_table(c, colonnes, reset)
 
-    nb_inseres  = 0
-    nb_erreurs  = 0
+        # --- Comptage des lignes existantes ---
+        c.execute("SELECT COUNT(*) FROM datacenter")
+        nb_existants = c.fetchone()[0]
 
-    with open(fichier_csv, encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        next(reader)  # sauter l'en-tête
+        # --- Insertion des données ---
+        if nb_existants == 0 or reset:
+            with ouvrir_source(fichier_csv) as lignes, schema.recherche_differee(c):
+                nb_inseres, nb_erreurs = inserer_lots(conn, colonnes, lignes, taille_lot)
+            schema.rafraichir_stats(c)
 
-        for numero, ligne in enumerate(reader, start=2):
-            # Normaliser la longueur de la ligne (colonnes manquantes → None)
-            while len(ligne) < len(colonnes):
-                ligne.append(None)
-            ligne = ligne[:len(colonnes)]
-
-            # Convertir les colonnes INTEGER (None et '' → None)
-            valeurs = []
-            for col, val in zip(colonnes, ligne):
-                if col in COLONNES_INT:
-                    try:
-                        valeurs.append(int(val) if val not in (None, "") else None)
-                    except ValueError:
-                        valeurs.append(None)
-                else:
-                    valeurs.append(val if val != "" else None)
-
-            try:
-                c.execute(requete_insert, valeurs)
-                nb_inseres += 1
-            except sqlite3.Error as e:
-                print(f"  ⚠  Ligne {numero} ignorée : {e}")
-                nb_erreurs += 1
-
-    conn.commit()
     conn.close()
 
+    if nb_existants > 0 and not reset:
+        print(f"  ⚠  La table contient déjà {nb_existants} lignes.")
+        print("     Utilisez --reset pour la recréer depuis zéro.")
+        return
+
     print(f"\n{nb_inseres} lignes insérées dans `datacenter`")
     if nb_erreurs:
         print(f"  ⚠   {nb_erreurs} lignes ignorées (erreurs)")
@@ -131,13 +306,23 @@ if __name__ == "__main__":
         "--reset", action="store_true",
         help="Supprime et recrée la table datacenter avant l'import"
     )
+    parser.add_argument(
+        "--lot", type=int, default=TAILLE_LOT, metavar="N",
+        help=f"Nombre de lignes insérées par lot (défaut : {TAILLE_LOT})"
+    )
+    parser.add_argument(
+        "--source", default=None, metavar="FICHIER",
+        help="datacenter.csv ou datacenter.parquet (défaut : le Parquet s'il est "
+             "lisible et à jour, sinon le CSV)"
+    )
     args = parser.parse_args()
+    source = args.source or source_par_defaut()
 
     print("=" * 60)
     print("  csv_to_sqlite.py – Import datacenter.csv → SQLite3")
     print("=" * 60)
-    print(f"  Source  : {FICHIER_CSV}")
+    print(f"  Source  : {source}")
     print(f"  Cible   : {FICHIER_BDD}")
     print()
 
-    importer_csv(FICHIER_CSV, FICHIER_BDD, reset=args.reset)
+    importer_csv(source, FICHIER_BDD, reset=args.reset, taille_lot=args.lot)
@@ -0,0 +1,239 @@
+# ============================================================
+# fichier_parquet.py – datacenter.parquet : CSV typé et compressé
+# ============================================================
+# datacenter.csv est relu en texte par chaque consommateur, qui
+# doit retrouver les types (entiers, coordonnées, dates) et
+# interpréter social_media, stocké comme repr d'une liste Python.
+# datacenter.parquet contient les mêmes lignes, typées une fois
+# pour toutes :
+#   - INTEGER → int64, REAL → float64 (coordonnées hors bornes → null) ;
+#   - created / updated → timestamp (UTC, à la seconde) ;
+#   - social_media → liste de {service, identifier} ;
+#   - autres colonnes → texte ('' → null), compression zstd.
+# Les lecteurs (csv_to_sqlite.importer_csv) ne lisent que les
+# colonnes demandées, par lots, sans rien reparser.
+#
+# pyarrow est optionnel : sans lui, disponible() renvoie False et
+# le pipeline s'en tient à datacenter.csv.
+#
+# Usage : python scripts/fichier_parquet.py [--source FICHIER]
+#                                           [--sortie FICHIER]
+#                                           [--continent NOM]
+#   --source  datacenter.csv (défaut) ou export JSON PeeringDB
+# ============================================================
+
+import os
+import ast
+import argparse
+from contextlib import contextmanager
+from itertools import islice
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    _erreur_import = None
+except ImportError as e:
+    # pyarrow n'est indispensable que pour le format Parquet
+    pa = pc = pq = None
+    _erreur_import = e
+
+from csv_to_sqlite import FICHIER_CSV, FICHIER_PARQUET, TAILLE_LOT, table_convertisseurs
+import schema  # racine du projet ajoutée au sys.path par csv_to_sqlite
+
+COMPRESSION    = "zstd"
+CHAMPS_RESEAUX = ("service", "identifier")     # éléments de social_media
+
+
+def disponible() -> bool:
+    """pyarrow est-il installé ?"""
+    return pa is not None
+
+
+def _verifier():
+    if pa is None:
+        raise RuntimeError(f"Il manque une dépendance : {_erreur_import}\n"
+                           "  → pip install pyarrow (ou utiliser datacenter.csv)")
+
+
+# ============================================================
+# SCHÉMA
+# ============================================================
+
+def type_arrow(colonne: str):
+    """Type Arrow d'une colonne de `datacenter`."""
+    if colonne == "social_media":
+        return pa.list_(pa.struct([(champ, pa.string()) for champ in CHAMPS_RESEAUX]))
+    if colonne in schema.COLONNES_DATE:
+        return pa.timestamp("s", tz="UTC")
+    return {"INTEGER": pa.int64(), "REAL": pa.float64()}.get(
+        schema.type_colonne(colonne), pa.string())
+
+
+def schema_arrow(colonnes: list[str]):
+    _verifier()
+    return pa.schema([(col, type_arrow(col)) for col in colonnes])
+
+
+def _reseaux(texte):
+    """repr d'une liste de dictionnaires (format du CSV) → liste de {service, identifier}."""
+    if not texte:
+        return None
+    try:
+        valeur = ast.literal_eval(texte)
+    except (ValueError, SyntaxError):
+        return None
+    if not isinstance(valeur, list):
+        return None
+    return [{champ: element.get(champ) for champ in CHAMPS_RESEAUX}
+            for element in valeur if isinstance(element, dict)]
+
+
+def _colonne_arrow(colonne: str, valeurs: list, type_):
+    """Valeurs d'une colonne (déjà converties comme pour SQLite) → tableau Arrow."""
+    if colonne == "social_media":
+        return pa.array([_reseaux(v) for v in valeurs], type_)
+    if colonne in schema.COLONNES_DATE:
+        textes = pa.array(valeurs, pa.string())
+        dates = pc.strptime(textes, format=schema.FORMAT_DATE, unit="s", error_is_null=True)
+        return dates.cast(type_)
+    return pa.array(valeurs, type_)
+
+
+# ============================================================
+# ÉCRITURE
+# ============================================================
+
+@contextmanager
+def ecrivain(fichier_parquet: str, colonnes: list[str]):
+    """
+    Ouvre un ParquetWriter sur un fichier temporaire, renommé en
+    `fichier_parquet` à la fin : une erreur ne laisse jamais de fichier
+    à moitié écrit. Renvoie une fonction ecrire(lot de lignes texte).
+    """
+    schema_pa = schema_arrow(colonnes)
+    convertisseurs = table_convertisseurs(colonnes)
+    temporaire = f"{fichier_parquet}.{os.getpid()}.tmp"
+    writer = pq.ParquetWriter(temporaire, schema_pa, compression=COMPRESSION)
+
+    def ecrire(lot: list[list]):
+        if not lot:
+            return
+        n = len(colonnes)
+        lot = [ligne if len(ligne) == n else (list(ligne) + [None] * n)[:n]
+               for ligne in lot]
+        tableaux = [_colonne_arrow(col, list(map(conv, valeurs)), champ.type)
+                    for col, conv, valeurs, champ
+                    in zip(colonnes, convertisseurs, zip(*lot), schema_pa)]
+        writer.write_batch(pa.RecordBatch.from_arrays(tableaux, schema=schema_pa))
+
+    try:
+        yield ecrire
+    except BaseException:
+        writer.close()
+        os.remove(temporaire)
+        raise
+    writer.close()
+    os.replace(temporaire, fichier_parquet)
+
+
+def ecrire_parquet(lignes, fichier_parquet: str, colonnes: list[str],
+                   taille_lot: int = TAILLE_LOT) -> int:
+    """Écrit `lignes` (listes de cellules au format texte du CSV). Retourne leur nombre."""
+    nb = 0
+    lignes = iter(lignes)
+    with ecrivain(fichier_parquet, colonnes) as ecrire:
+        while lot := list(islice(lignes, taille_lot)):
+            ecrire(lot)
+            nb += len(lot)
+    return nb
+
+
+def copie_parquet(lignes, fichier_parquet: str, colonnes: list[str],
+                  taille_lot: int = TAILLE_LOT):
+    """Recopie au passage chaque ligne dans `fichier_parquet` (comme ingest.copie_csv)."""
+    with ecrivain(fichier_parquet, colonnes) as ecrire:
+        lot = []
+        for ligne in lignes:
+            lot.append(ligne)
+            if len(lot) >= taille_lot:
+                ecrire(lot)
+                lot = []
+            yield ligne
+        ecrire(lot)
+
+
+# ============================================================
+# LECTURE
+# ============================================================
+
+def detecter_colonnes(fichier_parquet: str) -> list[str]:
+    """Colonnes du fichier (lues dans le pied de page, sans lire les données)."""
+    _verifier()
+    return pq.read_schema(fichier_parquet).names
+
+
+def _valeurs_sqlite(colonne: str, tableau) -> list:
+    """Colonne Arrow → valeurs Python au format de la table `datacenter`."""
+    if colonne in schema.COLONNES_DATE:
+        naif = tableau.cast(pa.timestamp("s"))
+        return pc.strftime(naif, format=schema.FORMAT_DATE).to_pylist()
+    if colonne == "social_media":
+        # même texte que dans le CSV (repr de la liste)
+        return [None if v is None else str(v) for v in tableau.to_pylist()]
+    return tableau.to_pylist()
+
+
+def lire_lignes(fichier_parquet: str, colonnes: list[str] | None = None,
+                taille_lot: int = TAILLE_LOT):
+    """
+    Lignes du fichier (listes de valeurs dans l'ordre de `colonnes`,
+    toutes par défaut), lues par lots de `taille_lot` et seulement
+    pour les colonnes demandées.
+    """
+    _verifier()
+    fichier = pq.ParquetFile(fichier_parquet)
+    colonnes = colonnes or fichier.schema_arrow.names
+    for lot in fichier.iter_batches(batch_size=taille_lot, columns=colonnes):
+        valeurs = [_valeurs_sqlite(col, lot.column(i)) for i, col in enumerate(colonnes)]
+        yield from map(list, zip(*valeurs))
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Écrit data/datacenter.parquet (datacenter.csv typé et compressé)"
+    )
+    parser.add_argument(
+        "--source", default=FICHIER_CSV, metavar="FICHIER",
+        help="datacenter.csv (défaut) ou export JSON PeeringDB (fac-0.json)"
+    )
+    parser.add_argument(
+        "--sortie", default=FICHIER_PARQUET, metavar="FICHIER",
+        help="Fichier Parquet à écrire (défaut : data/datacenter.parquet)"
+    )
+    parser.add_argument(
+        "--continent", action="append", default=None, metavar="NOM",
+        help="Source JSON : region_continent à garder, option répétable (défaut : Europe)"
+    )
+    args = parser.parse_args()
+
+    if not disponible():
+        raise SystemExit(f"pyarrow non installé ({_erreur_import}) : "
+                         "datacenter.csv reste le seul format disponible.")
+
+    if args.source.endswith(".json"):
+        from ingest import COLONNES_DATACENTER, CONTINENTS_DEFAUT, lignes_nettoyees
+        colonnes = COLONNES_DATACENTER
+        lignes = lignes_nettoyees(args.source, args.continent or CONTINENTS_DEFAUT, colonnes)
+        nb = ecrire_parquet(lignes, args.sortie, colonnes)
+    else:
+        import csv
+        with open(args.source, encoding="utf-8", newline="") as f:
+            lecteur = csv.reader(f)
+            colonnes = next(lecteur)
+            nb = ecrire_parquet(lecteur, args.sortie, colonnes)
+
+    taille = os.path.getsize(args.sortie)
+    print(f"{nb} lignes écrites dans {args.sortie} ({taille / 1024:.0f} Ko, "
+          f"source {os.path.getsize(args.source) / 1024:.0f} Ko)")
@@ -1,19 +1,25 @@
 # ============================================================
 # ACTIVITÉ 7 : Import du jeu de données pays européens
 # Crée la table `pays` dans datacenter.sqlite3 depuis pays_europe.csv
+# La révision de `stats_pays` est incrémentée au passage : les
+# cartes en cache et l'instantané en colonnes, qui affichent les noms
+# de pays, sont reconstruits (voir cache_cartes.empreinte_donnees).
 # ============================================================
 
 import os
-import sqlite3
+import sys
 import csv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import schema  # noqa: E402
+
 BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
 FICHIER_BDD = os.path.join(BASE_DIR, "..", "data", "datacenter.sqlite3")
 FICHIER_CSV = os.path.join(BASE_DIR, "..", "data", "pays_europe.csv")
 
 
 def import_pays(fichier_csv=FICHIER_CSV, fichier_bdd=FICHIER_BDD):
-    conn = sqlite3.connect(fichier_bdd)
+    conn = schema.connecter(fichier_bdd)
     c = conn.cursor()
 
     # --- Création de la table pays ---
@@ -47,9 +53,15 @@ def import_pays(fichier_csv=FICHIER_CSV, fichier_bdd=FICHIER_BDD):
             (code_pays, nom_pays, capitale, lat_capitale, lon_capitale, population, superficie_km2)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """, rows)
+    nb = c.rowcount
 
+    # nouvelle empreinte des données : les caches joints à `pays` sont périmés
+    # (sans table `datacenter`, pas encore de stats ni de cache : l'import
+    # des datacenters calculera la première révision)
+    if "status" in schema.colonnes_table(conn):
+        schema.rafraichir_stats(c)
     conn.commit()
-    print(f"{c.rowcount} pays importes dans la table `pays`.")
+    print(f"{nb} pays importes dans la table `pays`.")
     conn.close()
 
 
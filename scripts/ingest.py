@@ -0,0 +1,320 @@
+# ============================================================
+# ingest.py – Rafraîchissement complet en une seule passe
+# fac-0.json → (filtre Europe + colonnes utiles) → SQLite3
+# ============================================================
+# Remplace l'enchaînement json_to_csv.py → clean_csv.py →
+# csv_to_sqlite.py : le JSON est lu une seule fois, les colonnes
+# de COLONNES_SUPPRIMEES sont écartées, seules les lignes du
+# continent demandé sont gardées, et la table `datacenter` est
+# reconstruite dans une seule transaction.
+#
+# Le mode --sync met la table à jour au lieu de la reconstruire :
+# seuls les datacenters nouveaux ou dont `updated` a changé sont
+# réécrits (upsert sur `id`), ceux dont le `status` n'est plus `ok`
+# sont conservés mais marqués (suppression logique), et les
+# coordonnées écrites par geocode.py sont gardées tant que PeeringDB
+# n'en fournit pas. Avec --delta, la source est un extrait
+# `?since=` (seuls les objets modifiés y figurent).
+#
+# Usage : python scripts/ingest.py [--source FICHIER]
+#                                  [--continent NOM]
+#                                  [--csv [FICHIER]]
+#                                  [--parquet [FICHIER]]
+#                                  [--sync [--delta]]
+#                                  [--gazetteer FICHIER]
+#                                  [--cartes]
+#   --csv    Écrit aussi le CSV nettoyé (défaut : data/datacenter.csv)
+#   --parquet    Écrit aussi le même contenu typé en Parquet (pyarrow ;
+#                défaut : data/datacenter.parquet)
+#   --sync   Mise à jour incrémentale (pas de reconstruction)
+#   --delta  La source est un extrait ?since= (avec --sync)
+#   --gazetteer  Géocode hors ligne les DC sans GPS (index gazetteer.py)
+#   --cartes     Préconstruit ensuite les cartes en cache (cache_cartes.py)
+# ============================================================
+
+import os
+import csv
+import sqlite3
+import argparse
+
+from json_to_csv import COLONNES_FAC, FICHIER_JSON, iterer_facilities, filtrer_continent
+from clean_csv import COLONNES_SUPPRIMEES
+from csv_to_sqlite import (FICHIER_BDD, FICHIER_CSV, FICHIER_PARQUET, TAILLE_LOT,
+                           creer_table, mode_chargement, inserer_lots)
+import schema  # racine du projet ajoutée au sys.path par csv_to_sqlite
+
+CONTINENTS_DEFAUT = ["Europe"]
+STATUT_SUPPRIME   = "deleted"   # statut posé sur les DC absents d'un export complet
+
+# Colonnes gardées dans le CSV nettoyé et dans la table `datacenter`
+COLONNES_DATACENTER = [c for c in COLONNES_FAC if c not in COLONNES_SUPPRIMEES]
+
+
+# ============================================================
+def texte_csv(valeur) -> str:
+    """Représentation texte d'une valeur JSON, identique à celle du CSV."""
+    return "" if valeur is None else str(valeur)
+
+
+def lignes_nettoyees(fichier_json: str, continents, colonnes=COLONNES_DATACENTER):
+    """
+    Lit l'export PeeringDB et renvoie, pour chaque datacenter gardé,
+    la liste de ses valeurs (au format texte du CSV) dans l'ordre de `colonnes`.
+    """
+    for fac in filtrer_continent(iterer_facilities(fichier_json), continents):
+        yield [texte_csv(fac.get(col)) for col in colonnes]
+
+
+def copie_csv(lignes, writer, colonnes):
+    """Recopie au passage chaque ligne dans un CSV (en-tête compris)."""
+    writer.writerow(colonnes)
+    for ligne in lignes:
+        writer.writerow(ligne)
+        yield ligne
+
+
+def geocoder_lot(conn, gazetteer):
+    """Géocode hors ligne, dans la transaction en cours, les DC sans GPS."""
+    from geocode import geocoder_hors_ligne
+    succes, echecs = geocoder_hors_ligne(conn, gazetteer)
+    print(f"  Géocodage local : {succes} trouvés, {echecs} sans coordonnées")
+
+
+def ingest(fichier_json: str = FICHIER_JSON,
+           fichier_bdd: str = FICHIER_BDD,
+           continents=CONTINENTS_DEFAUT,
+           fichier_csv: str | None = None,
+           taille_lot: int = TAILLE_LOT,
+           gazetteer: str | None = None,
+           fichier_parquet: str | None = None) -> int:
+    """
+    Reconstruit la table `datacenter` à partir de l'export JSON en une passe.
+
+    :param fichier_json: chemin vers fac-0.json
+    :param fichier_bdd:  chemin vers data/datacenter.sqlite3
+    :param continents:   valeurs de `region_continent` à garder
+    :param fichier_csv:  si fourni, le CSV nettoyé y est aussi écrit
+    :param taille_lot:   nombre de lignes par appel à executemany
+    :param gazetteer:    index local ; si fourni, les DC sans GPS sont
+                         géocodés hors ligne dans la même transaction
+    :param fichier_parquet: si fourni, les mêmes lignes y sont écrites en
+                         Parquet (fichier_parquet.py, nécessite pyarrow)
+    :return: nombre de lignes insérées
+    """
+    if not os.path.exists(fichier_json):
+        raise FileNotFoundError(f"JSON introuvable : {fichier_json}")
+
+    colonnes = COLONNES_DATACENTER
+    conn = sqlite3.connect(fichier_bdd)
+
+    f_csv = open(fichier_csv, "w", encoding="utf-8", newline="") if fichier_csv else None
+    lignes = lignes_nettoyees(fichier_json, continents, colonnes)
+    if f_csv:
+        lignes = copie_csv(lignes, csv.writer(f_csv), colonnes)
+    if fichier_parquet:
+        from fichier_parquet import copie_parquet
+        lignes = copie_parquet(lignes, fichier_parquet, colonnes, taille_lot)
+
+    try:
+        with mode_chargement(conn):
+            c = conn.cursor()
+            creer_table(c, colonnes, reset=True)
+            with schema.recherche_differee(c):
+                nb_inseres, nb_erreurs = inserer_lots(conn, colonnes, lignes,
+                                                      taille_lot, debut=1)
+            if gazetteer:
+                geocoder_lot(conn, gazetteer)
+            schema.rafraichir_stats(conn)
+    finally:
+        if f_csv:
+            f_csv.close()
+        if fichier_parquet:
+            lignes.close()     # fichier renommé si tout a été lu, supprimé sinon
+        conn.close()
+
+    if nb_erreurs:
+        print(f"  ⚠   {nb_erreurs} datacenters ignorés (erreurs)")
+    return nb_inseres
+
+
+# ============================================================
+# SYNCHRONISATION INCRÉMENTALE
+# ============================================================
+
+def requete_upsert(colonnes: list[str]) -> str:
+    """
+    INSERT ... ON CONFLICT(id) DO UPDATE : met à jour toutes les colonnes,
+    sauf latitude/longitude qui ne sont remplacées que si PeeringDB
+    fournit de vraies coordonnées (sinon on garde celles du géocodage).
+    """
+    noms = ", ".join(f'"{col}"' for col in colonnes)
+    placeholders = ", ".join("?" * len(colonnes))
+    coords_amont = ("excluded.latitude IS NOT NULL AND excluded.longitude IS NOT NULL"
+                    " AND excluded.latitude != 0 AND excluded.longitude != 0")
+    affectations = []
+    for col in colonnes:
+        if col == "id":
+            continue
+        if col in ("latitude", "longitude"):
+            affectations.append(
+                f'"{col}" = CASE WHEN {coords_amont} '
+                f'THEN excluded."{col}" ELSE datacenter."{col}" END'
+            )
+        else:
+            affectations.append(f'"{col}" = excluded."{col}"')
+    return (f'INSERT INTO "datacenter" ({noms}) VALUES ({placeholders}) '
+            f'ON CONFLICT(id) DO UPDATE SET {", ".join(affectations)}')
+
+
+def lignes_modifiees(fichier_json: str, continents, connus: dict, vus: set,
+                     stats: dict, colonnes=COLONNES_DATACENTER):
+    """
+    Ne renvoie que les datacenters nouveaux ou dont `updated` est plus récent
+    que celui de la base. Les ids rencontrés sont ajoutés à `vus`.
+    """
+    i_id      = colonnes.index("id")
+    i_updated = colonnes.index("updated")
+    i_status  = colonnes.index("status")
+    for ligne in lignes_nettoyees(fichier_json, continents, colonnes):
+        try:
+            id_ = int(ligne[i_id])
+        except ValueError:
+            continue
+        vus.add(id_)
+        actif = ligne[i_status] == "ok"
+        if id_ not in connus:
+            if not actif:
+                continue   # supprimé en amont et jamais importé : rien à faire
+            stats["nouveaux"] += 1
+        elif connus[id_] is not None and ligne[i_updated] <= connus[id_]:
+            stats["inchanges"] += 1
+            continue
+        elif actif:
+            stats["modifies"] += 1
+        else:
+            stats["supprimes"] += 1
+        yield ligne
+
+
+def synchroniser(fichier_json: str = FICHIER_JSON,
+                 fichier_bdd: str = FICHIER_BDD,
+                 continents=CONTINENTS_DEFAUT,
+                 delta: bool = False,
+                 taille_lot: int = TAILLE_LOT,
+                 gazetteer: str | None = None) -> dict:
+    """
+    Met à jour la table `datacenter` à partir d'un export complet
+    ou d'un extrait `?since=` (delta=True), sans la reconstruire.
+
+    :param delta: si False, les DC de la base absents de l'export sont
+                  marqués STATUT_SUPPRIME
+    :return: compteurs nouveaux / modifies / supprimes / inchanges
+    """
+    if not os.path.exists(fichier_json):
+        raise FileNotFoundError(f"JSON introuvable : {fichier_json}")
+
+    colonnes = COLONNES_DATACENTER
+    stats = {"nouveaux": 0, "modifies": 0, "supprimes": 0, "inchanges": 0}
+    vus = set()
+
+    conn = sqlite3.connect(fichier_bdd)
+    try:
+        schema.migrer(conn)   # `id` doit être clé primaire pour l'upsert
+        with mode_chargement(conn):
+            c = conn.cursor()
+            creer_table(c, colonnes, reset=False)
+            connus = dict(c.execute("SELECT id, updated FROM datacenter"))
+
+            lignes = lignes_modifiees(fichier_json, continents, connus, vus, stats)
+            _, nb_erreurs = inserer_lots(conn, colonnes, lignes, taille_lot,
+                                         debut=1, requete=requete_upsert(colonnes))
+
+            if gazetteer:
+                geocoder_lot(conn, gazetteer)
+
+            if not delta:
+                absents = [(STATUT_SUPPRIME, id_) for id_ in connus.keys() - vus]
+                c.executemany("UPDATE datacenter SET status = ? "
+                              "WHERE id = ? AND status = 'ok'", absents)
+                stats["supprimes"] += max(c.rowcount, 0)
+
+            schema.rafraichir_stats(c)
+    finally:
+        conn.close()
+
+    if nb_erreurs:
+        print(f"  ⚠   {nb_erreurs} datacenters ignorés (erreurs)")
+    return stats
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Importe fac-0.json dans data/datacenter.sqlite3 en une seule passe"
+    )
+    parser.add_argument(
+        "--source", default=FICHIER_JSON, metavar="FICHIER",
+        help="Export JSON PeeringDB (défaut : fac-0.json)"
+    )
+    parser.add_argument(
+        "--continent", action="append", default=None, metavar="NOM",
+        help="region_continent à garder, option répétable (défaut : Europe)"
+    )
+    parser.add_argument(
+        "--csv", nargs="?", const=FICHIER_CSV, default=None, metavar="FICHIER",
+        help="Écrit aussi le CSV nettoyé (défaut : data/datacenter.csv)"
+    )
+    parser.add_argument(
+        "--parquet", nargs="?", const=FICHIER_PARQUET, default=None, metavar="FICHIER",
+        help="Écrit aussi le fichier Parquet typé (défaut : data/datacenter.parquet)"
+    )
+    parser.add_argument(
+        "--sync", action="store_true",
+        help="Mise à jour incrémentale de la table au lieu de la reconstruire"
+    )
+    parser.add_argument(
+        "--delta", action="store_true",
+        help="Avec --sync : la source est un extrait ?since= (DC absents non supprimés)"
+    )
+    parser.add_argument(
+        "--gazetteer", default=None, metavar="FICHIER",
+        help="Géocode hors ligne les DC sans GPS avec cet index (gazetteer.py)"
+    )
+    parser.add_argument(
+        "--cartes", action="store_true",
+        help="Préconstruit ensuite toutes les cartes en cache (en parallèle)"
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  ingest.py – fac-0.json → SQLite3 (une seule passe)")
+    print("=" * 60)
+    print(f"  Source  : {args.source}")
+    print(f"  Cible   : {FICHIER_BDD}")
+    if args.csv:
+        print(f"  CSV     : {args.csv}")
+    if args.parquet:
+        from fichier_parquet import disponible
+        if disponible():
+            print(f"  Parquet : {args.parquet}")
+        else:
+            print("  ⚠  pyarrow non installé : pas de fichier Parquet (CSV seulement)")
+            args.parquet = None
+    print()
+
+    continents = args.continent or CONTINENTS_DEFAUT
+    if args.sync:
+        stats = synchroniser(args.source, FICHIER_BDD, continents, delta=args.delta,
+                             gazetteer=args.gazetteer)
+        print(f"{stats['nouveaux']} nouveaux, {stats['modifies']} modifiés, "
+              f"{stats['supprimes']} supprimés, {stats['inchanges']} inchangés")
+    else:
+        nb = ingest(args.source, FICHIER_BDD, continents=continents,
+                    fichier_csv=args.csv, gazetteer=args.gazetteer,
+                    fichier_parquet=args.parquet)
+        print(f"{nb} lignes insérées dans `datacenter`")
+
+    if args.cartes:
+        from cache_cartes import prechauffer
+        c = prechauffer(FICHIER_BDD)
+        print(f"{c['construites']} cartes construites, {c['en_cache']} déjà en cache")
@@ -1,31 +1,209 @@
+# ============================================================
+# json_to_csv.py – Convertit fac-0.json (PeeringDB) en CSV
+# ============================================================
 # Note : fac-0.json est le fichier source brut téléchargé depuis PeeringDB.
 # Pour le re-télécharger : https://www.peeringdb.com/api/fac?depth=0
-import json
-import csv
+#
+# Le fichier est lu de façon incrémentale : le tableau `data` est
+# parcouru un datacenter à la fois, sans jamais charger tout le JSON
+# en mémoire. Les lignes sont écrites selon un schéma de colonnes
+# fixe (COLONNES_FAC), quel que soit l'ordre des clés dans le JSON.
+#
+# Usage : python scripts/json_to_csv.py [--source FICHIER]
+#                                       [--sortie FICHIER]
+#                                       [--continent NOM]
+# ============================================================
+
 import os
+import csv
+import json
+import argparse
+
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+FICHIER_JSON = os.path.join(BASE_DIR, "..", "fac-0.json")
+FICHIER_CSV  = os.path.join(BASE_DIR, "..", "data", "datacenter.csv")
+TAILLE_BLOC  = 64 * 1024   # octets lus à chaque passage dans le fichier
+
+# Schéma d'un objet `fac` de l'API PeeringDB (ordre des colonnes du CSV)
+COLONNES_FAC = [
+    "id", "org_id", "org_name", "campus_id", "name", "aka", "name_long",
+    "website", "social_media", "clli", "rencode", "npanxx", "notes",
+    "net_count", "ix_count", "carrier_count",
+    "tech_email", "tech_phone", "sales_email", "sales_phone",
+    "property", "diverse_serving_substations", "available_voltage_services",
+    "region_continent", "status_dashboard", "logo",
+    "created", "updated", "status",
+    "address1", "address2", "city", "country", "state", "zipcode",
+    "floor", "suite", "latitude", "longitude",
+]
+
+_decodeur = json.JSONDecoder()
+
+
+# ============================================================
+# LECTURE INCRÉMENTALE DU JSON
+# ============================================================
+
+class _Lecteur:
+    """Tampon de lecture sur un fichier texte, rempli bloc par bloc."""
+
+    def __init__(self, f):
+        self.f = f
+        self.tampon = ""
+        self.pos = 0
+        self.fin = False
+
+    def remplir(self) -> bool:
+        """Ajoute un bloc au tampon. Retourne False si le fichier est épuisé."""
+        if self.fin:
+            return False
+        bloc = self.f.read(TAILLE_BLOC)
+        if not bloc:
+            self.fin = True
+            return False
+        # On oublie la partie déjà consommée pour garder un tampon borné
+        self.tampon = self.tampon[self.pos:] + bloc
+        self.pos = 0
+        return True
+
+    def caractere(self) -> str:
+        """Retourne le prochain caractère non blanc (sans le consommer)."""
+        while True:
+            while self.pos < len(self.tampon) and self.tampon[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.tampon):
+                return self.tampon[self.pos]
+            if not self.remplir():
+                raise ValueError("Fin de fichier JSON inattendue")
+
+    def attendre(self, attendu: str):
+        """Consomme le caractère `attendu` ou lève une erreur."""
+        car = self.caractere()
+        if car != attendu:
+            raise ValueError(f"JSON invalide : '{attendu}' attendu, '{car}' trouvé")
+        self.pos += 1
+
+    def valeur(self):
+        """Décode la prochaine valeur JSON complète du tampon."""
+        self.caractere()
+        while True:
+            try:
+                valeur, fin = _decodeur.raw_decode(self.tampon, self.pos)
+            except json.JSONDecodeError:
+                # Valeur coupée en fin de tampon : lire la suite et réessayer
+                if self.remplir():
+                    continue
+                raise
+            # Un nombre en fin de tampon peut être tronqué ("12" de "1234")
+            if fin == len(self.tampon) and self.remplir():
+                continue
+            self.pos = fin
+            return valeur
+
+
+def iterer_facilities(fichier_json: str, cle: str = "data"):
+    """
+    Parcourt le tableau `cle` d'un export PeeringDB et renvoie les
+    objets un par un (générateur). Les autres clés de premier niveau
+    (ex. `meta`) sont lues puis ignorées.
+
+    :param fichier_json: chemin vers fac-0.json (ou net/ix)
+    :param cle:          clé du tableau à parcourir
+    """
+    with open(fichier_json, encoding="utf-8") as f:
+        lecteur = _Lecteur(f)
+        lecteur.attendre("{")
+        if lecteur.caractere() == "}":
+            return
+        while True:
+            nom = lecteur.valeur()
+            lecteur.attendre(":")
+            if nom == cle:
+                lecteur.attendre("[")
+                if lecteur.caractere() == "]":
+                    lecteur.pos += 1
+                else:
+                    while True:
+                        yield lecteur.valeur()
+                        if lecteur.caractere() == ",":
+                            lecteur.pos += 1
+                            continue
+                        lecteur.attendre("]")
+                        break
+            else:
+                lecteur.valeur()
+            if lecteur.caractere() == ",":
+                lecteur.pos += 1
+                continue
+            lecteur.attendre("}")
+            return
+
+
+def filtrer_continent(facilities, continents):
+    """Ne garde que les objets dont `region_continent` est dans `continents`."""
+    if not continents:
+        yield from facilities
+        return
+    continents = set(continents)
+    for fac in facilities:
+        if fac.get("region_continent") in continents:
+            yield fac
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-with open(os.path.join(BASE_DIR, '..', 'fac-0.json')) as jf:
-    d = json.load(jf)
+# ============================================================
+# ÉCRITURE DU CSV
+# ============================================================
 
-Ed = d['data']
+def valeurs_ligne(fac: dict, colonnes: list[str]) -> list:
+    """Retourne les valeurs de `fac` dans l'ordre de `colonnes` (absente → None)."""
+    return [fac.get(col) for col in colonnes]
 
-df = open(os.path.join(BASE_DIR, '..', 'data', 'datacenter.csv'), 'w')
 
-cw = csv.writer(df)
+def json_to_csv(fichier_json: str = FICHIER_JSON,
+                fichier_csv: str = FICHIER_CSV,
+                continents=None,
+                colonnes: list[str] = COLONNES_FAC) -> int:
+    """
+    Convertit l'export PeeringDB `fichier_json` en CSV, en mémoire constante.
 
-c = 0
+    :param fichier_json: chemin vers fac-0.json
+    :param fichier_csv:  chemin du CSV à écrire
+    :param continents:   liste de valeurs de `region_continent` à garder
+                         (None → tout garder)
+    :param colonnes:     schéma des colonnes du CSV
+    :return: nombre de lignes écrites
+    """
+    if not os.path.exists(fichier_json):
+        raise FileNotFoundError(f"JSON introuvable : {fichier_json}")
 
-for emp in Ed:
-    if c == 0:
+    nb = 0
+    with open(fichier_csv, "w", encoding="utf-8", newline="") as df:
+        cw = csv.writer(df)
+        cw.writerow(colonnes)
+        for fac in filtrer_continent(iterer_facilities(fichier_json), continents):
+            cw.writerow(valeurs_ligne(fac, colonnes))
+            nb += 1
+    return nb
 
-        # Writing headers of CSV file
-        h = emp.keys()
-        cw.writerow(h)
-        c += 1
 
-    # Writing data of CSV file
-    cw.writerow(emp.values())
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convertit fac-0.json (PeeringDB) en data/datacenter.csv"
+    )
+    parser.add_argument(
+        "--source", default=FICHIER_JSON, metavar="FICHIER",
+        help="Export JSON PeeringDB à convertir (défaut : fac-0.json)"
+    )
+    parser.add_argument(
+        "--sortie", default=FICHIER_CSV, metavar="FICHIER",
+        help="CSV à écrire (défaut : data/datacenter.csv)"
+    )
+    parser.add_argument(
+        "--continent", action="append", default=None, metavar="NOM",
+        help="Ne garder que ce region_continent (option répétable, ex. Europe)"
+    )
+    args = parser.parse_args()
 
-df.close()
+    nb = json_to_csv(args.source, args.sortie, continents=args.continent)
+    print(f"{nb} lignes écrites dans {args.sortie}")
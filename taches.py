@@ -0,0 +1,144 @@
+# ============================================================
+# taches.py – Tâches de fond pour l'interface Tkinter
+# ============================================================
+# Tkinter n'est pas thread-safe : les requêtes et la génération des
+# cartes tournent dans un pool de threads, et leurs résultats (ainsi
+# que les messages de progression) passent par une file que la
+# boucle Tk vide toutes les INTERVALLE_MS millisecondes (after()).
+# Les fonctions de rappel s'exécutent donc toujours dans le thread Tk.
+#
+#   - regroupement : soumettre deux fois la même `cle` pendant que la
+#     première tâche tourne ne la relance pas ;
+#   - annulation   : une nouvelle tâche d'un `groupe` (ex. « pays »)
+#     annule les précédentes du même groupe (non démarrées : jamais
+#     lancées ; en cours : résultat ignoré, tache.annulee passe à True).
+# ============================================================
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+INTERVALLE_MS = 16         # ~60 images/s
+MAX_PAR_TOUR  = 20         # messages traités par passage dans la boucle Tk
+
+
+class Tache:
+    """Tâche soumise : passée à la fonction exécutée pour la progression et l'annulation."""
+
+    def __init__(self, executeur, cle, groupe):
+        self._executeur = executeur
+        self.cle = cle
+        self.groupe = groupe
+        self.annulee = False
+        self.future = None
+
+    def progression(self, message: str):
+        """Message affiché dans la barre de statut (appelable depuis le thread de travail)."""
+        if not self.annulee:
+            self._executeur._file.put(("progression", self, message))
+
+    def annuler(self):
+        self.annulee = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class ExecuteurTaches:
+    """
+    Exécute des fonctions dans un pool de threads et rappelle
+    `quand_fini(resultat)` / `quand_erreur(exception)` dans le thread Tk.
+    `progression(message)` (ex. status_var.set) reçoit les messages des tâches.
+    """
+
+    def __init__(self, racine, travailleurs: int = 2, progression=None,
+                 intervalle_ms: int = INTERVALLE_MS):
+        self.racine = racine
+        self.progression = progression
+        self.intervalle_ms = intervalle_ms
+        self._pool = ThreadPoolExecutor(travailleurs, thread_name_prefix="tache")
+        self._file = queue.Queue()
+        self._en_cours = {}        # cle → Tache
+        self._groupes = {}         # groupe → [Tache]
+        self._verrou = threading.Lock()
+        self._ferme = False
+        self._id_after = self.racine.after(self.intervalle_ms, self._sonder)
+
+    # --------------------------------------------------------
+    def soumettre(self, cle, fonction, *args, groupe=None,
+                  quand_fini=None, quand_erreur=None) -> Tache:
+        """
+        Lance `fonction(tache, *args)` en arrière-plan. Retourne la Tache
+        (celle déjà en cours si une tâche de même `cle` n'est pas terminée).
+        """
+        with self._verrou:
+            existante = self._en_cours.get(cle)
+            if existante is not None and not existante.annulee:
+                return existante
+            if groupe is not None:
+                for ancienne in self._groupes.pop(groupe, []):
+                    ancienne.annuler()
+                    self._en_cours.pop(ancienne.cle, None)
+            tache = Tache(self, cle, groupe)
+            self._en_cours[cle] = tache
+            if groupe is not None:
+                self._groupes.setdefault(groupe, []).append(tache)
+
+        def executer():
+            if tache.annulee:
+                return
+            try:
+                resultat = fonction(tache, *args)
+            except Exception as e:
+                self._file.put(("erreur", tache, (e, quand_erreur)))
+            else:
+                self._file.put(("fini", tache, (resultat, quand_fini)))
+
+        tache.future = self._pool.submit(executer)
+        return tache
+
+    def nb_en_cours(self) -> int:
+        with self._verrou:
+            return sum(1 for t in self._en_cours.values() if not t.annulee)
+
+    # --------------------------------------------------------
+    def _terminer(self, tache):
+        with self._verrou:
+            if self._en_cours.get(tache.cle) is tache:
+                del self._en_cours[tache.cle]
+            taches_groupe = self._groupes.get(tache.groupe)
+            if taches_groupe and tache in taches_groupe:
+                taches_groupe.remove(tache)
+
+    def _sonder(self):
+        """Boucle Tk : traite au plus MAX_PAR_TOUR messages puis se reprogramme."""
+        for _ in range(MAX_PAR_TOUR):
+            try:
+                nature, tache, contenu = self._file.get_nowait()
+            except queue.Empty:
+                break
+            if nature == "progression":
+                if not tache.annulee and self.progression:
+                    self.progression(contenu)
+                continue
+            self._terminer(tache)
+            if tache.annulee:
+                continue
+            valeur, rappel = contenu
+            if nature == "erreur" and rappel is None:
+                if self.progression:
+                    self.progression(f"Erreur : {valeur}")
+            elif rappel is not None:
+                rappel(valeur)
+        if not self._ferme:
+            self._id_after = self.racine.after(self.intervalle_ms, self._sonder)
+
+    def fermer(self):
+        """Annule les tâches en attente et arrête la boucle de sondage."""
+        self._ferme = True
+        self.racine.after_cancel(self._id_after)
+        with self._verrou:
+            for tache in self._en_cours.values():
+                tache.annuler()
+            self._en_cours.clear()
+            self._groupes.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
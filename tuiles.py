@@ -0,0 +1,272 @@
+# ============================================================
+# tuiles.py – Export des datacenters en pyramide de tuiles statiques
+# ============================================================
+# Les datacenters géolocalisés sont répartis dans des tuiles z/x/y
+# (même découpage que les fonds de carte OpenStreetMap) écrites en
+# JSON sous output/tuiles/ :
+#   - zoom < ZOOM_POINTS : agrégats (chaque tuile est divisée en
+#     CELLULES x CELLULES cellules ; une cellule non vide donne un
+#     groupe [lat, lon, nb, somme net_count, somme ix_count] placé
+#     au barycentre de ses points) ;
+#   - zoom >= ZOOM_POINTS : points bruts
+#     [lat, lon, nom, ville, pays, net_count, ix_count, site web].
+# index.html (Leaflet) ne télécharge que les tuiles visibles au
+# zoom courant : le dossier peut être servi par n'importe quel
+# serveur de fichiers statiques (python -m http.server, nginx…).
+#
+# Usage : python tuiles.py [--sortie DOSSIER] [--zoom-max Z]
+#                          [--zoom-points Z]
+# ============================================================
+
+import os
+import json
+import math
+import shutil
+import argparse
+from collections import defaultdict
+
+import db_query
+
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+FICHIER_BDD  = os.path.join(BASE_DIR, "data", "datacenter.sqlite3")
+DOSSIER      = os.path.join(BASE_DIR, "output", "tuiles")
+ZOOM_MAX     = 12      # au-delà, le navigateur réutilise les tuiles de ZOOM_MAX
+ZOOM_POINTS  = 8       # premier zoom où les tuiles contiennent les points bruts
+CELLULES     = 8       # subdivision d'une tuile pour les agrégats (8 x 8)
+LAT_MAX      = 85.05112878   # limite de la projection Web Mercator
+
+
+# ============================================================
+# PROJECTION
+# ============================================================
+
+def position_tuile(lat: float, lon: float, zoom: int) -> tuple[float, float]:
+    """Position (x, y) fractionnaire dans la grille des tuiles au `zoom` donné."""
+    n = 2 ** zoom
+    lat = max(-LAT_MAX, min(LAT_MAX, lat))
+    phi = math.radians(lat)
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(phi)) / math.pi) / 2.0 * n
+    return min(max(x, 0.0), n - 1e-9), min(max(y, 0.0), n - 1e-9)
+
+
+# ============================================================
+# CONSTRUCTION
+# ============================================================
+
+def point(r) -> list:
+    """Ligne datacenters_gps → point brut d'une tuile."""
+    return [round(r.lat, 5), round(r.lon, 5), r.name, r.city or "",
+            r.country or "", r.net_count, r.ix_count, r.website or ""]
+
+
+def tuiles_points(rows, zoom: int) -> dict:
+    """{(x, y): {"points": [...]}} pour un zoom de points bruts."""
+    tuiles = defaultdict(list)
+    for r in rows:
+        x, y = position_tuile(r.lat, r.lon, zoom)
+        tuiles[int(x), int(y)].append(point(r))
+    return {cle: {"points": pts} for cle, pts in tuiles.items()}
+
+
+def tuiles_groupes(rows, zoom: int, cellules: int = CELLULES) -> dict:
+    """{(x, y): {"groupes": [...]}} : points agrégés par cellule de chaque tuile."""
+    cellules_non_vides = defaultdict(lambda: [0.0, 0.0, 0, 0, 0])
+    for r in rows:
+        x, y = position_tuile(r.lat, r.lon, zoom)
+        c = cellules_non_vides[int(x * cellules), int(y * cellules)]
+        c[0] += r.lat
+        c[1] += r.lon
+        c[2] += 1
+        c[3] += r.net_count or 0
+        c[4] += r.ix_count or 0
+
+    tuiles = defaultdict(list)
+    for (cx, cy), (somme_lat, somme_lon, nb, net, ix) in cellules_non_vides.items():
+        tuiles[cx // cellules, cy // cellules].append(
+            [round(somme_lat / nb, 5), round(somme_lon / nb, 5), nb, net, ix])
+    return {cle: {"groupes": groupes} for cle, groupes in tuiles.items()}
+
+
+def exporter_tuiles(dossier: str = DOSSIER, zoom_max: int = ZOOM_MAX,
+                    zoom_points: int = ZOOM_POINTS,
+                    fichier_bdd: str = FICHIER_BDD) -> dict:
+    """
+    Écrit la pyramide complète dans `dossier` (remplacé d'un bloc à la fin).
+    Retourne les métadonnées (aussi écrites dans metadata.json).
+    Un dossier existant n'est remplacé que s'il est vide ou contient déjà
+    une pyramide (metadata.json) : FileExistsError sinon.
+    """
+    if (os.path.isdir(dossier) and os.listdir(dossier)
+            and not os.path.isfile(os.path.join(dossier, "metadata.json"))):
+        raise FileExistsError(f"{dossier} existe et ne contient pas de tuiles "
+                              "(metadata.json absent) : choisir un autre dossier")
+    rows = db_query.executer("datacenters_gps", fichier_bdd=fichier_bdd)
+    temporaire = dossier.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(temporaire, ignore_errors=True)
+
+    nb_tuiles = 0
+    for zoom in range(zoom_max + 1):
+        if zoom >= zoom_points:
+            tuiles = tuiles_points(rows, zoom)
+        else:
+            tuiles = tuiles_groupes(rows, zoom)
+        for (x, y), contenu in tuiles.items():
+            chemin = os.path.join(temporaire, str(zoom), str(x))
+            os.makedirs(chemin, exist_ok=True)
+            with open(os.path.join(chemin, f"{y}.json"), "w", encoding="utf-8") as f:
+                json.dump(contenu, f, ensure_ascii=False, separators=(",", ":"))
+        nb_tuiles += len(tuiles)
+
+    meta = {
+        "zoom_max":    zoom_max,
+        "zoom_points": zoom_points,
+        "nb_points":   len(rows),
+        "nb_tuiles":   nb_tuiles,
+        "limites":     [[min(r.lat for r in rows), min(r.lon for r in rows)],
+                        [max(r.lat for r in rows), max(r.lon for r in rows)]] if rows else None,
+    }
+    os.makedirs(temporaire, exist_ok=True)
+    with open(os.path.join(temporaire, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    with open(os.path.join(temporaire, "index.html"), "w", encoding="utf-8") as f:
+        f.write(GABARIT_HTML)
+
+    shutil.rmtree(dossier, ignore_errors=True)
+    os.replace(temporaire, dossier)
+    return meta
+
+
+# ============================================================
+# GABARIT DE LA CARTE
+# ============================================================
+
+GABARIT_HTML = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>OpenCenter – Datacenters</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<style>html, body, #carte { height: 100%; margin: 0; }</style>
+</head>
+<body>
+<div id="carte"></div>
+<script>
+// Ne charge que les tuiles JSON visibles (z/x/y.json) au zoom courant.
+var carte = L.map('carte').setView([48.8, 10.0], 4);
+L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+    attribution: '© Contributeurs OpenStreetMap'
+}).addTo(carte);
+var calque = L.layerGroup().addTo(carte);
+var tuiles = {};     // cache : "z/x/y" -> contenu (null si tuile vide), ou Promise en cours
+var visibles = {};   // clés des tuiles de la vue courante
+var generation = 0;  // incrémentée à chaque charger() : les réponses d'une vue quittée sont ignorées
+var meta = null;
+
+function tuileX(lon, z) { return Math.floor((lon + 180) / 360 * Math.pow(2, z)); }
+function tuileY(lat, z) {
+    lat = Math.max(-85.05112878, Math.min(85.05112878, lat));
+    var phi = lat * Math.PI / 180;
+    return Math.floor((1 - Math.log(Math.tan(phi) + 1 / Math.cos(phi)) / Math.PI) / 2 * Math.pow(2, z));
+}
+
+function popup(p) {
+    var div = document.createElement('div');
+    var titre = document.createElement('b');
+    titre.textContent = p[2];
+    div.appendChild(titre);
+    [p[3] + (p[4] ? ' (' + p[4] + ')' : ''), 'Réseaux : ' + p[5] + ' | IX : ' + p[6]]
+        .forEach(function (texte) {
+            div.appendChild(document.createElement('br'));
+            div.appendChild(document.createTextNode(texte));
+        });
+    if (p[7]) {
+        var lien = document.createElement('a');
+        lien.href = p[7];
+        lien.target = '_blank';
+        lien.textContent = 'Site web';
+        div.appendChild(document.createElement('br'));
+        div.appendChild(lien);
+    }
+    return div;
+}
+
+function dessiner(contenu) {
+    if (!contenu) return;
+    (contenu.groupes || []).forEach(function (g) {
+        var cercle = L.circleMarker([g[0], g[1]], {
+            radius: 6 + 4 * Math.log(g[2]), color: '#d33', fillOpacity: 0.6
+        }).bindTooltip(g[2] + ' DC – ' + g[3] + ' réseaux');
+        cercle.on('click', function () { carte.setView([g[0], g[1]], carte.getZoom() + 2); });
+        calque.addLayer(cercle);
+    });
+    (contenu.points || []).forEach(function (p) {
+        calque.addLayer(L.circleMarker([p[0], p[1]], {radius: 6, color: '#36c', fillOpacity: 0.8})
+            .bindTooltip(p[2])
+            .bindPopup(function () { return popup(p); }, {maxWidth: 300}));
+    });
+}
+
+function charger() {
+    if (!meta) return;
+    var z = Math.min(carte.getZoom(), meta.zoom_max);
+    var b = carte.getBounds(), n = Math.pow(2, z);
+    var x0 = Math.max(tuileX(b.getWest(), z), 0), x1 = Math.min(tuileX(b.getEast(), z), n - 1);
+    var y0 = Math.max(tuileY(b.getNorth(), z), 0), y1 = Math.min(tuileY(b.getSouth(), z), n - 1);
+    var courante = ++generation;
+    visibles = {};
+    calque.clearLayers();
+    for (var x = x0; x <= x1; x++) {
+        for (var y = y0; y <= y1; y++) {
+            (function (cle) {
+                visibles[cle] = true;
+                if (!(cle in tuiles)) {
+                    // une seule requête par tuile, même si la vue change avant la réponse
+                    tuiles[cle] = fetch(cle + '.json')
+                        .then(function (r) { return r.ok ? r.json() : null; })
+                        .catch(function () { return null; })
+                        .then(function (contenu) { tuiles[cle] = contenu; return contenu; });
+                }
+                if (!(tuiles[cle] instanceof Promise)) { dessiner(tuiles[cle]); return; }
+                tuiles[cle].then(function (contenu) {
+                    // dessinée une seule fois, et seulement si la vue n'a pas changé
+                    if (courante === generation && visibles[cle]) dessiner(contenu);
+                });
+            })(z + '/' + x + '/' + y);
+        }
+    }
+}
+
+fetch('metadata.json').then(function (r) { return r.json(); }).then(function (m) {
+    meta = m;
+    if (m.limites) carte.fitBounds(m.limites);
+    carte.on('moveend', charger);
+    charger();
+});
+</script>
+</body>
+</html>
+"""
+
+
+# ============================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Exporte les datacenters en tuiles JSON statiques z/x/y + carte Leaflet."
+    )
+    parser.add_argument("--sortie", default=DOSSIER, metavar="DOSSIER",
+                        help="Dossier de sortie (défaut : output/tuiles)")
+    parser.add_argument("--zoom-max", type=int, default=ZOOM_MAX, metavar="Z",
+                        help=f"Dernier niveau de zoom exporté (défaut : {ZOOM_MAX})")
+    parser.add_argument("--zoom-points", type=int, default=ZOOM_POINTS, metavar="Z",
+                        help=f"Zoom à partir duquel les points sont bruts (défaut : {ZOOM_POINTS})")
+    args = parser.parse_args()
+
+    try:
+        meta = exporter_tuiles(args.sortie, args.zoom_max, args.zoom_points)
+    except FileExistsError as e:
+        raise SystemExit(f"Export annulé : {e}")
+    print(f"{meta['nb_points']} datacenters → {meta['nb_tuiles']} tuiles dans {args.sortie}")
+    print(f"Carte : python -m http.server -d {args.sortie}  puis http://localhost:8000/")